@@ -0,0 +1,61 @@
+#----------------------------------------------------------------------------------
+# Microsoft Developer & Platform Evangelism
+#
+# Copyright (c) Microsoft Corporation. All rights reserved.
+#
+# THIS CODE AND INFORMATION ARE PROVIDED "AS IS" WITHOUT WARRANTY OF ANY KIND,
+# EITHER EXPRESSED OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE IMPLIED WARRANTIES
+# OF MERCHANTABILITY AND/OR FITNESS FOR A PARTICULAR PURPOSE.
+#----------------------------------------------------------------------------------
+# The example companies, organizations, products, domain names,
+# e-mail addresses, logos, people, places, and events depicted
+# herein are fictitious.  No association with any real company,
+# organization, product, domain name, email address, logo, person,
+# places, or events is intended or should be inferred.
+#----------------------------------------------------------------------------------
+
+import time
+import uuid
+from azure.common import AzureHttpError, AzureMissingResourceHttpError
+
+# Error codes of a request that was authorized by the stored access policy but is not allowed by
+# its permissions, the policy is in effect
+_POLICY_EFFECTIVE_ERROR_CODES = ('AuthorizationPermissionMismatch', 'AuthorizationResourceTypeMismatch')
+
+# Waits until a stored access policy set with set_container_acl is in effect, which can take up to
+# 30 seconds. A SAS that refers to the policy is rejected with 403 until then. The probe downloads a
+# blob that does not exist through a service using that SAS: a 404 means the request was authorized.
+# The probe is a GET so the error code is in the response body, a 403 that only reports missing
+# permissions also means the policy is in effect. Probes are spaced by an interval that doubles up
+# to max_interval.
+# Input Arguments:
+# sas_blob_service - Blob service created with a SAS that refers to the stored access policy
+# container_name - name of the container the policy was set on
+# timeout - the most seconds to wait
+# initial_interval - seconds between the first two probes
+# max_interval - largest number of seconds between two probes
+# Returns True once the policy is in effect, False when timeout passed first
+def wait_for_access_policy(sas_blob_service, container_name, timeout=30.0, initial_interval=0.25, max_interval=4.0):
+    if timeout < 0 or initial_interval <= 0 or max_interval < initial_interval:
+        raise ValueError('timeout must not be negative and 0 < initial_interval <= max_interval')
+
+    probe_blob_name = 'acl-probe-' + uuid.uuid4().hex
+    deadline = time.time() + timeout
+    interval = initial_interval
+    while True:
+        try:
+            sas_blob_service.get_blob_to_bytes(container_name, probe_blob_name)
+            return True
+        except AzureMissingResourceHttpError:
+            return True
+        except AzureHttpError as e:
+            if e.status_code != 403:
+                raise
+            if any(code in str(e) for code in _POLICY_EFFECTIVE_ERROR_CODES):
+                return True
+
+        remaining = deadline - time.time()
+        if remaining <= 0:
+            return False
+        time.sleep(min(interval, remaining))
+        interval = min(interval * 2, max_interval)
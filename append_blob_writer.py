@@ -0,0 +1,177 @@
+#----------------------------------------------------------------------------------
+# Microsoft Developer & Platform Evangelism
+#
+# Copyright (c) Microsoft Corporation. All rights reserved.
+#
+# THIS CODE AND INFORMATION ARE PROVIDED "AS IS" WITHOUT WARRANTY OF ANY KIND,
+# EITHER EXPRESSED OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE IMPLIED WARRANTIES
+# OF MERCHANTABILITY AND/OR FITNESS FOR A PARTICULAR PURPOSE.
+#----------------------------------------------------------------------------------
+# The example companies, organizations, products, domain names,
+# e-mail addresses, logos, people, places, and events depicted
+# herein are fictitious.  No association with any real company,
+# organization, product, domain name, email address, logo, person,
+# places, or events is intended or should be inferred.
+#----------------------------------------------------------------------------------
+
+import threading
+import time
+from collections import deque
+
+# A single append_block call may carry up to 4 MB
+MAX_APPEND_BLOCK_SIZE = 4 * 1024 * 1024
+
+#
+# Buffered append blob writer - Collects small records in memory and appends them to an existing
+# append blob as a single block once max_block_size bytes are buffered or the oldest buffered
+# record is flush_interval seconds old. Blocks are sent by a background thread; when more than
+# max_buffer_size bytes are waiting, write() blocks until the service catches up.
+# Records are never split across blocks, so readers always see whole records.
+#
+class BufferedAppendBlobWriter():
+
+    # Input Arguments:
+    # appendblob_service - AppendBlobService used to append the blocks
+    # container_name - name of the container
+    # blob_name - name of an existing append blob
+    # max_block_size - largest block appended at once, up to 4 MB
+    # flush_interval - seconds a record may wait in the buffer before it is appended
+    # max_buffer_size - bytes buffered before write() blocks, defaults to 4 blocks
+    # encoding - encoding used for text records
+    # lease_id - required if the blob has an active lease
+    def __init__(self, appendblob_service, container_name, blob_name, max_block_size=MAX_APPEND_BLOCK_SIZE,
+                 flush_interval=1.0, max_buffer_size=None, encoding='utf-8', lease_id=None):
+        if not 0 < max_block_size <= MAX_APPEND_BLOCK_SIZE:
+            raise ValueError('max_block_size must be between 1 byte and 4 MB')
+
+        self.appendblob_service = appendblob_service
+        self.container_name = container_name
+        self.blob_name = blob_name
+        self.max_block_size = max_block_size
+        self.flush_interval = flush_interval
+        self.max_buffer_size = max(max_buffer_size or 4 * max_block_size, max_block_size)
+        self.encoding = encoding
+        self.lease_id = lease_id
+        self.blocks_appended = 0
+
+        # Records waiting to be sent as (arrival time, bytes)
+        self._records = deque()
+        self._pending_bytes = 0
+        # Bytes waiting plus bytes of the block being sent
+        self._buffered_bytes = 0
+        self._sending = False
+        self._flush_requested = False
+        self._closed = False
+        self._error = None
+        self._condition = threading.Condition()
+
+        self._thread = threading.Thread(target=self._run)
+        self._thread.daemon = True
+        self._thread.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    # Buffers a record, blocking while the buffer is full.
+    # Input Arguments:
+    # record - bytes or text of at most max_block_size bytes
+    def write(self, record):
+        if not isinstance(record, bytes):
+            record = record.encode(self.encoding)
+        if len(record) > self.max_block_size:
+            raise ValueError('record of {0} bytes is larger than max_block_size'.format(len(record)))
+
+        with self._condition:
+            self._check_state()
+            while self._buffered_bytes + len(record) > self.max_buffer_size and self._error is None:
+                self._condition.wait()
+            self._check_state()
+
+            self._records.append((time.time(), record))
+            self._pending_bytes += len(record)
+            self._buffered_bytes += len(record)
+            self._condition.notify_all()
+
+    # Appends every buffered record and waits until the service has acknowledged them
+    def flush(self):
+        with self._condition:
+            self._flush_requested = True
+            self._condition.notify_all()
+            while (self._records or self._sending) and self._error is None:
+                self._condition.wait()
+            self._raise_error()
+
+    # Appends the remaining records and stops the background thread
+    def close(self):
+        with self._condition:
+            if self._closed:
+                return
+            self._closed = True
+            self._condition.notify_all()
+        self._thread.join()
+        self._raise_error()
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while True:
+                    if self._error is not None:
+                        return
+                    wait = self._get_wait_time()
+                    if wait is not None and wait <= 0:
+                        break
+                    if not self._records and self._closed:
+                        return
+                    self._condition.wait(wait)
+
+                block = self._take_block()
+                self._sending = True
+
+            try:
+                self.appendblob_service.append_block(self.container_name, self.blob_name, block,
+                                                     lease_id=self.lease_id)
+            except Exception as e:
+                with self._condition:
+                    self._error = e
+                    self._sending = False
+                    self._condition.notify_all()
+                return
+
+            with self._condition:
+                self.blocks_appended += 1
+                self._buffered_bytes -= len(block)
+                self._sending = False
+                if not self._records:
+                    self._flush_requested = False
+                self._condition.notify_all()
+
+    # Gets the seconds until the next block is due, 0 when it is due now and None when nothing is buffered
+    def _get_wait_time(self):
+        if not self._records:
+            return None
+        if self._closed or self._flush_requested or self._pending_bytes >= self.max_block_size:
+            return 0
+        return self._records[0][0] + self.flush_interval - time.time()
+
+    # Removes whole records from the buffer up to max_block_size bytes
+    def _take_block(self):
+        records = []
+        size = 0
+        while self._records and size + len(self._records[0][1]) <= self.max_block_size:
+            record = self._records.popleft()[1]
+            records.append(record)
+            size += len(record)
+        self._pending_bytes -= size
+        return b''.join(records)
+
+    def _check_state(self):
+        self._raise_error()
+        if self._closed:
+            raise ValueError('write to a closed BufferedAppendBlobWriter')
+
+    def _raise_error(self):
+        if self._error is not None:
+            raise self._error
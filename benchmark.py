@@ -0,0 +1,311 @@
+#----------------------------------------------------------------------------------
+# Microsoft Developer & Platform Evangelism
+#
+# Copyright (c) Microsoft Corporation. All rights reserved.
+#
+# THIS CODE AND INFORMATION ARE PROVIDED "AS IS" WITHOUT WARRANTY OF ANY KIND,
+# EITHER EXPRESSED OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE IMPLIED WARRANTIES
+# OF MERCHANTABILITY AND/OR FITNESS FOR A PARTICULAR PURPOSE.
+#----------------------------------------------------------------------------------
+# The example companies, organizations, products, domain names,
+# e-mail addresses, logos, people, places, and events depicted
+# herein are fictitious.  No association with any real company,
+# organization, product, domain name, email address, logo, person,
+# places, or events is intended or should be inferred.
+#----------------------------------------------------------------------------------
+
+# Measures the throughput and latency of the Blob operations used by the samples while
+# sweeping blob size, block/page size and concurrency, and writes the results as JSON
+# so runs can be compared.
+#
+# The benchmark uses the same account settings as start.py (config.py). To run it without
+# the emulator or a Storage account use the in-process fake service:
+#     python benchmark.py --fake --latency 0.02 --bandwidth 50M
+# Run "python benchmark.py --help" for all the sweep options.
+#----------------------------------------------------------------------------------
+
+import argparse
+import copy
+import datetime
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import config
+from random_data import RandomData
+from azure.storage.blob.models import BlobBlock
+from fake_blob_service import FakeStorageAccount
+from service_factory import BlobServiceFactory
+
+OPERATIONS = ['create_blob_from_path', 'put_block', 'update_page', 'append_blob_from_text', 'list_blobs', 'get_blob_to_path']
+
+#
+# Azure Storage Blob benchmarks - Times each sample operation for every combination of the
+# configured blob sizes, block sizes and concurrency levels.
+#
+class BlobBenchmarks():
+
+    # Input Arguments:
+    # account - CloudStorageAccount (or FakeStorageAccount) to run the benchmarks against
+    # blob_sizes - sizes in bytes of the blobs uploaded and downloaded
+    # block_sizes - sizes in bytes of the blocks, pages and appends, blob sizes are split into these
+    # concurrencies - numbers of requests kept in flight at once
+    # iterations - number of blobs uploaded, downloaded or listed per measurement
+    # list_blob_counts - numbers of blobs in the container for the list_blobs measurement
+    def __init__(self, account, blob_sizes, block_sizes, concurrencies, iterations=8, list_blob_counts=(1000,)):
+        self.account = account
+        self.blob_sizes = blob_sizes
+        self.block_sizes = block_sizes
+        self.concurrencies = concurrencies
+        self.iterations = iterations
+        self.list_blob_counts = list_blob_counts
+        self.random_data = RandomData()
+
+    # Runs the benchmarks of the given operations and returns one result per measurement
+    def run_all_benchmarks(self, operations=OPERATIONS):
+        blockblob_service = self.account.create_block_blob_service()
+        container_name = 'benchmarkcontainer' + self.random_data.get_random_name(6)
+        work_dir = tempfile.mkdtemp(prefix='blob_benchmark')
+        results = []
+
+        try:
+            blockblob_service.create_container(container_name)
+            for operation in operations:
+                benchmark = getattr(self, 'benchmark_' + operation)
+                for concurrency in self.concurrencies:
+                    for result in benchmark(container_name, concurrency, work_dir):
+                        self._print_result(result)
+                        results.append(result)
+        finally:
+            shutil.rmtree(work_dir, ignore_errors=True)
+            blockblob_service.delete_container(container_name)
+
+        return results
+
+    def benchmark_create_blob_from_path(self, container_name, concurrency, work_dir):
+        # Pooled services are shared, the transfer sizes are set on a copy
+        blockblob_service = copy.copy(self.account.create_block_blob_service())
+        for blob_size in self.blob_sizes:
+            for block_size in self.block_sizes:
+                # The SDK splits uploads larger than the single put size into blocks of MAX_BLOCK_SIZE
+                blockblob_service.MAX_SINGLE_PUT_SIZE = block_size
+                blockblob_service.MAX_BLOCK_SIZE = block_size
+                file_path = self._make_file(work_dir, blob_size)
+                names = ['path' + str(i) for i in range(self.iterations)]
+                yield self._measure('create_blob_from_path', names, concurrency, blob_size, block_size, blob_size,
+                                    lambda name: blockblob_service.create_blob_from_path(container_name, name, file_path,
+                                                                                         max_connections=1))
+
+    def benchmark_put_block(self, container_name, concurrency, work_dir):
+        blockblob_service = self.account.create_block_blob_service()
+        for blob_size in self.blob_sizes:
+            for block_size in self._block_sizes_for(blob_size):
+                blob_name = 'blocks' + self.random_data.get_random_name(8)
+                block = self.random_data.get_random_bytes(block_size)
+                block_ids = ['{0:032d}'.format(i) for i in range(blob_size // block_size)]
+                yield self._measure('put_block', block_ids, concurrency, blob_size, block_size, block_size,
+                                    lambda block_id: blockblob_service.put_block(container_name, blob_name, block, block_id))
+                blockblob_service.put_block_list(container_name, blob_name, [BlobBlock(id=block_id) for block_id in block_ids])
+
+    def benchmark_update_page(self, container_name, concurrency, work_dir):
+        pageblob_service = self.account.create_page_blob_service()
+        for blob_size in self.blob_sizes:
+            for block_size in self._block_sizes_for(blob_size, 512, 4 * 1024 * 1024):
+                blob_name = 'pages' + self.random_data.get_random_name(8)
+                pageblob_service.create_blob(container_name, blob_name, blob_size)
+                page = self.random_data.get_random_bytes(block_size)
+                offsets = list(range(0, blob_size - block_size + 1, block_size))
+                yield self._measure('update_page', offsets, concurrency, blob_size, block_size, block_size,
+                                    lambda offset: pageblob_service.update_page(container_name, blob_name, page,
+                                                                                offset, offset + block_size - 1))
+
+    def benchmark_append_blob_from_text(self, container_name, concurrency, work_dir):
+        appendblob_service = self.account.create_append_blob_service()
+        for blob_size in self.blob_sizes:
+            for block_size in self._block_sizes_for(blob_size, 1, 4 * 1024 * 1024):
+                blob_name = 'append' + self.random_data.get_random_name(8)
+                appendblob_service.create_blob(container_name, blob_name)
+                text = self.random_data.get_random_name(block_size)
+                yield self._measure('append_blob_from_text', range(blob_size // block_size), concurrency, blob_size,
+                                    block_size, block_size,
+                                    lambda index: appendblob_service.append_blob_from_text(container_name, blob_name, text))
+
+    def benchmark_list_blobs(self, container_name, concurrency, work_dir):
+        blockblob_service = self.account.create_block_blob_service()
+        for blob_count in self.list_blob_counts:
+            for page_size in self._list_page_sizes(blob_count):
+                prefix = 'list' + str(blob_count) + '/'
+                self._ensure_blobs(blockblob_service, container_name, prefix, blob_count, concurrency)
+                latencies = []
+                lock = threading.Lock()
+
+                # Each listing is timed page by page, a page being one round trip to the service
+                def list_all(index):
+                    marker = None
+                    while True:
+                        start = time.time()
+                        page = blockblob_service.list_blobs(container_name, prefix=prefix, num_results=page_size, marker=marker)
+                        list(page)
+                        with lock:
+                            latencies.append(time.time() - start)
+                        marker = page.next_marker
+                        if not marker:
+                            break
+
+                start = time.time()
+                with ThreadPoolExecutor(max_workers=concurrency) as executor:
+                    list(executor.map(list_all, range(self.iterations)))
+                elapsed = time.time() - start
+                yield self._make_result('list_blobs', concurrency, blob_count, page_size, 0, latencies, elapsed)
+
+    def benchmark_get_blob_to_path(self, container_name, concurrency, work_dir):
+        # Pooled services are shared, the transfer sizes are set on a copy
+        blockblob_service = copy.copy(self.account.create_block_blob_service())
+        for blob_size in self.blob_sizes:
+            for block_size in self.block_sizes:
+                # Range requests of a download are MAX_CHUNK_GET_SIZE bytes after the first one
+                blockblob_service.MAX_SINGLE_GET_SIZE = block_size
+                blockblob_service.MAX_CHUNK_GET_SIZE = block_size
+                blob_name = 'download' + str(blob_size)
+                if not blockblob_service.exists(container_name, blob_name):
+                    blockblob_service.create_blob_from_bytes(container_name, blob_name,
+                                                             self.random_data.get_random_bytes(blob_size))
+                yield self._measure('get_blob_to_path', range(self.iterations), concurrency, blob_size, block_size, blob_size,
+                                    lambda index: blockblob_service.get_blob_to_path(
+                                        container_name, blob_name, os.path.join(work_dir, 'download' + str(index)),
+                                        max_connections=1))
+
+    # Runs operation(item) for every item on concurrency threads and times each call
+    def _measure(self, name, items, concurrency, blob_size, block_size, bytes_per_operation, operation):
+        def timed(item):
+            start = time.time()
+            operation(item)
+            return time.time() - start
+
+        start = time.time()
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            latencies = list(executor.map(timed, items))
+        elapsed = time.time() - start
+        return self._make_result(name, concurrency, blob_size, block_size, bytes_per_operation * len(latencies),
+                                 latencies, elapsed)
+
+    def _make_result(self, name, concurrency, blob_size, block_size, total_bytes, latencies, elapsed):
+        elapsed = max(elapsed, 1e-9)
+        return {
+            'operation': name,
+            'blob_size': blob_size,
+            'block_size': block_size,
+            'concurrency': concurrency,
+            'operations': len(latencies),
+            'bytes': total_bytes,
+            'seconds': elapsed,
+            'mb_per_second': total_bytes / elapsed / (1024 * 1024),
+            'ops_per_second': len(latencies) / elapsed,
+            'latency_p50': percentile(latencies, 50),
+            'latency_p95': percentile(latencies, 95),
+            'latency_p99': percentile(latencies, 99),
+        }
+
+    # Gets the block sizes that fit the blob and the limits of the operation
+    def _block_sizes_for(self, blob_size, alignment=1, max_size=None):
+        sizes = [size for size in self.block_sizes
+                 if size <= blob_size and size % alignment == 0 and (max_size is None or size <= max_size)]
+        return sizes or [min(blob_size, max_size or blob_size) // alignment * alignment]
+
+    def _list_page_sizes(self, blob_count):
+        return sorted(set(min(size, 5000, blob_count) for size in (100, 1000, 5000)))
+
+    def _make_file(self, work_dir, size):
+        file_path = os.path.join(work_dir, 'upload' + str(size))
+        if not os.path.exists(file_path):
+            with open(file_path, 'wb') as file:
+                for chunk in self.random_data.iter_random_bytes(size):
+                    file.write(chunk)
+        return file_path
+
+    def _ensure_blobs(self, blockblob_service, container_name, prefix, blob_count, concurrency):
+        existing = sum(1 for blob in blockblob_service.list_blobs(container_name, prefix=prefix))
+        with ThreadPoolExecutor(max_workers=max(concurrency, 8)) as executor:
+            list(executor.map(lambda i: blockblob_service.create_blob_from_bytes(container_name, prefix + '{0:08d}'.format(i), b'x'),
+                              range(existing, blob_count)))
+
+    def _print_result(self, result):
+        print('{operation:<22} size {blob_size:>11} block {block_size:>9} x{concurrency:<3} '
+              '{mb_per_second:9.2f} MB/s {ops_per_second:9.1f} ops/s  '
+              'p50 {p50:8.2f} ms  p95 {p95:8.2f} ms  p99 {p99:8.2f} ms'.format(
+                  p50=result['latency_p50'] * 1000, p95=result['latency_p95'] * 1000, p99=result['latency_p99'] * 1000,
+                  **result))
+
+
+# Gets the nearest-rank percentile of a list of values
+def percentile(values, percent):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, int(-(-percent * len(ordered) // 100)))
+    return ordered[rank - 1]
+
+
+# Parses a size such as 512, 64K, 4M or 1G into bytes
+def parse_size(text):
+    multipliers = {'K': 1024, 'M': 1024 * 1024, 'G': 1024 * 1024 * 1024}
+    text = text.strip().upper().rstrip('B')
+    if text and text[-1] in multipliers:
+        return int(float(text[:-1]) * multipliers[text[-1]])
+    return int(text)
+
+
+def parse_list(text, parse=int):
+    return [parse(item) for item in text.split(',') if item.strip()]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the Azure Storage Blob sample operations.')
+    parser.add_argument('--operations', default=','.join(OPERATIONS), help='comma separated operations to run')
+    parser.add_argument('--blob-sizes', default='1M,16M', help='comma separated blob sizes, e.g. 1M,16M')
+    parser.add_argument('--block-sizes', default='256K,1M,4M', help='comma separated block/page/append sizes')
+    parser.add_argument('--concurrency', default='1,4,16', help='comma separated numbers of requests in flight')
+    parser.add_argument('--iterations', type=int, default=8, help='blobs uploaded, downloaded or listed per measurement')
+    parser.add_argument('--list-blob-counts', default='1000', help='comma separated container sizes for list_blobs')
+    parser.add_argument('--output', default='benchmark_results.json', help='file the JSON results are written to')
+    parser.add_argument('--fake', action='store_true', default=config.USE_FAKE_SERVICE, help='use the in-process fake Blob service')
+    parser.add_argument('--latency', type=float, default=config.FAKE_SERVICE_LATENCY, help='fake service latency in seconds')
+    parser.add_argument('--bandwidth', default=None, help='fake service bandwidth in bytes per second, e.g. 50M')
+    args = parser.parse_args()
+
+    if args.fake:
+        bandwidth = parse_size(args.bandwidth) if args.bandwidth else config.FAKE_SERVICE_BANDWIDTH
+        account = FakeStorageAccount(latency=args.latency, bandwidth=bandwidth)
+        target = 'fake (latency {0}s, bandwidth {1})'.format(args.latency, bandwidth)
+    else:
+        # Keep a pooled connection for every request in flight
+        factory = BlobServiceFactory(pool_size=max(parse_list(args.concurrency) + [config.CONNECTION_POOL_SIZE]))
+        if config.IS_EMULATED:
+            account = factory.get_account(is_emulated=True)
+            target = 'emulator'
+        else:
+            account = factory.get_account(config.STORAGE_ACCOUNT_NAME, config.STORAGE_ACCOUNT_KEY)
+            target = config.STORAGE_ACCOUNT_NAME
+
+    print('Azure Storage Blob benchmarks against ' + target)
+    started = datetime.datetime.utcnow().isoformat() + 'Z'
+    benchmarks = BlobBenchmarks(account,
+                                parse_list(args.blob_sizes, parse_size),
+                                parse_list(args.block_sizes, parse_size),
+                                parse_list(args.concurrency),
+                                args.iterations,
+                                parse_list(args.list_blob_counts))
+    results = benchmarks.run_all_benchmarks(parse_list(args.operations, str.strip))
+
+    with open(args.output, 'w') as output:
+        json.dump({'target': target,
+                   'started': started,
+                   'results': results}, output, indent=2)
+    print('Results written to ' + args.output)
+
+
+if __name__ == '__main__':
+    main()
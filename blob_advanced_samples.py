@@ -17,13 +17,26 @@
 import os
 import config
 from random_data import RandomData
-import base64
+from sample_runner import SampleRunner
+from resumable_uploader import ResumableBlockUploader
+from delta_uploader import DeltaBlockUploader
+from transfer_tuner import TransferTuner, AdaptiveBlockUploader
+from page_blob_writer import SparsePageBlobWriter
+from page_blob_backup import IncrementalPageBlobBackup
+from container_manager import ContainerManager
+from blob_lister import PrefetchingBlobLister
+from copy_orchestrator import BulkCopyOrchestrator
+from properties_cache import CachingBlobService
+from lease_manager import LeaseManager
+from sas_issuer import SasIssuer
+from acl_propagation import wait_for_access_policy
+import io
+import shutil
+import tempfile
 import datetime
-import time
-from azure.storage import CloudStorageAccount, AccessPolicy
-from azure.storage.blob import BlockBlobService, PageBlobService, AppendBlobService
+from azure.storage import AccessPolicy
 from azure.storage.models import CorsRule, Logging, Metrics, RetentionPolicy, ResourceTypes, AccountPermissions
-from azure.storage.blob.models import BlobBlock, ContainerPermissions, ContentSettings
+from azure.storage.blob.models import ContainerPermissions, ContentSettings
 #
 # Azure Storage Blob Sample - Demonstrate how to use the Blob Storage service. 
 # Blob storage stores unstructured data such as text, binary data, documents or media files. 
@@ -43,60 +56,55 @@ class BlobAdvancedSamples():
     def __init__(self):
         self.random_data = RandomData()
 
+    # Gets the samples as a list of (title, function taking the account, exclusive). Each sample uses
+    # its own containers, exclusive ones change the properties of the whole Blob service and must not
+    # run at the same time as another sample (see sample_runner.py).
+    def get_scenarios(self):
+        scenarios = [
+            ('Container operations', self.list_containers, False),
+            ('Set CORS', self.set_cors_rules, True),
+            ('Container lease', self.lease_container, False),
+            ('Copy blob', self.copy_blob, False),
+            ('Page blob operations', self.page_blob_operations, False),
+            ('Incremental page blob backup', self.incremental_backup_operations, False),
+            ('Block blob operations', self.block_blob_operations, False),
+            ('Block blob upload with autotuned concurrency and block size', self.adaptive_upload_operations, False),
+            ('Delta upload of a block blob', self.delta_upload_operations, False),
+            ('Properties and Metadata operations', self.properties_and_metadata_operations, False),
+            ('Container ACL operations', self.container_acl_operations, False),
+            ('Blob lease', self.lease_blob, False),
+        ]
+
+        # Shared Access Signature is not supported in the fake service and the emulator
+        if not config.USE_FAKE_SERVICE and not config.IS_EMULATED:
+            scenarios += [
+                ('Container with SAS operations', self.container_operations_with_sas, False),
+                ('SAS with access policy', self.sas_with_container_access_policy, False),
+                ('Set blob service logging and metrics properties', self.set_service_properties, True),
+            ]
+        return scenarios
+
     # Runs all samples for Azure Storage Blob service.
     # Input Arguments:
-    # account - CloudStorageAccount to use for running the samples
+    # account - PooledStorageAccount (see service_factory.py) to use for running the samples
     def run_all_samples(self, account):
         print('\n\nAzure Storage Blob advanced sample - Starting.')
-        
-        try:
-            print('\n\n* Container operations *\n')
-            self.list_containers(account)
 
-            print('\n\n* Set CORS *\n')
-            self.set_cors_rules(account)
+        # Every scenario uses its own containers, so they run in parallel and a failure does not stop the others
+        results = SampleRunner(max_parallel=config.SAMPLE_PARALLELISM).run(account, self.get_scenarios())
 
-            print('\n\n* Container lease *\n')
-            self.lease_container(account)
-
-            print('\n\n* Copy blob *\n')
-            self.copy_blob(account)
-            
-            print('\n\n* Page blob operations *\n')
-            self.page_blob_operations(account)
-            
-            print('\n\n* Block blob operations *\n')
-            self.block_blob_operations(account)
+        if (config.USE_FAKE_SERVICE):
+            print('\nShared Access Signature is not supported in the fake service');
+        elif (config.IS_EMULATED):
+            print('\nShared Access Signature is not supported in emulator');
 
-            print('\n\n* Properties and Metadata operations *\n')
-            self.properties_and_metadata_operations(account)
-            
-            print('\n\n* Container ACL operations *\n')
-            self.container_acl_operations(account)
-
-            print('\n\n* Blob lease *\n')
-            self.lease_blob(account)  
-            
+        if not all(result.is_successful() for result in results):
             if (config.IS_EMULATED):
-                print('\nShared Access Signature is not supported in emulator');
-            else:
-                print('\n\n* Container with SAS operations *\n')
-                self.container_operations_with_sas(account)      
-  
-                print('\n\n* SAS with access policy *\n')
-                self.sas_with_container_access_policy(account)
-
-                print('\n\n* Set blob service logging and metrics properties *\n')
-                self.set_service_properties(account)
-
-        except Exception as e:
-            if (config.IS_EMULATED):
-                print('Error occurred in the sample. If you are using the emulator, please make sure the emulator is running.', e)
+                print('Error occurred in the sample. If you are using the emulator, please make sure the emulator is running.')
             else: 
-                print('Error occurred in the sample. Please make sure the account name and key are correct.', e)
+                print('Error occurred in the sample. Please make sure the account name and key are correct.')
 
-        finally:
-            print('\nAzure Storage Blob advanced sample - Completed.\n')
+        print('\nAzure Storage Blob advanced sample - Completed.\n')
 
 
     # Copy a source blob to a destination blob
@@ -122,8 +130,10 @@ class BlobAdvancedSamples():
             target_blob = "target.png"
             blob_source_url = blockblob_service.make_blob_url(container_name, file_upload)
 
-            print('3. Copy blob')
-            blockblob_service.copy_blob(container_name, target_blob, blob_source_url)
+            print('3. Copy blob and wait for the copy to complete')
+            report = BulkCopyOrchestrator(blockblob_service, initial_poll_interval=0.2).copy_blobs(
+                [(blob_source_url, container_name, target_blob)])
+            print('Copied ' + str(report.bytes_copied) + ' bytes with ' + str(report.requests) + ' requests')
 
             print('4. Get target blob')
             target_blob_properties = blockblob_service.get_blob_properties(container_name, target_blob)
@@ -135,12 +145,11 @@ class BlobAdvancedSamples():
 
             if(copy_properties.status == "pending"):
                 print('6. Abort copy')
-                blockblob_service.abort_copy_blob(container_name, blob_name, copy_properties.id)
+                blockblob_service.abort_copy_blob(container_name, target_blob, copy_properties.id)
         finally:
             # Delete the container
             print("7. Delete Container")
-            if blockblob_service.exists(container_name):
-                blockblob_service.delete_container(container_name)
+            blockblob_service.delete_container(container_name)
 
     def sas_with_container_access_policy(self, account):
         container_name = 'demosasblobcontainer' + self.random_data.get_random_name(6)
@@ -161,23 +170,19 @@ class BlobAdvancedSamples():
             identifiers = {'id': access_policy}
             acl = blockblob_service.set_container_acl(container_name, identifiers)
 
-            # Wait 30 seconds for acl to propagate
-            print('Wait 30 seconds for acl to propagate')
-            time.sleep(30)
-
             print('4. Get sas for access policy in container')
             # Indicates to use the access policy set on the container
-            sas = blockblob_service.generate_container_shared_access_signature(
-                container_name,
-                id='id'
-            )
+            sas_issuer = SasIssuer(blockblob_service, account)
+            sas = sas_issuer.get_container_sas(container_name, id='id')
 
             print('5. Create blob service with sas')
-            # Create a service and use the SAS
-            shared_blockblob_service = BlockBlobService(
-                account_name=account.account_name,
-                sas_token=sas,
-            )
+            # Get the service of the SAS, created once and reused for every later call with the same SAS
+            shared_blockblob_service = sas_issuer.get_service(sas)
+
+            # The policy can take up to 30 seconds to be in effect, probe until the SAS is accepted
+            print('Wait for acl to propagate')
+            if not wait_for_access_policy(shared_blockblob_service, container_name, timeout=30):
+                print('The access policy is not in effect after 30 seconds, reading may fail')
 
             print('6. Read blob content with sas')
             blob = shared_blockblob_service.get_blob_to_text(container_name, 'blob1')
@@ -194,16 +199,17 @@ class BlobAdvancedSamples():
         # Create a Block Blob Service object
         blockblob_service = account.create_block_blob_service()
         
+        # Signed SAS and the services using them are cached by the issuer until the SAS nears its expiry
+        sas_issuer = SasIssuer(blockblob_service, account, lifetime=3600)
+
         # Create a Shared Access Signature for the account
         print('1.Get account sas')
         
-        account_sas = blockblob_service.generate_account_shared_access_signature(
+        account_sas = sas_issuer.get_account_sas(
             ResourceTypes.CONTAINER + ResourceTypes.OBJECT, 
-            AccountPermissions.READ + AccountPermissions.WRITE + AccountPermissions.DELETE + AccountPermissions.LIST + AccountPermissions.CREATE, 
-            datetime.datetime.utcnow() + datetime.timedelta(hours=1))
+            AccountPermissions.READ + AccountPermissions.WRITE + AccountPermissions.DELETE + AccountPermissions.LIST + AccountPermissions.CREATE)
 
-        shared_account = CloudStorageAccount(account_name=account.account_name, sas_token=account_sas)
-        shared_account_block_service = shared_account.create_block_blob_service()
+        shared_account_block_service = sas_issuer.get_service(account_sas)
 
         try:
             print('2. Create container with account sas. Container name - ' + container_name)
@@ -212,26 +218,28 @@ class BlobAdvancedSamples():
             # For the purposes of the demo, get a Container SAS
             # In a real-world application, the above Account SAS can be used
             print('3. Get container sas')
-            container_sas = blockblob_service.generate_container_shared_access_signature(
+            container_sas = sas_issuer.get_container_sas(
                 container_name, 
-                ContainerPermissions.READ + ContainerPermissions.WRITE + ContainerPermissions.DELETE + ContainerPermissions.LIST, 
-                datetime.datetime.utcnow() + datetime.timedelta(hours=1))
+                ContainerPermissions.READ + ContainerPermissions.WRITE + ContainerPermissions.DELETE + ContainerPermissions.LIST)
             
-            shared_container_account = CloudStorageAccount(account_name=account.account_name, sas_token=container_sas)
-            shared_container_block_service = shared_container_account.create_block_blob_service()
+            shared_container_block_service = sas_issuer.get_service(container_sas)
             
             print('4. Create blob with container sas')
             shared_container_block_service.create_blob_from_text(container_name, 'myblob', 'blob data')
             
             print('5. List blobs with container sas')
-            blobs = shared_container_block_service.list_blobs(container_name)
+            blobs = list(PrefetchingBlobLister(shared_container_block_service).list_blobs(container_name))
             for blob in blobs:
                 print('blob ' + blob.name)
             
-            print('6. Delete blob with container sas')
+            print('6. Sign read URLs for the blobs')
+            for url in sas_issuer.sign_blob_urls(container_name, [blob.name for blob in blobs]):
+                print('url ' + url)
+
+            print('7. Delete blob with container sas')
             shared_container_block_service.delete_blob(container_name, 'myblob')
         finally:            
-            print('7. Delete container')
+            print('8. Delete container')
             blockblob_service.delete_container(container_name)
             
         print("Containers Sas sample completed")
@@ -243,12 +251,14 @@ class BlobAdvancedSamples():
         # Create a Block Blob Service object
         blockblob_service = account.create_block_blob_service()
 
+        container_names = [container_prefix + str(i) for i in range(5)]
+        container_manager = ContainerManager(blockblob_service)
+
         try:
             # Create containers
-            for i in range(5):
-                container_name = container_prefix + str(i)
+            for container_name in container_names:
                 print('1. Create a container with name - ' + container_name)
-                blockblob_service.create_container(container_name)
+            container_manager.create_containers(container_names)
             
             # List all the blobs in the container 
             print('2. List containers with prefix ' + container_prefix)
@@ -258,10 +268,7 @@ class BlobAdvancedSamples():
         finally:
             # Delete the containers
             print("3. Delete Containers")
-            for i in range(5):
-                container_name = container_prefix + str(i)
-                if blockblob_service.exists(container_name):
-                    blockblob_service.delete_container(container_name)
+            container_manager.delete_containers(container_names)
             
         print("Containers sample completed")
 
@@ -299,8 +306,8 @@ class BlobAdvancedSamples():
         file_blob_name = "HelloWorld.png"
         text_blob_name = "Text"
          
-        # Create a Block Blob Service object
-        blockblob_service = account.create_block_blob_service()
+        # Create a Block Blob Service object that caches properties and metadata
+        blockblob_service = CachingBlobService(account.create_block_blob_service())
 
         container_name = 'blockblobbasicscontainer' + self.random_data.get_random_name(6)
 
@@ -342,11 +349,20 @@ class BlobAdvancedSamples():
             
             print('    Properties:')
             print('        Content-Type:' + blob.properties.content_settings.content_type)
+
+            # Reading the properties again is served from the cache, updating the metadata invalidates it
+            print('5. Update Blob metadata and get it again')
+            blockblob_service.get_blob_properties(container_name, file_blob_name)
+            blockblob_service.set_blob_metadata(container_name, file_blob_name, {'category':'azure-samples', 'updated':'true'})
+            metadata = blockblob_service.get_blob_metadata(container_name, file_blob_name)
+            print('    Metadata:')
+            for key in metadata:
+                print('        ' + key + ':' + metadata[key])
+            print('    Cache hits: ' + str(blockblob_service.hits) + ', misses: ' + str(blockblob_service.misses))
         finally:            
             # Delete the container
-            print("5. Delete Container")
-            if blockblob_service.exists(container_name):
-                blockblob_service.delete_container(container_name)
+            print("6. Delete Container")
+            blockblob_service.delete_container(container_name)
         
     # Set CORS
     def set_cors_rules(self, account):
@@ -379,22 +395,31 @@ class BlobAdvancedSamples():
         # Create a Block Blob Service object
         blockblob_service = account.create_block_blob_service()
         
+        container_name = 'blockblobcontainer' + self.random_data.get_random_name(6)
+        deleted = False
+
         try:
-            container_name = 'blockblobcontainer' + self.random_data.get_random_name(6)
             print('1. Create a container with name - ' + container_name)
             blockblob_service.create_container(container_name)
 
+            # The lease manager renews the lease in the background until the end of the with block, where
+            # releasing the lease of the container deleted with it is skipped
             print('2. Acquire lease on container')
-            lease_id = blockblob_service.acquire_container_lease(container_name, lease_duration=15)
-
-            print("3. Deleted container without lease")
-            try:
-                blockblob_service.delete_container(container_name)
-            except:
-                print('Got expected exception. Cannot delete container, lease not specified')
+            with LeaseManager() as lease_manager:
+                with lease_manager.lease_container(blockblob_service, container_name, lease_duration=15) as lease:
+                    print("3. Deleted container without lease")
+                    try:
+                        blockblob_service.delete_container(container_name)
+                    except:
+                        print('Got expected exception. Cannot delete container, lease not specified')
+
+                    print("4. Delete container with lease")
+                    blockblob_service.delete_container(container_name, lease_id=lease.lease_id)
+                    deleted = True
         finally:
-            print("4. Delete container with lease")
-            blockblob_service.delete_container(container_name, lease_id=lease_id)
+            # A failed step leaves the container behind, the lease is released by then
+            if not deleted:
+                blockblob_service.delete_container(container_name)
 
         print("Lease container sample completed")
 
@@ -416,33 +441,36 @@ class BlobAdvancedSamples():
             blob = self.random_data.get_random_bytes(255)
             blockblob_service.create_blob_from_bytes(container_name, blob_name, blob)
             
+            # The lease manager renews the lease in the background, so the exclusive write can take
+            # longer than the 15 second lease, and releases it at the end of the with block unless
+            # the blob was deleted with it
             print('3. Acquire lease on blob')
-            lease_id = blockblob_service.acquire_blob_lease(container_name, blob_name, lease_duration=15)
-            
-            # Write to a block blob
-            print('4. Try to write to Block Blob without lease')
-            block_id = self.random_data.get_random_name(32)
-            block = self.random_data.get_random_bytes(255)
-            try:
-                blockblob_service.put_block(container_name, blob_name, block, block_id)
-            except:
-                print('Got expected exception. Cannot write blob, lease not specified')
-
-            print('5. Write to Block Blob with lease')
-            blockblob_service.put_block(container_name, blob_name, block, block_id, lease_id=lease_id)
-
-            print("6. Deleted blob without lease")
-            try:
-                blockblob_service.delete_blob(container_name, blob_name)
-            except:
-                print('Got expected exception. Cannot delete blob, lease not specified')
-
-            print("7. Delete blob with lease")
-            blockblob_service.delete_blob(container_name, blob_name, lease_id=lease_id)
+            with LeaseManager() as lease_manager:
+                with lease_manager.lease_blob(blockblob_service, container_name, blob_name, lease_duration=15) as lease:
+            
+                    # Write to a block blob
+                    print('4. Try to write to Block Blob without lease')
+                    block_id = self.random_data.get_random_name(32)
+                    block = self.random_data.get_random_bytes(255)
+                    try:
+                        blockblob_service.put_block(container_name, blob_name, block, block_id)
+                    except:
+                        print('Got expected exception. Cannot write blob, lease not specified')
+
+                    print('5. Write to Block Blob with lease')
+                    blockblob_service.put_block(container_name, blob_name, block, block_id, lease_id=lease.lease_id)
+
+                    print("6. Deleted blob without lease")
+                    try:
+                        blockblob_service.delete_blob(container_name, blob_name)
+                    except:
+                        print('Got expected exception. Cannot delete blob, lease not specified')
+
+                    print("7. Delete blob with lease")
+                    blockblob_service.delete_blob(container_name, blob_name, lease_id=lease.lease_id)
         finally:
             print("8. Delete container")
-            if blockblob_service.exists(container_name):
-                blockblob_service.delete_container(container_name)
+            blockblob_service.delete_container(container_name)
 
         print("Lease blob sample completed")
         
@@ -464,20 +492,11 @@ class BlobAdvancedSamples():
             print('2. Create a page blob')
             pageblob_service.create_blob(container_name, file_to_upload, page_size * 1024)
             
-            # Read the file
+            # Map the file and upload its non-empty pages, coalesced into ranges of up to 4 MB, with the
+            # number of requests in flight set by a tuner of its own, as other samples transfer at the same time
             print('3. Upload pages to page blob')
-            index = 0
-            with open(file_to_upload, "rb") as file:
-                file_bytes = file.read(page_size)
-                while len(file_bytes) > 0:
-                    if len(file_bytes) < page_size:
-                        file_bytes = bytes(file_bytes + bytearray(page_size - len(file_bytes)))
-                        
-                    pageblob_service.update_page(container_name, file_to_upload, file_bytes, index * page_size, index * page_size + page_size - 1)
-                    
-                    file_bytes = file.read(page_size)
-                    
-                    index = index + 1
+            writer = SparsePageBlobWriter(pageblob_service, tuner=TransferTuner(concurrency=2, block_size=256 * 1024))
+            writer.write_file(container_name, file_to_upload, file_to_upload)
             
             pages = pageblob_service.get_page_ranges(container_name, file_to_upload)
             
@@ -486,8 +505,46 @@ class BlobAdvancedSamples():
                 print('Page ' + str(page.start) + ' - ' + str(page.end))
         finally:
             print('5. Delete container')
-            if pageblob_service.exists(container_name):
-                pageblob_service.delete_container(container_name)
+            pageblob_service.delete_container(container_name)
+
+    # Back up a page blob twice, the second time downloading only the pages that changed, then restore it
+    def incremental_backup_operations(self, account):
+        blob_name = "disk.vhd"
+        
+        # Create an page blob service object
+        pageblob_service = account.create_page_blob_service()
+        container_name = 'pageblobcontainer' + self.random_data.get_random_name(6)
+        backup_dir = tempfile.mkdtemp()
+        backup = IncrementalPageBlobBackup(pageblob_service)
+
+        try:
+            # Create a new container
+            print('1. Create a container with name - ' + container_name)
+            pageblob_service.create_container(container_name)
+
+            print('2. Create a 4 MB page blob and write 64 KB of pages')
+            pageblob_service.create_blob(container_name, blob_name, 4 * 1024 * 1024)
+            pageblob_service.update_page(container_name, blob_name, self.random_data.get_random_bytes(64 * 1024), 0, 64 * 1024 - 1)
+
+            print('3. Full backup')
+            entry = backup.backup(container_name, blob_name, backup_dir)
+            print('    Snapshot ' + entry['snapshot'] + ', downloaded ' + str(entry['bytes']) + ' bytes')
+
+            print('4. Change 1 KB of pages and back up again')
+            pageblob_service.update_page(container_name, blob_name, self.random_data.get_random_bytes(1024), 4096, 5119)
+            entry = backup.backup(container_name, blob_name, backup_dir)
+            print('    Snapshot ' + entry['snapshot'] + ', downloaded ' + str(entry['bytes']) + ' bytes')
+
+            print('5. Restore the latest backup and compare it with the blob')
+            restored_path = os.path.join(backup_dir, 'restored.vhd')
+            backup.restore(backup_dir, restored_path)
+            with open(restored_path, 'rb') as restored:
+                blob = pageblob_service.get_blob_to_bytes(container_name, blob_name)
+                print('    Restored content matches: ' + str(restored.read() == blob.content))
+        finally:
+            print('6. Delete container')
+            pageblob_service.delete_container(container_name)
+            shutil.rmtree(backup_dir)
 
     #Block Blob Operations
     def block_blob_operations(self, account):
@@ -503,21 +560,11 @@ class BlobAdvancedSamples():
             print('1. Create a container with name - ' + container_name)
             blockblob_service.create_container(container_name)
             
-            blocks = []
-            
-            # Read the file
+            # Upload the blocks in parallel, then commit them in order. Block IDs are derived from the
+            # block offsets, so running the upload again after an interruption only sends the missing blocks.
             print('2. Upload file to block blob')
-            with open(file_to_upload, "rb") as file:
-                file_bytes = file.read(block_size)
-                while len(file_bytes) > 0:
-                    block_id = self.random_data.get_random_name(32) 
-                    blockblob_service.put_block(container_name, file_to_upload, file_bytes, block_id)                    
-                    
-                    blocks.append(BlobBlock(id=block_id))
-                    
-                    file_bytes = file.read(block_size)
-            
-            blockblob_service.put_block_list(container_name, file_to_upload, blocks)
+            uploader = ResumableBlockUploader(blockblob_service, block_size=block_size, max_workers=4)
+            uploader.upload_file(container_name, file_to_upload, file_to_upload)
             
             print('3. Get the block list')
             blockslist = blockblob_service.get_block_list(container_name, file_to_upload, None, 'all')
@@ -528,8 +575,69 @@ class BlobAdvancedSamples():
                 print('Block ' + block.id)
         finally:
             print('5. Delete container')
-            if blockblob_service.exists(container_name):
-                blockblob_service.delete_container(container_name)
+            blockblob_service.delete_container(container_name)
+
+    # Upload a file while the number of requests in flight and the block size adapt to the throughput
+    # of the link and back off when the service throttles
+    def adaptive_upload_operations(self, account):
+        blob_name = "large.bin"
+
+        # Create a Block Blob Service object
+        blockblob_service = account.create_block_blob_service()
+        container_name = 'blockblobcontainer' + self.random_data.get_random_name(6)
+        # The throughput measured by a tuner must only come from its own transfer
+        tuner = TransferTuner(concurrency=2, block_size=256 * 1024)
+        uploader = AdaptiveBlockUploader(blockblob_service, tuner)
+
+        with tempfile.NamedTemporaryFile(delete=False) as stream:
+            for data in self.random_data.iter_random_bytes(16 * 1024 * 1024, seed=2):
+                stream.write(data)
+
+        try:
+            # Create a new container
+            print('1. Create a container with name - ' + container_name)
+            blockblob_service.create_container(container_name)
+
+            print('2. Upload a 16 MB file')
+            blocks = uploader.upload_file(container_name, blob_name, stream.name)
+            print('    Committed ' + str(len(blocks)) + ' blocks')
+
+            print('3. Settings reached by the tuner')
+            print('    ' + str(tuner.concurrency) + ' requests in flight, blocks of ' + str(tuner.block_size) +
+                  ' bytes, ' + str(tuner.throttled) + ' throttled requests')
+        finally:
+            print('4. Delete container')
+            blockblob_service.delete_container(container_name)
+            os.remove(stream.name)
+
+    # Upload a modified version of a blob, sending only the blocks that changed
+    def delta_upload_operations(self, account):
+        blob_name = "dump.bin"
+
+        # Create a Block Blob Service object
+        blockblob_service = account.create_block_blob_service()
+        container_name = 'blockblobcontainer' + self.random_data.get_random_name(6)
+        uploader = DeltaBlockUploader(blockblob_service, min_block_size=16 * 1024, average_block_size=64 * 1024,
+                                      max_block_size=256 * 1024)
+
+        try:
+            # Create a new container
+            print('1. Create a container with name - ' + container_name)
+            blockblob_service.create_container(container_name)
+
+            print('2. Upload the first version of the blob')
+            data = bytearray(self.random_data.get_random_bytes(1024 * 1024, seed=1))
+            bytes_sent, bytes_reused = uploader.upload_stream(container_name, blob_name, io.BytesIO(data))
+            print('    Sent ' + str(bytes_sent) + ' bytes, reused ' + str(bytes_reused) + ' bytes')
+
+            # Content-defined blocks only change around the insertion
+            print('3. Insert data in the middle and upload the second version')
+            data[500000:500000] = b'inserted data'
+            bytes_sent, bytes_reused = uploader.upload_stream(container_name, blob_name, io.BytesIO(data))
+            print('    Sent ' + str(bytes_sent) + ' bytes, reused ' + str(bytes_reused) + ' bytes')
+        finally:
+            print('4. Delete container')
+            blockblob_service.delete_container(container_name)
 
     # Manage properties of the Blob service, including logging and metrics settings, and the default service version.
     def set_service_properties(self, account):
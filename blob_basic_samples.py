@@ -15,8 +15,15 @@
 #----------------------------------------------------------------------------------
 
 import os
+import shutil
+import tempfile
 import config
 from random_data import RandomData
+from sample_runner import SampleRunner
+from blob_lister import PrefetchingBlobLister
+from blob_downloader import ParallelRangeDownloader
+from append_blob_writer import BufferedAppendBlobWriter
+from content_cache import DiskCachingBlobService
 from azure.storage import CloudStorageAccount
 from azure.storage.blob import BlockBlobService, PageBlobService, AppendBlobService
 
@@ -39,39 +46,37 @@ class BlobBasicSamples():
 
     def __init__(self):
         self.random_data = RandomData()
+
+    # Gets the samples as a list of (title, function taking the account, exclusive), see sample_runner.py.
+    # Each sample uses its own container so none of them is exclusive.
+    def get_scenarios(self):
+        scenarios = [
+            ('Basic block blob operations', self.basic_blockblob_operations, False),
+            ('Basic page blob operations', self.basic_pageblob_operations, False),
+            ('Snapshot sample', self.basic_snapshot, False),
+        ]
+
+        # Append blob is not yet supported in the Emulator
+        if (config.IS_EMULATED == False or config.USE_FAKE_SERVICE):
+            scenarios.append(('Basic append blob operations', self.basic_appendblob_operations, False))
+        return scenarios
+
     # Runs all samples for Azure Storage Blob service.
     # Input Arguments:
     # account - CloudStorageAccount to use for running the samples
     def run_all_samples(self, account):
         print('\n\nAzure Storage Blob sample - Starting.')
-        
-        try:
-            # Block blob basics
-            print('\n\n* Basic block blob operations *\n')
-            self.basic_blockblob_operations(account)
-            
-            # Page blob basics
-            print('\n\n* Basic page blob operations *\n')
-            self.basic_pageblob_operations(account)
-            
-            # Snapshot
-            print('\n\n* Snapshot sample *\n')
-            self.basic_snapshot(account)
-
-            if (config.IS_EMULATED == False):
-                # Append blob basics
-                # Append blob is not yet supported in the Emulator
-                print('\n\n* Basic append blob operations *\n')
-                self.basic_appendblob_operations(account)
-            
-        except Exception as e:
+
+        # Every scenario uses its own containers, so they run in parallel and a failure does not stop the others
+        results = SampleRunner(max_parallel=config.SAMPLE_PARALLELISM).run(account, self.get_scenarios())
+
+        if not all(result.is_successful() for result in results):
             if (config.IS_EMULATED):
-                print('Error occurred in the sample. If you are using the emulator, please make sure the emulator is running.', e)
+                print('Error occurred in the sample. If you are using the emulator, please make sure the emulator is running.')
             else: 
-                print('Error occurred in the sample. Please make sure the account name and key are correct.', e)
+                print('Error occurred in the sample. Please make sure the account name and key are correct.')
 
-        finally:
-            print('\nAzure Storage Blob sample - Completed.\n')
+        print('\nAzure Storage Blob sample - Completed.\n')
             
     
     # Runs basic block blob samples for Azure Storage Blob service.
@@ -102,14 +107,17 @@ class BlobBasicSamples():
             
             # List all the blobs in the container 
             print('3. List Blobs in Container')
-            generator = blockblob_service.list_blobs(container_name)
+            # The lister fetches the next page of results in the background while this one is printed
+            generator = PrefetchingBlobLister(blockblob_service).list_blobs(container_name)
             for blob in generator:
                 print('\tBlob Name: ' + blob.name)
             
             # Download the blob
             print('4. Download the blob')
-            blockblob_service.get_blob_to_path(container_name, blob_name1, os.path.join(os.path.dirname(__file__), file_to_upload + '.copy.png'))
-            blockblob_service.get_blob_to_path(container_name, blob_name2, os.path.join(os.path.dirname(__file__), 'blob2.copy.txt'))
+            # Ranges of the blobs are downloaded in parallel straight into the local files
+            downloader = ParallelRangeDownloader(blockblob_service)
+            downloader.download_to_path(container_name, blob_name1, os.path.join(os.path.dirname(__file__), file_to_upload + '.copy.png'))
+            downloader.download_to_path(container_name, blob_name2, os.path.join(os.path.dirname(__file__), 'blob2.copy.txt'))
             
             # Delete the blobs, this can be ommited because the container is deleted
             print('5. Delete blobs')
@@ -118,8 +126,7 @@ class BlobBasicSamples():
         finally:            
             # Delete the container
             print("6. Delete Container")
-            if blockblob_service.exists(container_name):
-                blockblob_service.delete_container(container_name)
+            blockblob_service.delete_container(container_name)
         
     # Runs basic page blob samples for Azure Storage Blob service.
     # Input Arguments:
@@ -130,6 +137,7 @@ class BlobBasicSamples():
         # Create a block blob service object
         pageblob_service = account.create_page_blob_service()
         container_name = 'pageblobbasicscontainer' + self.random_data.get_random_name(6)
+        cache_dir = tempfile.mkdtemp()
 
         try:
             # Create a new container
@@ -142,16 +150,20 @@ class BlobBasicSamples():
             
             # List all the blobs in the container 
             print('3. List Blobs in Container')
-            blob_list = pageblob_service.list_blobs(container_name)
+            blob_list = PrefetchingBlobLister(pageblob_service).list_blobs(container_name)
             for blob in blob_list:
                 print('\tBlob Name: ' + blob.name)
                 
-            # Read a page blob
+            # Read a page blob through a local disk cache, the second read is served from the cache
             print('4. Reading a Page Blob')
-            readblob = pageblob_service.get_blob_to_bytes(container_name, # name of the container
-                                                        file_to_upload, # name of blob to read
-                                                        start_range=3,  # page to start reading from
-                                                        end_range=10)   # page to stop reading at
+            cached_pageblob_service = DiskCachingBlobService(pageblob_service, cache_dir)
+            for attempt in range(2):
+                readblob = cached_pageblob_service.get_blob_to_bytes(container_name, # name of the container
+                                                                     file_to_upload, # name of blob to read
+                                                                     start_range=3,  # page to start reading from
+                                                                     end_range=10)   # page to stop reading at
+            print('\tChunks read from the cache: ' + str(cached_pageblob_service.hits) +
+                  ', downloaded: ' + str(cached_pageblob_service.misses))
                     
             # Delete the blob, this can be ommited because the container is deleted
             print('5. Delete Page Blob')
@@ -159,8 +171,8 @@ class BlobBasicSamples():
         finally: 
             # Delete the container
             print("6. Delete Container")
-            if pageblob_service.exists(container_name):
-                pageblob_service.delete_container(container_name)
+            pageblob_service.delete_container(container_name)
+            shutil.rmtree(cache_dir)
 
      
     # Runs basic append blob samples for Azure Storage Blob service.
@@ -183,9 +195,11 @@ class BlobBasicSamples():
             appendblob_service.create_blob(container_name, file_to_upload)
             
             # Write to an append blob
+            # The records are buffered and appended as a single block when the writer is closed
             print('3. Write to Append Blob')
-            appendblob_service.append_blob_from_text(container_name, file_to_upload, '\tHello Append Blob world!\n')
-            appendblob_service.append_blob_from_text(container_name, file_to_upload, '\tHello Again Append Blob world!')
+            with BufferedAppendBlobWriter(appendblob_service, container_name, file_to_upload) as writer:
+                writer.write('\tHello Append Blob world!\n')
+                writer.write('\tHello Again Append Blob world!')
                     
             # List all the blobs in the container 
             print('4. List Blobs in Container')
@@ -204,8 +218,7 @@ class BlobBasicSamples():
         finally:            
             # Delete the container
             print("7. Delete Container")
-            if appendblob_service.exists(container_name):
-                appendblob_service.delete_container(container_name)
+            appendblob_service.delete_container(container_name)
 
 
     # Runs a snapthot sample for Azure Storage Blob service.
@@ -237,5 +250,4 @@ class BlobBasicSamples():
         finally:            
             # Delete the container
             print("4. Delete Container")
-            if blockblob_service.exists(container_name):
-                blockblob_service.delete_container(container_name)
\ No newline at end of file
+            blockblob_service.delete_container(container_name)
\ No newline at end of file
@@ -0,0 +1,99 @@
+#----------------------------------------------------------------------------------
+# Microsoft Developer & Platform Evangelism
+#
+# Copyright (c) Microsoft Corporation. All rights reserved.
+#
+# THIS CODE AND INFORMATION ARE PROVIDED "AS IS" WITHOUT WARRANTY OF ANY KIND,
+# EITHER EXPRESSED OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE IMPLIED WARRANTIES
+# OF MERCHANTABILITY AND/OR FITNESS FOR A PARTICULAR PURPOSE.
+#----------------------------------------------------------------------------------
+# The example companies, organizations, products, domain names,
+# e-mail addresses, logos, people, places, and events depicted
+# herein are fictitious.  No association with any real company,
+# organization, product, domain name, email address, logo, person,
+# places, or events is intended or should be inferred.
+#----------------------------------------------------------------------------------
+
+import mmap
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+# The service only returns an MD5 for ranges of up to 4 MB
+MAX_VALIDATED_RANGE_SIZE = 4 * 1024 * 1024
+
+#
+# Parallel ranged download - Splits a blob into byte ranges and fetches them concurrently straight
+# into their position in a preallocated local file. Each range is read with if_match on the ETag
+# from get_blob_properties, so a blob modified during the download fails instead of producing a
+# mixed file, and ranges of up to 4 MB are checked against the MD5 returned by the service.
+#
+class ParallelRangeDownloader():
+
+    # Input Arguments:
+    # blob_service - BlockBlobService, PageBlobService or AppendBlobService used to read the blob
+    # range_size - size in bytes of each range request
+    # max_workers - number of range requests kept in flight at once
+    def __init__(self, blob_service, range_size=MAX_VALIDATED_RANGE_SIZE, max_workers=8):
+        if range_size <= 0:
+            raise ValueError('range_size must be a positive number of bytes')
+        if max_workers <= 0:
+            raise ValueError('max_workers must be at least 1')
+
+        self.blob_service = blob_service
+        self.range_size = range_size
+        self.max_workers = max_workers
+
+    # Downloads a blob to a local file, replacing the file if it exists.
+    # Input Arguments:
+    # container_name - name of the container
+    # blob_name - name of the blob to download
+    # file_path - path of the local file to write
+    # snapshot - optional snapshot of the blob to download
+    # lease_id - required if the blob has an active lease
+    # Returns the Blob (without content) from get_blob_properties
+    def download_to_path(self, container_name, blob_name, file_path, snapshot=None, lease_id=None):
+        blob = self.blob_service.get_blob_properties(container_name, blob_name, snapshot=snapshot, lease_id=lease_id)
+        size = blob.properties.content_length
+        etag = blob.properties.etag
+        validate_content = self.range_size <= MAX_VALIDATED_RANGE_SIZE
+
+        with open(file_path, 'wb+') as file:
+            file.truncate(size)
+            if size == 0:
+                return blob
+
+            file_map = None
+            if hasattr(os, 'pwrite'):
+                fd = file.fileno()
+                def write_range(offset, data):
+                    view = memoryview(data)
+                    while len(view) > 0:
+                        written = os.pwrite(fd, view, offset)
+                        view = view[written:]
+                        offset += written
+            else:
+                file_map = mmap.mmap(file.fileno(), size)
+                def write_range(offset, data):
+                    file_map[offset:offset + len(data)] = data
+
+            def download_range(offset):
+                end = min(offset + self.range_size, size) - 1
+                # validate_content makes the SDK compare the range with its MD5 from the service
+                data = self.blob_service.get_blob_to_bytes(container_name, blob_name, snapshot=snapshot,
+                                                           start_range=offset, end_range=end,
+                                                           validate_content=validate_content, max_connections=1,
+                                                           lease_id=lease_id, if_match=etag).content
+                if len(data) != end - offset + 1:
+                    raise IOError('Expected {0} bytes at offset {1} of {2} but received {3}'.format(
+                        end - offset + 1, offset, blob_name, len(data)))
+                write_range(offset, data)
+
+            try:
+                with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                    # list() surfaces the first failed range
+                    list(executor.map(download_range, range(0, size, self.range_size)))
+            finally:
+                if file_map is not None:
+                    file_map.close()
+
+        return blob
@@ -0,0 +1,108 @@
+#----------------------------------------------------------------------------------
+# Microsoft Developer & Platform Evangelism
+#
+# Copyright (c) Microsoft Corporation. All rights reserved.
+#
+# THIS CODE AND INFORMATION ARE PROVIDED "AS IS" WITHOUT WARRANTY OF ANY KIND,
+# EITHER EXPRESSED OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE IMPLIED WARRANTIES
+# OF MERCHANTABILITY AND/OR FITNESS FOR A PARTICULAR PURPOSE.
+#----------------------------------------------------------------------------------
+# The example companies, organizations, products, domain names,
+# e-mail addresses, logos, people, places, and events depicted
+# herein are fictitious.  No association with any real company,
+# organization, product, domain name, email address, logo, person,
+# places, or events is intended or should be inferred.
+#----------------------------------------------------------------------------------
+
+import threading
+from collections import namedtuple
+from queue import Queue, Full
+from azure.storage.blob.models import BlobPrefix
+
+# A listed blob. metadata is only set when listing with Include.METADATA. For virtual directories
+# returned when listing with a delimiter, every field but name is None.
+BlobEntry = namedtuple('BlobEntry', ['name', 'size', 'etag', 'content_md5', 'metadata'])
+
+#
+# Prefetching blob lister - Lists the blobs of a container page by page while a background thread
+# already fetches the next page with the continuation marker, so the caller never waits for a
+# round trip while there are pages left. Blobs are returned as lightweight BlobEntry tuples.
+#
+class PrefetchingBlobLister():
+
+    # Input Arguments:
+    # blob_service - BlockBlobService, PageBlobService or AppendBlobService used to list the blobs
+    # num_results - number of blobs requested per page, up to 5000
+    # prefetch_pages - number of pages fetched ahead of the caller
+    def __init__(self, blob_service, num_results=5000, prefetch_pages=1):
+        if not 0 < num_results <= 5000:
+            raise ValueError('num_results must be between 1 and 5000')
+        if prefetch_pages <= 0:
+            raise ValueError('prefetch_pages must be at least 1')
+
+        self.blob_service = blob_service
+        self.num_results = num_results
+        self.prefetch_pages = prefetch_pages
+
+    # Lists the blobs of a container.
+    # Input Arguments:
+    # container_name - name of the container to list
+    # prefix - only list the blobs whose name starts with prefix
+    # delimiter - when set, blobs below a virtual directory are returned as one entry for the directory
+    # include - Include options passed to list_blobs (snapshots, metadata, uncommitted blobs, copy)
+    # Returns a generator of BlobEntry
+    def list_blobs(self, container_name, prefix=None, delimiter=None, include=None):
+        for page in self.list_blob_pages(container_name, prefix, delimiter, include):
+            for entry in page:
+                yield entry
+
+    # Lists the blobs of a container a page at a time.
+    # Takes the same arguments as list_blobs and returns a generator of lists of BlobEntry
+    def list_blob_pages(self, container_name, prefix=None, delimiter=None, include=None):
+        pages = Queue(maxsize=self.prefetch_pages)
+        stopped = threading.Event()
+
+        def fetch_pages():
+            marker = None
+            try:
+                while not stopped.is_set():
+                    page = self.blob_service.list_blobs(container_name, prefix=prefix, num_results=self.num_results,
+                                                        include=include, delimiter=delimiter, marker=marker)
+                    # With num_results set, iterating the generator stops at the end of this page
+                    put(('page', [self._to_entry(blob) for blob in page]))
+                    marker = page.next_marker
+                    if not marker:
+                        break
+                put(('done', None))
+            except Exception as e:
+                put(('error', e))
+
+        # Waits for room in the queue unless the caller stopped listening
+        def put(item):
+            while not stopped.is_set():
+                try:
+                    pages.put(item, timeout=0.1)
+                    return
+                except Full:
+                    pass
+
+        fetcher = threading.Thread(target=fetch_pages)
+        fetcher.daemon = True
+        fetcher.start()
+
+        try:
+            while True:
+                kind, value = pages.get()
+                if kind == 'done':
+                    break
+                if kind == 'error':
+                    raise value
+                yield value
+        finally:
+            stopped.set()
+
+    def _to_entry(self, blob):
+        if isinstance(blob, BlobPrefix):
+            return BlobEntry(blob.name, None, None, None, None)
+        return BlobEntry(blob.name, blob.properties.content_length, blob.properties.etag,
+                         blob.properties.content_settings.content_md5, blob.metadata or None)
@@ -0,0 +1,160 @@
+#----------------------------------------------------------------------------------
+# Microsoft Developer & Platform Evangelism
+#
+# Copyright (c) Microsoft Corporation. All rights reserved.
+#
+# THIS CODE AND INFORMATION ARE PROVIDED "AS IS" WITHOUT WARRANTY OF ANY KIND,
+# EITHER EXPRESSED OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE IMPLIED WARRANTIES
+# OF MERCHANTABILITY AND/OR FITNESS FOR A PARTICULAR PURPOSE.
+#----------------------------------------------------------------------------------
+# The example companies, organizations, products, domain names,
+# e-mail addresses, logos, people, places, and events depicted
+# herein are fictitious.  No association with any real company,
+# organization, product, domain name, email address, logo, person,
+# places, or events is intended or should be inferred.
+#----------------------------------------------------------------------------------
+
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from random_data import RandomData
+from mapped_file import MappedFile
+from azure.storage.blob.models import BlobBlock
+
+#
+# Parallel block upload - Sends the blocks of a block blob from several threads at once
+# and commits them in file order with a single put_block_list call.
+# The number of blocks read from the source but not yet acknowledged by the service is bounded,
+# so memory use stays at roughly block_size * (max_workers + max_pending_blocks)
+# no matter how large the uploaded file is. put_blocks is the engine shared by the other block
+# uploaders (resumable, delta and adaptive uploads), which only decide which blocks to send.
+#
+class ParallelBlockUploader():
+
+    # Input Arguments:
+    # blockblob_service - BlockBlobService used to put and commit the blocks
+    # block_size - size in bytes of each block (the service allows up to 100 MB per block)
+    # max_workers - number of put_block requests kept in flight at once
+    # max_pending_blocks - blocks read ahead of the workers, defaults to max_workers
+    # tuner - TransferTuner (see transfer_tuner.py) that sets the number of requests in flight
+    #         instead of max_workers and measures every put_block
+    def __init__(self, blockblob_service, block_size=4 * 1024 * 1024, max_workers=8, max_pending_blocks=None, tuner=None):
+        if block_size <= 0:
+            raise ValueError('block_size must be a positive number of bytes')
+        if max_workers <= 0:
+            raise ValueError('max_workers must be at least 1')
+
+        self.blockblob_service = blockblob_service
+        self.block_size = block_size
+        self.max_workers = max_workers
+        self.max_pending_blocks = max_pending_blocks if max_pending_blocks is not None else max_workers
+        self.tuner = tuner
+        self.random_data = RandomData()
+
+    # Uploads a local file to a block blob. The file is memory-mapped and each worker copies its
+    # block straight from the map, so at most max_workers blocks are held in memory.
+    # Input Arguments:
+    # container_name - name of an existing container
+    # blob_name - name of the blob to create or overwrite
+    # file_path - path of the file to upload
+    # put_block_list_kwargs - extra arguments for put_block_list (content_settings, metadata, lease_id...)
+    # Returns the committed list of BlobBlock
+    def upload_file(self, container_name, blob_name, file_path, **put_block_list_kwargs):
+        with MappedFile(file_path) as source:
+            offsets = range(0, source.size, self.block_size)
+            blocks = [BlobBlock(id=self.random_data.get_random_name(32)) for _ in offsets]
+            self.put_blocks(container_name, blob_name,
+                            ((block.id, functools.partial(source.read, offset, self.block_size))
+                             for offset, block in zip(offsets, blocks)),
+                            put_block_list_kwargs.get('lease_id'))
+
+        self.blockblob_service.put_block_list(container_name, blob_name, blocks, **put_block_list_kwargs)
+        return blocks
+
+    # Uploads the content of a readable binary stream to a block blob.
+    # Input Arguments:
+    # container_name - name of an existing container
+    # blob_name - name of the blob to create or overwrite
+    # stream - readable binary stream, read sequentially block_size bytes at a time
+    # put_block_list_kwargs - extra arguments for put_block_list (content_settings, metadata, lease_id...)
+    # Returns the committed list of BlobBlock
+    def upload_stream(self, container_name, blob_name, stream, **put_block_list_kwargs):
+        blocks = []
+
+        def read_blocks():
+            while True:
+                block_bytes = stream.read(self.block_size)
+                if len(block_bytes) == 0:
+                    return
+                block = BlobBlock(id=self.random_data.get_random_name(32))
+                blocks.append(block)
+                yield block.id, block_bytes
+
+        self.put_blocks(container_name, blob_name, read_blocks(), put_block_list_kwargs.get('lease_id'))
+        self.blockblob_service.put_block_list(container_name, blob_name, blocks, **put_block_list_kwargs)
+        return blocks
+
+    # Sends blocks with put_block from the worker threads without committing them. The next block
+    # is only taken from blocks once a slot is free, so a generator reading its blocks as it goes
+    # holds no more blocks in memory than there are slots. No block is taken after the first failure
+    # and the queued ones are cancelled; the failure is raised once the blocks being sent are done.
+    # Input Arguments:
+    # container_name - name of an existing container
+    # blob_name - name of the blob the blocks are for
+    # blocks - iterable of (block ID, block bytes or a function returning them on the worker thread)
+    # lease_id - ID of the active lease of the blob, if any
+    def put_blocks(self, container_name, blob_name, blocks, lease_id=None):
+        # Each slot is one block either queued or being sent
+        in_flight = [0]
+        condition = threading.Condition()
+        errors = []
+        futures = []
+
+        def release_slot(future):
+            with condition:
+                if not future.cancelled() and future.exception() is not None:
+                    errors.append(future.exception())
+                in_flight[0] -= 1
+                condition.notify()
+
+        max_workers = self.max_workers if self.tuner is None else self.tuner.max_concurrency
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            iterator = iter(blocks)
+            while True:
+                with condition:
+                    while not errors and in_flight[0] >= self._get_slot_count():
+                        condition.wait()
+                    if errors:
+                        break
+                    in_flight[0] += 1
+                block = next(iterator, None)
+                # A block can fail while the next one is read
+                if block is None or errors:
+                    break
+
+                future = executor.submit(self._put_block, container_name, blob_name, block[0], block[1], lease_id)
+                future.add_done_callback(release_slot)
+                futures.append(future)
+
+            # The blocks still queued are not sent after a failure
+            if errors:
+                for future in futures:
+                    future.cancel()
+
+        # Leaving the executor waits for the blocks being sent; surface the first failure before committing
+        if errors:
+            raise errors[0]
+
+    # The tuner changes its concurrency as the upload goes, blocks are not queued behind it
+    def _get_slot_count(self):
+        if self.tuner is None:
+            return self.max_workers + self.max_pending_blocks
+        return self.tuner.concurrency
+
+    def _put_block(self, container_name, blob_name, block_id, block, lease_id):
+        block_bytes = block() if callable(block) else block
+        if self.tuner is None:
+            self.blockblob_service.put_block(container_name, blob_name, block_bytes, block_id, lease_id=lease_id)
+        else:
+            self.tuner.run(len(block_bytes), self.blockblob_service.put_block, container_name, blob_name,
+                           block_bytes, block_id, lease_id=lease_id)
@@ -18,4 +18,22 @@
 
 STORAGE_ACCOUNT_NAME = ''
 STORAGE_ACCOUNT_KEY = ''
-IS_EMULATED = True
\ No newline at end of file
+IS_EMULATED = True
+
+# Number of keep-alive connections the samples keep open to the storage endpoint (service_factory.py).
+# Match it to the concurrency of the parallel transfers.
+CONNECTION_POOL_SIZE = 16
+
+# Set USE_FAKE_SERVICE to True to run the samples against the in-process fake Blob service (fake_blob_service.py)
+# instead of the emulator or a storage account. The fake adds FAKE_SERVICE_LATENCY seconds to every request
+# and shares FAKE_SERVICE_BANDWIDTH bytes per second (None for unlimited) between all transfers.
+USE_FAKE_SERVICE = False
+FAKE_SERVICE_LATENCY = 0.0
+FAKE_SERVICE_BANDWIDTH = None
+
+# Number of sample scenarios start.py runs at the same time (sample_runner.py), 1 runs them one after the other.
+SAMPLE_PARALLELISM = 4
+
+# Set METRICS_FILE to a path to record the count, latency, retries, bytes and errors of every Blob service call
+# made by the samples (instrumentation.py). Paths ending in .prom are written in the Prometheus text format, others as JSON.
+METRICS_FILE = None
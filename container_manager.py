@@ -0,0 +1,78 @@
+#----------------------------------------------------------------------------------
+# Microsoft Developer & Platform Evangelism
+#
+# Copyright (c) Microsoft Corporation. All rights reserved.
+#
+# THIS CODE AND INFORMATION ARE PROVIDED "AS IS" WITHOUT WARRANTY OF ANY KIND,
+# EITHER EXPRESSED OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE IMPLIED WARRANTIES
+# OF MERCHANTABILITY AND/OR FITNESS FOR A PARTICULAR PURPOSE.
+#----------------------------------------------------------------------------------
+# The example companies, organizations, products, domain names,
+# e-mail addresses, logos, people, places, and events depicted
+# herein are fictitious.  No association with any real company,
+# organization, product, domain name, email address, logo, person,
+# places, or events is intended or should be inferred.
+#----------------------------------------------------------------------------------
+
+from concurrent.futures import ThreadPoolExecutor
+
+#
+# Container manager - Creates and deletes batches of containers concurrently.
+# Deletes are optimistic: delete_container is called directly and a container that does not
+# exist counts as deleted, so there is no exists() round trip before each delete.
+#
+class ContainerManager():
+
+    # Input Arguments:
+    # blob_service - BlockBlobService, PageBlobService or AppendBlobService used for the container calls
+    # max_workers - number of container requests kept in flight at once
+    def __init__(self, blob_service, max_workers=16):
+        if max_workers <= 0:
+            raise ValueError('max_workers must be at least 1')
+
+        self.blob_service = blob_service
+        self.max_workers = max_workers
+
+    # Creates containers concurrently.
+    # Input Arguments:
+    # container_names - names of the containers to create
+    # metadata - optional metadata set on every container
+    # public_access - optional public access level set on every container
+    # Returns a dict mapping each name to True if it was created, False if it already existed
+    def create_containers(self, container_names, metadata=None, public_access=None):
+        return self._run(container_names,
+                         lambda name: self.blob_service.create_container(name, metadata=metadata, public_access=public_access))
+
+    # Deletes containers concurrently, a container that does not exist is not an error.
+    # Input Arguments:
+    # container_names - names of the containers to delete
+    # Returns a dict mapping each name to True if it was deleted, False if it did not exist
+    def delete_containers(self, container_names):
+        return self._run(container_names,
+                         lambda name: self.blob_service.delete_container(name, fail_not_exist=False))
+
+    # Deletes every container whose name starts with prefix.
+    # Input Arguments:
+    # prefix - prefix of the container names to delete
+    # Returns a dict mapping each name to True if it was deleted, False if it was already gone
+    def delete_containers_with_prefix(self, prefix):
+        container_names = [container.name for container in self.blob_service.list_containers(prefix)]
+        return self.delete_containers(container_names)
+
+    # Calls operation for every name and waits for all of them, even if some fail,
+    # then raises the first failure
+    def _run(self, container_names, operation):
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = [(name, executor.submit(operation, name)) for name in container_names]
+
+        results = {}
+        errors = []
+        for name, future in futures:
+            if future.exception() is not None:
+                errors.append(future.exception())
+            else:
+                results[name] = future.result()
+
+        if errors:
+            raise errors[0]
+        return results
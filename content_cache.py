@@ -0,0 +1,292 @@
+#----------------------------------------------------------------------------------
+# Microsoft Developer & Platform Evangelism
+#
+# Copyright (c) Microsoft Corporation. All rights reserved.
+#
+# THIS CODE AND INFORMATION ARE PROVIDED "AS IS" WITHOUT WARRANTY OF ANY KIND,
+# EITHER EXPRESSED OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE IMPLIED WARRANTIES
+# OF MERCHANTABILITY AND/OR FITNESS FOR A PARTICULAR PURPOSE.
+#----------------------------------------------------------------------------------
+# The example companies, organizations, products, domain names,
+# e-mail addresses, logos, people, places, and events depicted
+# herein are fictitious.  No association with any real company,
+# organization, product, domain name, email address, logo, person,
+# places, or events is intended or should be inferred.
+#----------------------------------------------------------------------------------
+
+import copy
+import hashlib
+import os
+import re
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from azure.common import AzureHttpError
+from azure.storage.blob.models import Blob
+from properties_cache import READ_ONLY_METHODS, invalidating
+
+# Names of the directories of the blob versions (SHA-1 in hexadecimal) and of the chunks they hold
+# (index of the chunk), anything else in the cache directory is left alone
+_BLOB_DIRECTORY_NAME = re.compile('[0-9a-f]{40}')
+_CHUNK_NAME = re.compile('[0-9]+')
+
+#
+# Disk caching blob service - Wraps a Block, Page or Append Blob service and serves blob content
+# from a local cache directory. Content is stored in fixed-size chunks keyed by container, blob,
+# snapshot and ETag, so a ranged read only downloads the chunks it does not have and a changed
+# blob never returns stale chunks. The ETag of a blob is trusted for ttl seconds, then revalidated
+# with a conditional request (If-None-Match) that the service answers with 304 Not Modified when
+# the blob is unchanged. Chunks are downloaded with If-Match on the ETag. The directory is capped
+# at max_size bytes and the least recently used chunks are removed first; chunks left by earlier
+# processes are reused, only files laid out as chunks are indexed and evicted. The read methods
+# take the arguments of the SDK: reads with access conditions other than If-Match on the current
+# ETag go to the service, and max_connections is ignored as chunks are read one after the other.
+# Every other method is passed to the wrapped service, and a method that writes drops what is
+# known about the container and blob it was called for.
+#
+class DiskCachingBlobService():
+
+    # Input Arguments:
+    # blob_service - BlockBlobService, PageBlobService or AppendBlobService to wrap
+    # cache_dir - directory holding the chunks, created if it does not exist
+    # max_size - most bytes of chunks kept in cache_dir
+    # chunk_size - size of the chunks, reads are rounded out to whole chunks
+    # ttl - seconds the ETag of a blob is used without revalidating it
+    def __init__(self, blob_service, cache_dir, max_size=1024 * 1024 * 1024, chunk_size=4 * 1024 * 1024, ttl=30.0):
+        if chunk_size <= 0 or max_size < chunk_size:
+            raise ValueError('chunk_size must be positive and no larger than max_size')
+
+        self.blob_service = blob_service
+        self.cache_dir = cache_dir
+        self.max_size = max_size
+        self.chunk_size = chunk_size
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.revalidations = 0
+
+        # (container_name, blob_name, snapshot) -> [time checked, Blob without content]
+        self._blobs = {}
+        # chunk path -> size, least recently used first
+        self._chunks = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+        if not os.path.isdir(cache_dir):
+            os.makedirs(cache_dir)
+        self._load_chunks()
+
+    # Gets a blob or a range of it with its content as bytes, see BaseBlobService.get_blob_to_bytes.
+    # start_range and end_range are inclusive byte offsets, the whole blob is read when start_range is None.
+    def get_blob_to_bytes(self, container_name, blob_name, snapshot=None, start_range=None, end_range=None,
+                          validate_content=False, progress_callback=None, max_connections=2, lease_id=None,
+                          if_modified_since=None, if_unmodified_since=None, if_match=None, if_none_match=None, timeout=None):
+        # Only the service can evaluate conditions on dates or on other versions of the blob
+        if if_modified_since is not None or if_unmodified_since is not None or if_none_match is not None:
+            return self.blob_service.get_blob_to_bytes(container_name, blob_name, snapshot, start_range, end_range,
+                                                       validate_content, progress_callback, max_connections, lease_id,
+                                                       if_modified_since, if_unmodified_since, if_match, if_none_match,
+                                                       timeout)
+
+        for attempt in range(2):
+            blob = self._get_blob(container_name, blob_name, snapshot, lease_id, timeout)
+            if if_match not in (None, '*', blob.properties.etag):
+                return self.blob_service.get_blob_to_bytes(container_name, blob_name, snapshot, start_range, end_range,
+                                                           validate_content, progress_callback, max_connections,
+                                                           lease_id, if_match=if_match, timeout=timeout)
+            size = blob.properties.content_length
+            start = start_range or 0
+            end = size - 1 if end_range is None else min(end_range, size - 1)
+            if start_range is not None and start >= size:
+                raise ValueError('start_range is past the end of the blob')
+
+            try:
+                content = self._read(container_name, blob_name, snapshot, lease_id, blob, start, end, validate_content,
+                                     progress_callback, timeout)
+                break
+            except AzureHttpError as e:
+                # The blob changed since its ETag was checked, check it again once
+                if e.status_code != 412 or attempt == 1:
+                    raise
+                self.invalidate(container_name, blob_name)
+
+        properties = copy.copy(blob.properties)
+        properties.content_length = len(content)
+        if start_range is not None:
+            properties.content_range = 'bytes {0}-{1}/{2}'.format(start, end, size)
+        return Blob(blob.name, snapshot, content, properties, blob.metadata)
+
+    def get_blob_to_text(self, container_name, blob_name, encoding='utf-8', snapshot=None, start_range=None, end_range=None,
+                         validate_content=False, progress_callback=None, max_connections=2, lease_id=None,
+                         if_modified_since=None, if_unmodified_since=None, if_match=None, if_none_match=None, timeout=None):
+        blob = self.get_blob_to_bytes(container_name, blob_name, snapshot, start_range, end_range, validate_content,
+                                      progress_callback, max_connections, lease_id, if_modified_since, if_unmodified_since,
+                                      if_match, if_none_match, timeout)
+        blob.content = blob.content.decode(encoding)
+        return blob
+
+    # Gets a blob or a range of it into a stream or a local file, the returned Blob has no content
+    def get_blob_to_stream(self, container_name, blob_name, stream, snapshot=None, start_range=None, end_range=None,
+                           validate_content=False, progress_callback=None, max_connections=2, lease_id=None,
+                           if_modified_since=None, if_unmodified_since=None, if_match=None, if_none_match=None, timeout=None):
+        blob = self.get_blob_to_bytes(container_name, blob_name, snapshot, start_range, end_range, validate_content,
+                                      progress_callback, max_connections, lease_id, if_modified_since, if_unmodified_since,
+                                      if_match, if_none_match, timeout)
+        stream.write(blob.content)
+        blob.content = None
+        return blob
+
+    def get_blob_to_path(self, container_name, blob_name, file_path, open_mode='wb', snapshot=None, start_range=None,
+                         end_range=None, validate_content=False, progress_callback=None, max_connections=2, lease_id=None,
+                         if_modified_since=None, if_unmodified_since=None, if_match=None, if_none_match=None, timeout=None):
+        with open(file_path, open_mode) as stream:
+            return self.get_blob_to_stream(container_name, blob_name, stream, snapshot, start_range, end_range,
+                                           validate_content, progress_callback, max_connections, lease_id,
+                                           if_modified_since, if_unmodified_since, if_match, if_none_match, timeout)
+
+    # Forgets the ETags of a blob and its snapshots, or of all the blobs of a container when blob_name
+    # is None, so they are revalidated on the next read. Chunks of older ETags age out of the cache.
+    def invalidate(self, container_name, blob_name=None):
+        with self._lock:
+            for key in list(self._blobs):
+                if key[0] == container_name and (blob_name is None or key[1] == blob_name):
+                    del self._blobs[key]
+
+    def __getattr__(self, name):
+        attribute = getattr(self.blob_service, name)
+        if not callable(attribute) or name.startswith(READ_ONLY_METHODS):
+            return attribute
+        return invalidating(self, name, attribute)
+
+    # Gets the properties of a blob, revalidating its ETag once it is older than ttl
+    def _get_blob(self, container_name, blob_name, snapshot, lease_id, timeout=None):
+        key = (container_name, blob_name, snapshot)
+        with self._lock:
+            entry = self._blobs.get(key)
+        # Snapshots never change
+        if entry is not None and (snapshot is not None or time.time() - entry[0] < self.ttl):
+            return entry[1]
+
+        if entry is not None:
+            try:
+                blob = self.blob_service.get_blob_properties(container_name, blob_name, snapshot=snapshot,
+                                                             lease_id=lease_id, if_none_match=entry[1].properties.etag,
+                                                             timeout=timeout)
+            except AzureHttpError as e:
+                if e.status_code != 304:
+                    raise
+                self._count('revalidations')
+                entry[0] = time.time()
+                return entry[1]
+        else:
+            blob = self.blob_service.get_blob_properties(container_name, blob_name, snapshot=snapshot, lease_id=lease_id,
+                                                         timeout=timeout)
+
+        with self._lock:
+            self._blobs[key] = [time.time(), blob]
+        return blob
+
+    # Reads bytes start to end (inclusive) of the blob version described by blob from its chunks
+    # and reports the bytes read so far to progress_callback after every chunk
+    def _read(self, container_name, blob_name, snapshot, lease_id, blob, start, end, validate_content=False,
+              progress_callback=None, timeout=None):
+        if end < start:
+            return b''
+
+        size = blob.properties.content_length
+        etag = blob.properties.etag
+        directory = self._get_blob_directory(container_name, blob_name, snapshot, etag)
+        parts = []
+        read = 0
+        for index in range(start // self.chunk_size, end // self.chunk_size + 1):
+            chunk_start = index * self.chunk_size
+            path = os.path.join(directory, str(index))
+            chunk = self._read_chunk(path)
+            if chunk is None:
+                self._count('misses')
+                chunk_end = min(chunk_start + self.chunk_size, size) - 1
+                chunk = self.blob_service.get_blob_to_bytes(container_name, blob_name, snapshot=snapshot,
+                                                            start_range=chunk_start, end_range=chunk_end,
+                                                            validate_content=validate_content, lease_id=lease_id,
+                                                            if_match=etag, timeout=timeout).content
+                self._write_chunk(directory, path, chunk)
+            else:
+                self._count('hits')
+            parts.append(chunk[max(start - chunk_start, 0):end - chunk_start + 1])
+            read += len(parts[-1])
+            if progress_callback:
+                progress_callback(read, end - start + 1)
+        return b''.join(parts)
+
+    def _get_blob_directory(self, container_name, blob_name, snapshot, etag):
+        key = '\n'.join([container_name, blob_name, snapshot or '', etag])
+        return os.path.join(self.cache_dir, hashlib.sha1(key.encode('utf-8')).hexdigest())
+
+    def _read_chunk(self, path):
+        with self._lock:
+            if path not in self._chunks:
+                return None
+            self._chunks.move_to_end(path)
+        try:
+            with open(path, 'rb') as stream:
+                return stream.read()
+        except IOError:
+            # Removed by another process sharing the directory
+            self._forget_chunk(path)
+            return None
+
+    # Writes a chunk through a temporary file so readers never see a partial one, then evicts the
+    # least recently used chunks over max_size
+    def _write_chunk(self, directory, path, chunk):
+        if not os.path.isdir(directory):
+            os.makedirs(directory, exist_ok=True)
+        temporary_path = path + '.' + uuid.uuid4().hex + '.tmp'
+        with open(temporary_path, 'wb') as stream:
+            stream.write(chunk)
+        os.replace(temporary_path, path)
+
+        with self._lock:
+            self._size += len(chunk) - self._chunks.pop(path, 0)
+            self._chunks[path] = len(chunk)
+        self._evict()
+
+    # Removes the least recently used chunks until the cache fits in max_size
+    def _evict(self):
+        evicted = []
+        with self._lock:
+            while self._size > self.max_size and len(self._chunks) > 1:
+                evicted_path, evicted_size = self._chunks.popitem(last=False)
+                self._size -= evicted_size
+                evicted.append(evicted_path)
+        for evicted_path in evicted:
+            try:
+                os.remove(evicted_path)
+            except OSError:
+                pass
+
+    def _forget_chunk(self, path):
+        with self._lock:
+            self._size -= self._chunks.pop(path, 0)
+
+    # Indexes the chunks already in cache_dir, least recently modified first. Other files, including
+    # the temporary files of chunks still being written, possibly by another process, are not chunks.
+    def _load_chunks(self):
+        chunks = []
+        for directory_name in os.listdir(self.cache_dir):
+            directory = os.path.join(self.cache_dir, directory_name)
+            if not _BLOB_DIRECTORY_NAME.fullmatch(directory_name) or not os.path.isdir(directory):
+                continue
+            for file_name in os.listdir(directory):
+                path = os.path.join(directory, file_name)
+                if _CHUNK_NAME.fullmatch(file_name) and os.path.isfile(path):
+                    stat = os.stat(path)
+                    chunks.append((stat.st_mtime, path, stat.st_size))
+        for mtime, path, size in sorted(chunks):
+            self._chunks[path] = size
+            self._size += size
+        self._evict()
+
+    def _count(self, counter):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
@@ -0,0 +1,206 @@
+#----------------------------------------------------------------------------------
+# Microsoft Developer & Platform Evangelism
+#
+# Copyright (c) Microsoft Corporation. All rights reserved.
+#
+# THIS CODE AND INFORMATION ARE PROVIDED "AS IS" WITHOUT WARRANTY OF ANY KIND,
+# EITHER EXPRESSED OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE IMPLIED WARRANTIES
+# OF MERCHANTABILITY AND/OR FITNESS FOR A PARTICULAR PURPOSE.
+#----------------------------------------------------------------------------------
+# The example companies, organizations, products, domain names,
+# e-mail addresses, logos, people, places, and events depicted
+# herein are fictitious.  No association with any real company,
+# organization, product, domain name, email address, logo, person,
+# places, or events is intended or should be inferred.
+#----------------------------------------------------------------------------------
+
+import heapq
+import time
+from concurrent.futures import ThreadPoolExecutor
+from queue import Queue, Empty
+
+# A server-side copy of one blob and its current state
+class CopyJob():
+
+    def __init__(self, source_url, container_name, blob_name):
+        self.source_url = source_url
+        self.container_name = container_name
+        self.blob_name = blob_name
+        self.copy_id = None
+        # 'queued', 'pending', 'success', 'failed' or 'aborted'
+        self.status = 'queued'
+        self.status_description = None
+        self.bytes_copied = 0
+        self.total_bytes = None
+        self.error = None
+        self.poll_interval = None
+        self.polls = 0
+        self._last_poll_time = None
+        self._last_bytes_copied = 0
+        # Bytes and size of the copy counted in the CopyReport so far
+        self._reported_bytes_copied = 0
+        self._reported_total_bytes = 0
+
+
+# Aggregate state of a bulk copy, passed to the progress callback and returned when it completes.
+# bytes_copied includes the progress of the copies still pending, total_bytes is the size of the
+# copies whose size the service reported so far.
+class CopyReport():
+
+    def __init__(self):
+        self.jobs = []
+        self.started = 0
+        self.succeeded = 0
+        self.failed = 0
+        self.in_flight = 0
+        self.bytes_copied = 0
+        self.total_bytes = 0
+        self.requests = 0
+
+    def is_successful(self):
+        return self.failed == 0
+
+
+#
+# Bulk copy orchestrator - Starts many server-side copies and follows them to completion.
+# Copies are started and polled on one shared pool of worker threads, and a single scheduler keeps
+# the next poll time of every pending copy in a heap, so thousands of copies can be in flight without
+# a thread per copy. The poll interval of a copy backs off exponentially while it makes no progress
+# and follows the estimated time to completion when it does.
+#
+class BulkCopyOrchestrator():
+
+    # Input Arguments:
+    # blob_service - BlockBlobService, PageBlobService or AppendBlobService of the destination account
+    # max_in_flight - largest number of copies started and not yet finished
+    # max_workers - number of copy_blob and get_blob_properties requests sent at once
+    # initial_poll_interval - seconds before the first status check of a copy
+    # max_poll_interval - longest wait between two status checks of a copy
+    # progress_callback - optional function called with the CopyReport after every copy_blob and status check
+    def __init__(self, blob_service, max_in_flight=1000, max_workers=32, initial_poll_interval=0.5,
+                 max_poll_interval=30.0, progress_callback=None):
+        if max_in_flight <= 0 or max_workers <= 0:
+            raise ValueError('max_in_flight and max_workers must be at least 1')
+
+        self.blob_service = blob_service
+        self.max_in_flight = max_in_flight
+        self.max_workers = max_workers
+        self.initial_poll_interval = initial_poll_interval
+        self.max_poll_interval = max_poll_interval
+        self.progress_callback = progress_callback
+
+    # Copies blobs and waits until every copy has finished.
+    # Input Arguments:
+    # copies - iterable of (source_url, container_name, blob_name), the destination container must exist
+    # Returns the CopyReport, failed copies are reported in it rather than raised
+    def copy_blobs(self, copies):
+        report = CopyReport()
+        copies = iter(copies)
+        completions = Queue()
+        polls = []
+        sequence = 0
+        more_copies = True
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            while True:
+                # Start new copies while there is room
+                while more_copies and report.in_flight < self.max_in_flight:
+                    try:
+                        source_url, container_name, blob_name = next(copies)
+                    except StopIteration:
+                        more_copies = False
+                        break
+                    job = CopyJob(source_url, container_name, blob_name)
+                    report.jobs.append(job)
+                    report.started += 1
+                    report.in_flight += 1
+                    self._submit(executor, completions, self._start_copy, job)
+
+                if report.in_flight == 0:
+                    break
+
+                # Send the status checks that are due
+                now = time.time()
+                while polls and polls[0][0] <= now:
+                    job = heapq.heappop(polls)[2]
+                    self._submit(executor, completions, self._poll_copy, job)
+
+                timeout = max(0, polls[0][0] - now) if polls else None
+                try:
+                    job, error = completions.get(timeout=timeout)
+                except Empty:
+                    continue
+
+                report.requests += 1
+                if error is not None:
+                    job.status = 'failed'
+                    job.error = error
+                # Only the change since the last report of the copy is added
+                report.bytes_copied += job.bytes_copied - job._reported_bytes_copied
+                report.total_bytes += (job.total_bytes or 0) - job._reported_total_bytes
+                job._reported_bytes_copied = job.bytes_copied
+                job._reported_total_bytes = job.total_bytes or 0
+                if job.status == 'pending':
+                    sequence += 1
+                    heapq.heappush(polls, (time.time() + self._next_poll_interval(job), sequence, job))
+                else:
+                    report.in_flight -= 1
+                    if job.status == 'success':
+                        report.succeeded += 1
+                    else:
+                        report.failed += 1
+                if self.progress_callback:
+                    self.progress_callback(report)
+
+        return report
+
+    def _submit(self, executor, completions, operation, job):
+        def run():
+            try:
+                operation(job)
+                completions.put((job, None))
+            except Exception as e:
+                completions.put((job, e))
+        executor.submit(run)
+
+    def _start_copy(self, job):
+        copy = self.blob_service.copy_blob(job.container_name, job.blob_name, job.source_url)
+        job.copy_id = copy.id
+        self._update_job(job, copy)
+
+    def _poll_copy(self, job):
+        blob = self.blob_service.get_blob_properties(job.container_name, job.blob_name)
+        job.polls += 1
+        copy = blob.properties.copy
+        if copy.id is not None and copy.id != job.copy_id:
+            job.status = 'failed'
+            job.status_description = 'Another copy to the blob was started'
+            return
+        self._update_job(job, copy)
+
+    def _update_job(self, job, copy):
+        job.status = copy.status
+        job.status_description = copy.status_description
+        if copy.progress:
+            copied, _, total = copy.progress.partition('/')
+            job.bytes_copied = int(copied)
+            job.total_bytes = int(total) if total else None
+
+    # Gets the seconds to wait before checking a pending copy again
+    def _next_poll_interval(self, job):
+        now = time.time()
+        if job.poll_interval is None:
+            interval = self.initial_poll_interval
+        else:
+            interval = min(job.poll_interval * 2, self.max_poll_interval)
+            elapsed = now - job._last_poll_time
+            previous = job._last_bytes_copied
+            if job.total_bytes and job.bytes_copied > previous and elapsed > 0:
+                # Progress was made, aim the next check at the estimated completion time
+                rate = (job.bytes_copied - previous) / elapsed
+                estimate = (job.total_bytes - job.bytes_copied) / rate
+                interval = min(max(estimate, self.initial_poll_interval), self.max_poll_interval)
+        job.poll_interval = interval
+        job._last_poll_time = now
+        job._last_bytes_copied = job.bytes_copied
+        return interval
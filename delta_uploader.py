@@ -0,0 +1,182 @@
+#----------------------------------------------------------------------------------
+# Microsoft Developer & Platform Evangelism
+#
+# Copyright (c) Microsoft Corporation. All rights reserved.
+#
+# THIS CODE AND INFORMATION ARE PROVIDED "AS IS" WITHOUT WARRANTY OF ANY KIND,
+# EITHER EXPRESSED OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE IMPLIED WARRANTIES
+# OF MERCHANTABILITY AND/OR FITNESS FOR A PARTICULAR PURPOSE.
+#----------------------------------------------------------------------------------
+# The example companies, organizations, products, domain names,
+# e-mail addresses, logos, people, places, and events depicted
+# herein are fictitious.  No association with any real company,
+# organization, product, domain name, email address, logo, person,
+# places, or events is intended or should be inferred.
+#----------------------------------------------------------------------------------
+
+import hashlib
+import random
+from azure.common import AzureMissingResourceHttpError
+from azure.storage.blob.models import BlobBlock, BlobBlockState
+from block_blob_uploader import ParallelBlockUploader
+
+try:
+    import numpy
+except ImportError:
+    # The boundary scan falls back to hashing one byte at a time
+    numpy = None
+
+# A blob holds at most 50,000 committed blocks
+MAX_BLOCK_COUNT = 50000
+
+# Size of the reads from the uploaded file
+READ_SIZE = 4 * 1024 * 1024
+
+# Bytes hashed at once by the vectorized boundary scan
+SCAN_SIZE = 64 * 1024
+
+# Random value of each byte for the gear rolling hash, fixed so every upload finds the same boundaries
+_gear_random = random.Random(0x5a17)
+GEAR = [_gear_random.getrandbits(64) for _ in range(256)]
+del _gear_random
+GEAR_ARRAY = numpy.array(GEAR, dtype=numpy.uint64) if numpy is not None else None
+
+#
+# Delta block upload - Splits a file into content-defined blocks with a gear rolling hash, so an
+# insertion or deletion only changes the blocks around it instead of shifting every later block.
+# The SHA-256 of each block is its block ID. Blocks already committed to the blob are reused by
+# ID in the new block list and only new blocks are sent with put_block, so re-uploading a file
+# that changed by a few percent transfers roughly that few percent. When numpy is installed the
+# boundaries are searched SCAN_SIZE bytes at a time with array operations instead of byte by byte.
+#
+class DeltaBlockUploader(ParallelBlockUploader):
+
+    # Input Arguments:
+    # blockblob_service - BlockBlobService used to put and commit the blocks
+    # min_block_size - smallest block, except for the last one
+    # average_block_size - expected size of a block, a power of two above min_block_size
+    # max_block_size - largest block, up to 100 MB
+    # max_workers - number of put_block requests kept in flight at once
+    def __init__(self, blockblob_service, min_block_size=256 * 1024, average_block_size=1024 * 1024,
+                 max_block_size=4 * 1024 * 1024, max_workers=8):
+        if not 0 < min_block_size < average_block_size < max_block_size:
+            raise ValueError('block sizes must satisfy 0 < min_block_size < average_block_size < max_block_size')
+
+        ParallelBlockUploader.__init__(self, blockblob_service, max_block_size, max_workers)
+        self.min_block_size = min_block_size
+        self.average_block_size = average_block_size
+        self.max_block_size = max_block_size
+
+        # A boundary is found on average every 2^bits bytes after min_block_size
+        bits = max(1, (average_block_size - min_block_size).bit_length() - 1)
+        self._boundary_mask = ((1 << bits) - 1) << (64 - bits)
+
+    # Uploads a local file to a block blob, sending only the blocks the blob does not already have.
+    # Input Arguments:
+    # container_name - name of an existing container
+    # blob_name - name of the blob to create or overwrite
+    # file_path - path of the file to upload
+    # put_block_list_kwargs - extra arguments for put_block_list (content_settings, metadata, lease_id...)
+    # Returns the number of bytes sent and the number of bytes reused from the blob
+    def upload_file(self, container_name, blob_name, file_path, **put_block_list_kwargs):
+        with open(file_path, 'rb') as stream:
+            return self.upload_stream(container_name, blob_name, stream, **put_block_list_kwargs)
+
+    # Uploads the content of a readable binary stream, see upload_file
+    def upload_stream(self, container_name, blob_name, stream, **put_block_list_kwargs):
+        lease_id = put_block_list_kwargs.get('lease_id')
+        committed = self._get_committed_block_ids(container_name, blob_name, lease_id)
+        sent = set()
+        blocks = []
+        bytes_sent = 0
+        bytes_reused = 0
+
+        # Only the blocks the blob does not have yet are given to the engine
+        def new_blocks():
+            nonlocal bytes_sent, bytes_reused
+            for block_bytes in self._iter_blocks(stream):
+                block_id = hashlib.sha256(block_bytes).hexdigest()
+                if block_id in committed:
+                    blocks.append(BlobBlock(id=block_id, state=BlobBlockState.Committed))
+                    bytes_reused += len(block_bytes)
+                    continue
+
+                blocks.append(BlobBlock(id=block_id, state=BlobBlockState.Uncommitted))
+                if block_id not in sent:
+                    sent.add(block_id)
+                    bytes_sent += len(block_bytes)
+                    yield block_id, block_bytes
+
+        self.put_blocks(container_name, blob_name, new_blocks(), lease_id)
+
+        if len(blocks) > MAX_BLOCK_COUNT:
+            raise ValueError('The file is split into more than {0} blocks, increase the block sizes'.format(MAX_BLOCK_COUNT))
+        self.blockblob_service.put_block_list(container_name, blob_name, blocks, **put_block_list_kwargs)
+        return bytes_sent, bytes_reused
+
+    # Gets the IDs of the committed blocks of the blob, none when the blob does not exist
+    def _get_committed_block_ids(self, container_name, blob_name, lease_id):
+        try:
+            block_list = self.blockblob_service.get_block_list(container_name, blob_name, None, 'committed',
+                                                               lease_id=lease_id)
+        except AzureMissingResourceHttpError:
+            return set()
+        return set(block.id for block in block_list.committed_blocks)
+
+    # Reads a stream and returns a generator of its content-defined blocks
+    def _iter_blocks(self, stream):
+        pending = bytearray()
+        end_of_stream = False
+        while True:
+            while not end_of_stream and len(pending) < self.max_block_size:
+                data = stream.read(READ_SIZE)
+                if data:
+                    pending += data
+                else:
+                    end_of_stream = True
+            if not pending:
+                return
+
+            size = self._find_boundary(pending)
+            yield bytes(pending[:size])
+            del pending[:size]
+
+    # Gets the size of the next block: the first position past min_block_size where the rolling hash
+    # of the preceding bytes matches the boundary mask, or max_block_size when there is none
+    def _find_boundary(self, data):
+        end = min(len(data), self.max_block_size)
+        if end <= self.min_block_size:
+            return end
+        if numpy is not None:
+            return self._find_boundary_vectorized(data, end)
+
+        gear = GEAR
+        mask = self._boundary_mask
+        h = 0
+        # The top bits of the hash only depend on the last 64 bytes, so hashing starts just before min_block_size
+        for i in range(max(0, self.min_block_size - 64), end):
+            h = ((h << 1) + gear[data[i]]) & 0xFFFFFFFFFFFFFFFF
+            if not h & mask and i >= self.min_block_size:
+                return i + 1
+        return end
+
+    # Same as the loop of _find_boundary, SCAN_SIZE positions at a time. The hash at position i is
+    # the sum of GEAR[data[i - k]] << k for k < 64, which is built from the gear values of the bytes
+    # by doubling the number of terms six times: h2m[i] = hm[i] + (hm[i - m] << m).
+    def _find_boundary_vectorized(self, data, end):
+        mask = numpy.uint64(self._boundary_mask)
+        for scan_start in range(self.min_block_size, end, SCAN_SIZE):
+            scan_end = min(scan_start + SCAN_SIZE, end)
+            # The 63 bytes before the scanned positions are part of their hashes
+            history_start = max(0, scan_start - 63)
+            h = GEAR_ARRAY[numpy.frombuffer(data, dtype=numpy.uint8, count=scan_end - history_start,
+                                            offset=history_start)]
+            shift = 1
+            while shift < 64:
+                h[shift:] += h[:-shift] << numpy.uint64(shift)
+                shift *= 2
+
+            matches = numpy.flatnonzero((h[scan_start - history_start:] & mask) == 0)
+            if len(matches) > 0:
+                return scan_start + int(matches[0]) + 1
+        return end
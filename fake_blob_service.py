@@ -0,0 +1,1410 @@
+#----------------------------------------------------------------------------------
+# Microsoft Developer & Platform Evangelism
+#
+# Copyright (c) Microsoft Corporation. All rights reserved.
+#
+# THIS CODE AND INFORMATION ARE PROVIDED "AS IS" WITHOUT WARRANTY OF ANY KIND,
+# EITHER EXPRESSED OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE IMPLIED WARRANTIES
+# OF MERCHANTABILITY AND/OR FITNESS FOR A PARTICULAR PURPOSE.
+#----------------------------------------------------------------------------------
+# The example companies, organizations, products, domain names,
+# e-mail addresses, logos, people, places, and events depicted
+# herein are fictitious.  No association with any real company,
+# organization, product, domain name, email address, logo, person,
+# places, or events is intended or should be inferred.
+#----------------------------------------------------------------------------------
+
+import base64
+import copy
+import datetime
+import hashlib
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse, unquote, parse_qs
+from azure.common import AzureHttpError
+from azure.storage._http import HTTPRequest
+from azure.storage.models import ListGenerator, Logging, Metrics, ServiceProperties
+from azure.storage.blob.models import (
+    AppendBlockProperties, Blob, BlobBlock, BlobBlockList, BlobBlockState, BlobPrefix, BlobProperties,
+    Container, ContainerProperties, ContentSettings, CopyProperties, PageBlobProperties, PageRange,
+    ResourceProperties,
+)
+
+#
+# Fake Blob service - An in-process stand-in for the Blob service used to run and time the
+# samples without the Storage Emulator or a storage account.
+# FakeStorageAccount can be used wherever the samples expect a CloudStorageAccount. The services it
+# creates implement the subset of BlockBlobService, PageBlobService and AppendBlobService used by the
+# samples and return the same model objects as the Azure Storage SDK. Errors are raised as AzureHttpError
+# with the status code the service would return.
+#
+# Every call waits for the configured latency, and data transfers additionally share the configured
+# bandwidth, so the effect of parallel requests can be measured reproducibly. Uploads and downloads
+# are split into requests as the SDK does, by the MAX_SINGLE_PUT_SIZE, MAX_BLOCK_SIZE,
+# MAX_SINGLE_GET_SIZE, MAX_CHUNK_GET_SIZE and MAX_PAGE_SIZE attributes of the service, so the
+# effect of the chunk size on latency and request count can be measured too.
+#
+
+PAGE_SIZE = 512
+MAX_PAGE_RANGE_SIZE = 4 * 1024 * 1024
+MAX_APPEND_BLOCK_SIZE = 4 * 1024 * 1024
+MAX_SERVICE_BLOCK_SIZE = 100 * 1024 * 1024
+MAX_BLOCK_COUNT = 50000
+MAX_BLOCK_ID_LENGTH = 64
+DEFAULT_LIST_RESULTS = 5000
+
+# Registry of the fake accounts created in this process, used to resolve copy sources by URL
+_accounts = {}
+_accounts_lock = threading.Lock()
+
+
+# Raises the error the Blob service returns for a failed request.
+def _error(status_code, code, message=''):
+    raise AzureHttpError(code + (': ' + message if message else ''), status_code)
+
+
+class _FakeLease():
+
+    def __init__(self):
+        self.id = None
+        self.last_id = None
+        self.expires_at = None
+        self.duration = None
+        self.seconds = None
+        self.broken = False
+
+    def is_active(self):
+        if self.expires_at is not None and time.time() >= self.expires_at:
+            # A fixed lease has expired or a break period has ended
+            self.id = None
+            self.expires_at = None
+        return self.id is not None
+
+    def state(self):
+        if self.is_active():
+            return 'breaking' if self.broken else 'leased'
+        if self.broken:
+            return 'broken'
+        return 'expired' if self.last_id is not None else 'available'
+
+    def acquire(self, lease_duration, proposed_lease_id):
+        if lease_duration != -1 and not 15 <= lease_duration <= 60:
+            _error(400, 'InvalidHeaderValue', 'lease duration must be -1 or between 15 and 60 seconds')
+        if self.is_active():
+            if self.broken:
+                _error(409, 'LeaseIsBreakingAndCannotBeAcquired')
+            if proposed_lease_id != self.id:
+                _error(409, 'LeaseAlreadyPresent')
+        self.id = proposed_lease_id or str(uuid.uuid4())
+        self.last_id = self.id
+        self.broken = False
+        self._set_duration(lease_duration)
+        return self.id
+
+    def renew(self, lease_id):
+        # An expired lease can still be renewed by its holder as long as nobody else acquired it
+        if self.broken or lease_id != self.last_id or (self.is_active() and lease_id != self.id):
+            _error(409, 'LeaseIdMismatchWithLeaseOperation')
+        self.id = lease_id
+        self._set_duration(self.seconds)
+        return self.id
+
+    def release(self, lease_id):
+        if lease_id != self.last_id:
+            _error(409, 'LeaseIdMismatchWithLeaseOperation')
+        self.id = None
+        self.last_id = None
+        self.expires_at = None
+        self.broken = False
+
+    def break_lease(self, lease_break_period):
+        if not self.is_active():
+            if self.broken:
+                return 0
+            _error(409, 'LeaseNotPresentWithLeaseOperation')
+        if self.broken:
+            return int(self.expires_at - time.time())
+        remaining = None if self.expires_at is None else self.expires_at - time.time()
+        if lease_break_period is None:
+            period = remaining or 0
+        else:
+            period = lease_break_period if remaining is None else min(lease_break_period, remaining)
+        self.broken = True
+        self.expires_at = time.time() + period
+        if period <= 0:
+            self.id = None
+            self.expires_at = None
+        return int(period)
+
+    def change(self, lease_id, proposed_lease_id):
+        if not self.is_active() or lease_id not in (self.id, proposed_lease_id):
+            _error(409, 'LeaseIdMismatchWithLeaseOperation')
+        self.id = proposed_lease_id
+        self.last_id = proposed_lease_id
+        return self.id
+
+    # Checks the lease_id passed to a write or delete against the lease on the resource
+    def check_write(self, lease_id):
+        if self.is_active():
+            if lease_id is None:
+                _error(412, 'LeaseIdMissing', 'There is currently a lease on the resource and no lease ID was specified in the request.')
+            if lease_id != self.id:
+                _error(412, 'LeaseIdMismatch')
+        elif lease_id is not None:
+            _error(412, 'LeaseNotPresent', 'There is currently no lease on the resource.')
+
+    # Checks the lease_id passed to a read, reads do not require the lease but must not use a wrong one
+    def check_read(self, lease_id):
+        if lease_id is not None:
+            self.check_write(lease_id)
+
+    def to_properties(self, properties):
+        state = self.state()
+        properties.state = state
+        properties.status = 'locked' if state in ('leased', 'breaking') else 'unlocked'
+        properties.duration = self.duration if state == 'leased' else None
+
+    def _set_duration(self, lease_duration):
+        self.seconds = lease_duration
+        if lease_duration == -1:
+            self.duration = 'infinite'
+            self.expires_at = None
+        else:
+            self.duration = 'fixed'
+            self.expires_at = time.time() + lease_duration
+
+
+class _FakeBlob():
+
+    def __init__(self, blob_type):
+        self.blob_type = blob_type
+        self.committed = False
+        self.content = bytearray()
+        self.content_settings = ContentSettings()
+        self.metadata = {}
+        self.etag = None
+        self.last_modified = None
+        self.lease = _FakeLease()
+        self.copy = None
+        self.pending_copy_content = None
+        self.copy_completes_at = None
+        # Block blobs - committed block ids in order with their sizes, and uncommitted blocks by id
+        self.committed_blocks = []
+        self.block_data = {}
+        self.uncommitted_blocks = {}
+        # Page blobs - written page index to the write stamp that last changed it
+        self.pages = {}
+        self.sequence_number = 0
+        # Append blobs
+        self.committed_block_count = 0
+        self.snapshots = {}
+
+    def snapshot(self):
+        blob = _FakeBlob(self.blob_type)
+        blob.committed = True
+        blob.content = bytearray(self.content)
+        blob.content_settings = copy.copy(self.content_settings)
+        blob.metadata = dict(self.metadata)
+        blob.etag = self.etag
+        blob.last_modified = self.last_modified
+        blob.committed_blocks = list(self.committed_blocks)
+        blob.block_data = dict((block_id, self.block_data[block_id]) for block_id, size in self.committed_blocks)
+        blob.pages = dict(self.pages)
+        blob.sequence_number = self.sequence_number
+        blob.committed_block_count = self.committed_block_count
+        blob.copy = copy.copy(self.copy)
+        return blob
+
+
+class _FakeContainer():
+
+    def __init__(self, metadata, public_access):
+        self.metadata = dict(metadata or {})
+        self.public_access = public_access
+        self.signed_identifiers = {}
+        self.etag = None
+        self.last_modified = None
+        self.lease = _FakeLease()
+        self.blobs = {}
+
+
+class _FakeStore():
+
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.containers = {}
+        self.service_properties = None
+        self.write_stamp = 0
+        self.last_snapshot = None
+
+    # Stamps a resource with a new ETag and modification time
+    def touch(self, resource):
+        self.write_stamp += 1
+        resource.etag = '"0x8D{0:013X}"'.format(self.write_stamp)
+        resource.last_modified = datetime.datetime.utcnow().replace(tzinfo=datetime.timezone.utc)
+        return self.write_stamp
+
+    def new_snapshot_id(self):
+        now = datetime.datetime.utcnow()
+        if self.last_snapshot is not None and now <= self.last_snapshot:
+            now = self.last_snapshot + datetime.timedelta(microseconds=1)
+        self.last_snapshot = now
+        return now.strftime('%Y-%m-%dT%H:%M:%S.%f') + '0Z'
+
+
+#
+# Storage account stand-in which creates fake block, page and append blob services.
+# All the services created by one account share the same containers and blobs.
+#
+class FakeStorageAccount():
+
+    # Input Arguments:
+    # account_name - name used in blob URLs, copy sources between fake accounts are resolved by it
+    # latency - seconds added to every request
+    # bandwidth - bytes per second shared by all the transfers of the account, None for unlimited
+    # copy_duration - seconds a copy_blob stays pending before it completes, 0 copies synchronously
+    def __init__(self, account_name='fakeaccount', latency=0.0, bandwidth=None, copy_duration=0.0):
+        self.account_name = account_name
+        self.account_key = base64.b64encode(account_name.encode('utf-8')).decode('utf-8')
+        self.sas_token = None
+        self.is_emulated = False
+        self.latency = latency
+        self.bandwidth = bandwidth
+        self.copy_duration = copy_duration
+        self.store = _FakeStore()
+        self._link_lock = threading.Lock()
+        self._link_free_at = 0.0
+
+        with _accounts_lock:
+            _accounts[account_name] = self
+
+    def create_block_blob_service(self):
+        return FakeBlockBlobService(self)
+
+    def create_page_blob_service(self):
+        return FakePageBlobService(self)
+
+    def create_append_blob_service(self):
+        return FakeAppendBlobService(self)
+
+    # Waits for the time a request carrying count bytes would take on the simulated link
+    def simulate_request(self, count=0):
+        delay = self.latency
+        if self.bandwidth and count:
+            # Transfers queue on the shared link, each one reserving the time it needs
+            with self._link_lock:
+                now = time.time()
+                start = max(now, self._link_free_at)
+                self._link_free_at = start + float(count) / self.bandwidth
+                delay += self._link_free_at - now
+        if delay > 0:
+            time.sleep(delay)
+
+
+class _FakeBaseBlobService():
+
+    # Size of the first request of a download and of the ranges read after it, as in BaseBlobService
+    MAX_SINGLE_GET_SIZE = 32 * 1024 * 1024
+    MAX_CHUNK_GET_SIZE = 4 * 1024 * 1024
+
+    def __init__(self, account):
+        self.account = account
+        self.account_name = account.account_name
+        self.account_key = account.account_key
+        self.sas_token = None
+        self.primary_endpoint = account.account_name + '.blob.core.windows.net'
+        self.protocol = 'https'
+        self.store = account.store
+        # Only request_callback is called, once per simulated request, with an empty HTTPRequest
+        self.request_callback = None
+        self.response_callback = None
+        self.retry_callback = None
+
+    def _simulate_request(self, count=0):
+        if self.request_callback:
+            self.request_callback(HTTPRequest())
+        self.account.simulate_request(count)
+
+    # Sends the chunks of a transfer one after the other, or max_connections at a time as the SDK
+    # does when max_connections is more than 1.
+    # Input Arguments:
+    # transfer - function sending the chunk at an offset and returning its length
+    # offsets - offsets of the chunks
+    # progress_callback, total - called with the bytes transferred so far and total after each chunk
+    # done - bytes transferred before the first chunk
+    def _transfer_chunks(self, transfer, offsets, max_connections, progress_callback=None, total=0, done=0):
+        if max_connections > 1 and len(offsets) > 1:
+            with ThreadPoolExecutor(max_workers=max_connections) as executor:
+                lengths = list(executor.map(transfer, offsets))
+        else:
+            lengths = map(transfer, offsets)
+        for length in lengths:
+            done += length
+            if progress_callback:
+                progress_callback(done, total)
+        return done
+
+    #
+    # URLs and shared access signatures
+    #
+
+    def make_blob_url(self, container_name, blob_name, protocol=None, sas_token=None, snapshot=None):
+        url = '{}://{}/{}/{}'.format(protocol or self.protocol, self.primary_endpoint, container_name, blob_name)
+        query = []
+        if snapshot:
+            query.append('snapshot=' + snapshot)
+        if sas_token:
+            query.append(sas_token)
+        return url + ('?' + '&'.join(query) if query else '')
+
+    def generate_account_shared_access_signature(self, resource_types, permission, expiry, start=None, ip=None, protocol=None):
+        return self._make_sas(srt=str(resource_types), sp=str(permission), se=expiry, st=start)
+
+    def generate_container_shared_access_signature(self, container_name, permission=None, expiry=None, start=None, id=None,
+                                                   ip=None, protocol=None, cache_control=None, content_disposition=None,
+                                                   content_encoding=None, content_language=None, content_type=None):
+        return self._make_sas(sr='c', sp=permission and str(permission), se=expiry, st=start, si=id, resource=container_name)
+
+    def generate_blob_shared_access_signature(self, container_name, blob_name, permission=None, expiry=None, start=None, id=None,
+                                              ip=None, protocol=None, cache_control=None, content_disposition=None,
+                                              content_encoding=None, content_language=None, content_type=None):
+        return self._make_sas(sr='b', sp=permission and str(permission), se=expiry, st=start, si=id,
+                              resource=container_name + '/' + blob_name)
+
+    def _make_sas(self, resource='', **values):
+        query = []
+        for key in ('st', 'se', 'sr', 'srt', 'sp', 'si'):
+            value = values.get(key)
+            if isinstance(value, datetime.datetime):
+                value = value.strftime('%Y-%m-%dT%H:%M:%SZ')
+            if value:
+                query.append(key + '=' + value)
+        signature = hashlib.sha256((self.account_key + resource + '&'.join(query)).encode('utf-8')).digest()
+        query.append('sig=' + base64.b64encode(signature).decode('utf-8'))
+        return '&'.join(query)
+
+    #
+    # Service properties
+    #
+
+    def get_blob_service_properties(self, timeout=None):
+        self._simulate_request()
+        with self.store.lock:
+            if self.store.service_properties is None:
+                properties = ServiceProperties()
+                properties.logging = Logging()
+                properties.hour_metrics = Metrics()
+                properties.minute_metrics = Metrics()
+                properties.cors = []
+                properties.target_version = None
+                self.store.service_properties = properties
+            return copy.copy(self.store.service_properties)
+
+    def set_blob_service_properties(self, logging=None, hour_metrics=None, minute_metrics=None, cors=None,
+                                    target_version=None, timeout=None):
+        properties = self.get_blob_service_properties()
+        with self.store.lock:
+            if logging is not None:
+                properties.logging = logging
+            if hour_metrics is not None:
+                properties.hour_metrics = hour_metrics
+            if minute_metrics is not None:
+                properties.minute_metrics = minute_metrics
+            if cors is not None:
+                properties.cors = cors
+            if target_version is not None:
+                properties.target_version = target_version
+            self.store.service_properties = properties
+
+    #
+    # Containers
+    #
+
+    def list_containers(self, prefix=None, num_results=None, include_metadata=False, marker=None, timeout=None):
+        kwargs = {'prefix': prefix, 'marker': marker, 'max_results': num_results,
+                  'include': 'metadata' if include_metadata else None, 'timeout': timeout}
+        return ListGenerator(self._list_containers(**kwargs), self._list_containers, (), kwargs)
+
+    def _list_containers(self, prefix=None, marker=None, max_results=None, include=None, timeout=None):
+        self._simulate_request()
+        with self.store.lock:
+            names = sorted(name for name in self.store.containers if name.startswith(prefix or ''))
+            results = []
+            for name in names:
+                container = self.store.containers[name]
+                results.append(((name, ''), Container(name, self._container_properties(container),
+                                                      dict(container.metadata) if include else None)))
+            return self._page(results, marker, max_results)
+
+    def create_container(self, container_name, metadata=None, public_access=None, fail_on_exist=False, timeout=None):
+        self._simulate_request()
+        with self.store.lock:
+            if container_name in self.store.containers:
+                if fail_on_exist:
+                    _error(409, 'ContainerAlreadyExists')
+                return False
+            container = _FakeContainer(metadata, public_access)
+            self.store.touch(container)
+            self.store.containers[container_name] = container
+            return True
+
+    def delete_container(self, container_name, fail_not_exist=False, lease_id=None, if_modified_since=None,
+                         if_unmodified_since=None, timeout=None):
+        self._simulate_request()
+        with self.store.lock:
+            container = self.store.containers.get(container_name)
+            if container is None:
+                if fail_not_exist:
+                    _error(404, 'ContainerNotFound')
+                return False
+            container.lease.check_write(lease_id)
+            del self.store.containers[container_name]
+            return True
+
+    def get_container_properties(self, container_name, lease_id=None, timeout=None):
+        self._simulate_request()
+        with self.store.lock:
+            container = self._get_container(container_name)
+            container.lease.check_read(lease_id)
+            return Container(container_name, self._container_properties(container), dict(container.metadata))
+
+    def get_container_metadata(self, container_name, lease_id=None, timeout=None):
+        return self.get_container_properties(container_name, lease_id=lease_id).metadata
+
+    def set_container_metadata(self, container_name, metadata=None, lease_id=None, if_modified_since=None, timeout=None):
+        self._simulate_request()
+        with self.store.lock:
+            container = self._get_container(container_name)
+            container.lease.check_read(lease_id)
+            container.metadata = dict(metadata or {})
+            self.store.touch(container)
+            return self._resource_properties(container)
+
+    def get_container_acl(self, container_name, lease_id=None, timeout=None):
+        self._simulate_request()
+        with self.store.lock:
+            container = self._get_container(container_name)
+            container.lease.check_read(lease_id)
+            acl = _FakeAcl(container.signed_identifiers)
+            acl.public_access = container.public_access
+            return acl
+
+    def set_container_acl(self, container_name, signed_identifiers=None, public_access=None, lease_id=None,
+                          if_modified_since=None, if_unmodified_since=None, timeout=None):
+        if signed_identifiers and len(signed_identifiers) > 5:
+            raise ValueError('Too many access policies provided. The server does not support setting more than 5 access policies on a single resource.')
+        self._simulate_request()
+        with self.store.lock:
+            container = self._get_container(container_name)
+            container.lease.check_read(lease_id)
+            container.signed_identifiers = dict(signed_identifiers or {})
+            container.public_access = public_access
+            self.store.touch(container)
+            return self._resource_properties(container)
+
+    def exists(self, container_name, blob_name=None, snapshot=None, timeout=None):
+        self._simulate_request()
+        with self.store.lock:
+            container = self.store.containers.get(container_name)
+            if container is None:
+                return False
+            if blob_name is None:
+                return True
+            blob = container.blobs.get(blob_name)
+            if blob is None or not blob.committed:
+                return False
+            return snapshot is None or snapshot in blob.snapshots
+
+    #
+    # Container leases
+    #
+
+    def acquire_container_lease(self, container_name, lease_duration=-1, proposed_lease_id=None,
+                                if_modified_since=None, if_unmodified_since=None, timeout=None):
+        self._simulate_request()
+        with self.store.lock:
+            return self._get_container(container_name).lease.acquire(lease_duration, proposed_lease_id)
+
+    def renew_container_lease(self, container_name, lease_id, if_modified_since=None, if_unmodified_since=None, timeout=None):
+        self._simulate_request()
+        with self.store.lock:
+            return self._get_container(container_name).lease.renew(lease_id)
+
+    def release_container_lease(self, container_name, lease_id, if_modified_since=None, if_unmodified_since=None, timeout=None):
+        self._simulate_request()
+        with self.store.lock:
+            self._get_container(container_name).lease.release(lease_id)
+
+    def break_container_lease(self, container_name, lease_break_period=None, if_modified_since=None,
+                              if_unmodified_since=None, timeout=None):
+        self._simulate_request()
+        with self.store.lock:
+            return self._get_container(container_name).lease.break_lease(lease_break_period)
+
+    def change_container_lease(self, container_name, lease_id, proposed_lease_id, if_modified_since=None,
+                               if_unmodified_since=None, timeout=None):
+        self._simulate_request()
+        with self.store.lock:
+            return self._get_container(container_name).lease.change(lease_id, proposed_lease_id)
+
+    #
+    # Blobs
+    #
+
+    def list_blobs(self, container_name, prefix=None, num_results=None, include=None, delimiter=None, marker=None, timeout=None):
+        args = (container_name,)
+        kwargs = {'prefix': prefix, 'marker': marker, 'max_results': num_results,
+                  'include': include, 'delimiter': delimiter, 'timeout': timeout}
+        return ListGenerator(self._list_blobs(*args, **kwargs), self._list_blobs, args, kwargs)
+
+    def _list_blobs(self, container_name, prefix=None, marker=None, max_results=None, include=None, delimiter=None, timeout=None):
+        includes = str(include or '').split(',')
+        self._simulate_request()
+        with self.store.lock:
+            container = self._get_container(container_name)
+            results = []
+            prefixes = set()
+            for name in sorted(container.blobs):
+                if prefix and not name.startswith(prefix):
+                    continue
+                if delimiter:
+                    position = name.find(delimiter, len(prefix or ''))
+                    if position >= 0:
+                        virtual_directory = name[:position + len(delimiter)]
+                        if virtual_directory not in prefixes:
+                            prefixes.add(virtual_directory)
+                            blob_prefix = BlobPrefix()
+                            blob_prefix.name = virtual_directory
+                            results.append(((virtual_directory, ''), blob_prefix))
+                        continue
+
+                blob = container.blobs[name]
+                self._complete_copy(blob)
+                if 'snapshots' in includes:
+                    for snapshot in sorted(blob.snapshots):
+                        results.append(((name, snapshot), self._make_blob(name, blob.snapshots[snapshot], snapshot,
+                                                                          'metadata' in includes)))
+                if blob.committed or 'uncommittedblobs' in includes:
+                    # The base blob is listed after its snapshots
+                    results.append(((name, '~'), self._make_blob(name, blob, None, 'metadata' in includes)))
+            return self._page(results, marker, max_results)
+
+    def get_blob_properties(self, container_name, blob_name, snapshot=None, lease_id=None, if_modified_since=None,
+                            if_unmodified_since=None, if_match=None, if_none_match=None, timeout=None):
+        self._simulate_request()
+        with self.store.lock:
+            blob = self._get_blob(container_name, blob_name, snapshot)
+            blob.lease.check_read(lease_id)
+            self._check_conditions(blob, if_match, if_none_match, True)
+            return self._make_blob(blob_name, blob, snapshot, True)
+
+    def set_blob_properties(self, container_name, blob_name, content_settings=None, lease_id=None, if_modified_since=None,
+                            if_unmodified_since=None, if_match=None, if_none_match=None, timeout=None):
+        self._simulate_request()
+        with self.store.lock:
+            blob = self._get_blob(container_name, blob_name)
+            blob.lease.check_write(lease_id)
+            self._check_conditions(blob, if_match, if_none_match, False)
+            blob.content_settings = copy.copy(content_settings) if content_settings else ContentSettings()
+            self.store.touch(blob)
+            return self._resource_properties(blob)
+
+    def get_blob_metadata(self, container_name, blob_name, snapshot=None, lease_id=None, if_modified_since=None,
+                          if_unmodified_since=None, if_match=None, if_none_match=None, timeout=None):
+        return self.get_blob_properties(container_name, blob_name, snapshot=snapshot, lease_id=lease_id,
+                                        if_match=if_match, if_none_match=if_none_match).metadata
+
+    def set_blob_metadata(self, container_name, blob_name, metadata=None, lease_id=None, if_modified_since=None,
+                          if_unmodified_since=None, if_match=None, if_none_match=None, timeout=None):
+        self._simulate_request()
+        with self.store.lock:
+            blob = self._get_blob(container_name, blob_name)
+            blob.lease.check_write(lease_id)
+            self._check_conditions(blob, if_match, if_none_match, False)
+            blob.metadata = dict(metadata or {})
+            self.store.touch(blob)
+            return self._resource_properties(blob)
+
+    def get_blob_to_bytes(self, container_name, blob_name, snapshot=None, start_range=None, end_range=None,
+                          validate_content=False, progress_callback=None, max_connections=2, lease_id=None,
+                          if_modified_since=None, if_unmodified_since=None, if_match=None, if_none_match=None, timeout=None):
+        with self.store.lock:
+            blob = self._get_blob(container_name, blob_name, snapshot)
+            blob.lease.check_read(lease_id)
+            self._check_conditions(blob, if_match, if_none_match, True)
+            size = len(blob.content)
+            result = self._make_blob(blob_name, blob, snapshot, True)
+            if start_range is None:
+                content = bytes(blob.content)
+            else:
+                if start_range >= size and size > 0:
+                    _error(416, 'InvalidRange', 'The range specified is invalid for the current size of the resource.')
+                last = size - 1 if end_range is None else min(end_range, size - 1)
+                content = bytes(blob.content[start_range:last + 1])
+                # As with the SDK, content_md5 of a range read is the MD5 of the whole blob
+                result.properties.content_range = 'bytes {0}-{1}/{2}'.format(start_range, last, size)
+
+        # The first request reads up to MAX_SINGLE_GET_SIZE bytes, the rest is read in ranges of
+        # MAX_CHUNK_GET_SIZE bytes
+        first_size = min(len(content), self.MAX_CHUNK_GET_SIZE if validate_content else self.MAX_SINGLE_GET_SIZE)
+
+        def transfer(offset):
+            length = min(len(content) - offset, self.MAX_CHUNK_GET_SIZE if offset else first_size)
+            self._simulate_request(length)
+            return length
+
+        done = self._transfer_chunks(transfer, [0], 1, progress_callback, len(content))
+        self._transfer_chunks(transfer, range(first_size, len(content), self.MAX_CHUNK_GET_SIZE), max_connections,
+                              progress_callback, len(content), done)
+        result.content = content
+        result.properties.content_length = len(content)
+        return result
+
+    def get_blob_to_text(self, container_name, blob_name, encoding='utf-8', snapshot=None, start_range=None, end_range=None,
+                         validate_content=False, progress_callback=None, max_connections=2, lease_id=None,
+                         if_modified_since=None, if_unmodified_since=None, if_match=None, if_none_match=None, timeout=None):
+        blob = self.get_blob_to_bytes(container_name, blob_name, snapshot, start_range, end_range, validate_content,
+                                      progress_callback, max_connections, lease_id, if_modified_since, if_unmodified_since,
+                                      if_match, if_none_match, timeout)
+        blob.content = blob.content.decode(encoding)
+        return blob
+
+    def get_blob_to_stream(self, container_name, blob_name, stream, snapshot=None, start_range=None, end_range=None,
+                           validate_content=False, progress_callback=None, max_connections=2, lease_id=None,
+                           if_modified_since=None, if_unmodified_since=None, if_match=None, if_none_match=None, timeout=None):
+        blob = self.get_blob_to_bytes(container_name, blob_name, snapshot, start_range, end_range, validate_content,
+                                      progress_callback, max_connections, lease_id, if_modified_since, if_unmodified_since,
+                                      if_match, if_none_match, timeout)
+        stream.write(blob.content)
+        blob.content = None
+        return blob
+
+    def get_blob_to_path(self, container_name, blob_name, file_path, open_mode='wb', snapshot=None, start_range=None,
+                         end_range=None, validate_content=False, progress_callback=None, max_connections=2, lease_id=None,
+                         if_modified_since=None, if_unmodified_since=None, if_match=None, if_none_match=None, timeout=None):
+        with open(file_path, open_mode) as stream:
+            return self.get_blob_to_stream(container_name, blob_name, stream, snapshot, start_range, end_range,
+                                           validate_content, progress_callback, max_connections, lease_id,
+                                           if_modified_since, if_unmodified_since, if_match, if_none_match, timeout)
+
+    def snapshot_blob(self, container_name, blob_name, metadata=None, if_modified_since=None, if_unmodified_since=None,
+                      if_match=None, if_none_match=None, lease_id=None, timeout=None):
+        self._simulate_request()
+        with self.store.lock:
+            blob = self._get_blob(container_name, blob_name)
+            blob.lease.check_read(lease_id)
+            self._check_conditions(blob, if_match, if_none_match, False)
+            snapshot_id = self.store.new_snapshot_id()
+            snapshot = blob.snapshot()
+            if metadata is not None:
+                snapshot.metadata = dict(metadata)
+            blob.snapshots[snapshot_id] = snapshot
+            return self._make_blob(blob_name, snapshot, snapshot_id, False)
+
+    def copy_blob(self, container_name, blob_name, copy_source, metadata=None, source_if_modified_since=None,
+                  source_if_unmodified_since=None, source_if_match=None, source_if_none_match=None,
+                  destination_if_modified_since=None, destination_if_unmodified_since=None, destination_if_match=None,
+                  destination_if_none_match=None, destination_lease_id=None, source_lease_id=None, timeout=None):
+        source_account, source_container, source_name, source_snapshot = self._parse_blob_url(copy_source)
+        self._simulate_request()
+        # Locks are always taken in account name order so copies in both directions cannot deadlock
+        stores = sorted(set([(source_account.account_name, id(source_account.store), source_account.store),
+                             (self.account_name, id(self.store), self.store)]), key=lambda item: item[:2])
+        for _, _, store in stores:
+            store.lock.acquire()
+        try:
+            source = source_account.store.containers.get(source_container)
+            source = source.blobs.get(source_name) if source is not None else None
+            if source is not None and source_snapshot is not None:
+                source = source.snapshots.get(source_snapshot)
+            if source is None or not source.committed:
+                _error(404, 'CannotVerifyCopySource', 'The specified blob does not exist.')
+            self._check_conditions(source, source_if_match, source_if_none_match, False)
+
+            container = self._get_container(container_name)
+            destination = container.blobs.get(blob_name)
+            if destination is not None and destination.committed:
+                destination.lease.check_write(destination_lease_id)
+                self._check_conditions(destination, destination_if_match, destination_if_none_match, False)
+                if destination.copy is not None and destination.copy.status == 'pending':
+                    _error(409, 'PendingCopyOperation')
+                lease = destination.lease
+                snapshots = destination.snapshots
+            else:
+                lease = _FakeLease()
+                snapshots = {}
+
+            copied = source.snapshot()
+            copied.lease = lease
+            copied.snapshots = snapshots
+            copied.metadata = dict(metadata) if metadata is not None else dict(source.metadata)
+
+            properties = CopyProperties()
+            properties.id = str(uuid.uuid4())
+            properties.source = copy_source
+            size = len(source.content)
+            if self.account.copy_duration > 0:
+                properties.status = 'pending'
+                properties.progress = '0/{0}'.format(size)
+                copied.pending_copy_content = copied.content
+                copied.content = bytearray()
+                copied.copy_completes_at = time.time() + self.account.copy_duration
+            else:
+                properties.status = 'success'
+                properties.progress = '{0}/{0}'.format(size)
+                properties.completion_time = datetime.datetime.utcnow().replace(tzinfo=datetime.timezone.utc)
+            copied.copy = properties
+            self.store.touch(copied)
+            container.blobs[blob_name] = copied
+
+            result = copy.copy(properties)
+            return result
+        finally:
+            for _, _, store in reversed(stores):
+                store.lock.release()
+
+    def abort_copy_blob(self, container_name, blob_name, copy_id, lease_id=None, timeout=None):
+        self._simulate_request()
+        with self.store.lock:
+            blob = self._get_blob(container_name, blob_name)
+            blob.lease.check_write(lease_id)
+            if blob.copy is None or blob.copy.status != 'pending':
+                _error(409, 'NoPendingCopyOperation')
+            if blob.copy.id != copy_id:
+                _error(409, 'CopyIdMismatch')
+            blob.copy.status = 'aborted'
+            blob.copy.completion_time = datetime.datetime.utcnow().replace(tzinfo=datetime.timezone.utc)
+            blob.pending_copy_content = None
+            blob.copy_completes_at = None
+            self.store.touch(blob)
+
+    def delete_blob(self, container_name, blob_name, snapshot=None, lease_id=None, delete_snapshots=None,
+                    if_modified_since=None, if_unmodified_since=None, if_match=None, if_none_match=None, timeout=None):
+        self._simulate_request()
+        with self.store.lock:
+            container = self._get_container(container_name)
+            blob = self._get_blob(container_name, blob_name)
+            if snapshot is not None:
+                if snapshot not in blob.snapshots:
+                    _error(404, 'BlobNotFound')
+                del blob.snapshots[snapshot]
+                return
+            blob.lease.check_write(lease_id)
+            self._check_conditions(blob, if_match, if_none_match, False)
+            if blob.snapshots and delete_snapshots is None:
+                _error(409, 'SnapshotsPresent', 'This operation is not permitted because the blob has snapshots.')
+            if delete_snapshots == 'only':
+                blob.snapshots = {}
+            else:
+                del container.blobs[blob_name]
+
+    #
+    # Blob leases
+    #
+
+    def acquire_blob_lease(self, container_name, blob_name, lease_duration=-1, proposed_lease_id=None,
+                           if_modified_since=None, if_unmodified_since=None, if_match=None, if_none_match=None,
+                           timeout=None):
+        self._simulate_request()
+        with self.store.lock:
+            blob = self._get_blob(container_name, blob_name)
+            self._check_conditions(blob, if_match, if_none_match, False)
+            return blob.lease.acquire(lease_duration, proposed_lease_id)
+
+    def renew_blob_lease(self, container_name, blob_name, lease_id, if_modified_since=None, if_unmodified_since=None,
+                         if_match=None, if_none_match=None, timeout=None):
+        self._simulate_request()
+        with self.store.lock:
+            blob = self._get_blob(container_name, blob_name)
+            self._check_conditions(blob, if_match, if_none_match, False)
+            return blob.lease.renew(lease_id)
+
+    def release_blob_lease(self, container_name, blob_name, lease_id, if_modified_since=None, if_unmodified_since=None,
+                           if_match=None, if_none_match=None, timeout=None):
+        self._simulate_request()
+        with self.store.lock:
+            blob = self._get_blob(container_name, blob_name)
+            self._check_conditions(blob, if_match, if_none_match, False)
+            blob.lease.release(lease_id)
+
+    def break_blob_lease(self, container_name, blob_name, lease_break_period=None, if_modified_since=None,
+                         if_unmodified_since=None, if_match=None, if_none_match=None, timeout=None):
+        self._simulate_request()
+        with self.store.lock:
+            blob = self._get_blob(container_name, blob_name)
+            self._check_conditions(blob, if_match, if_none_match, False)
+            return blob.lease.break_lease(lease_break_period)
+
+    def change_blob_lease(self, container_name, blob_name, lease_id, proposed_lease_id, if_modified_since=None,
+                          if_unmodified_since=None, if_match=None, if_none_match=None, timeout=None):
+        self._simulate_request()
+        with self.store.lock:
+            blob = self._get_blob(container_name, blob_name)
+            self._check_conditions(blob, if_match, if_none_match, False)
+            return blob.lease.change(lease_id, proposed_lease_id)
+
+    #
+    # Helpers shared by the blob types
+    #
+
+    def _get_container(self, container_name):
+        container = self.store.containers.get(container_name)
+        if container is None:
+            _error(404, 'ContainerNotFound', 'The specified container does not exist.')
+        return container
+
+    def _get_blob(self, container_name, blob_name, snapshot=None):
+        blob = self._get_container(container_name).blobs.get(blob_name)
+        if blob is None or not blob.committed:
+            _error(404, 'BlobNotFound', 'The specified blob does not exist.')
+        self._complete_copy(blob)
+        if snapshot is not None:
+            blob = blob.snapshots.get(snapshot)
+            if blob is None:
+                _error(404, 'BlobNotFound', 'The specified blob snapshot does not exist.')
+        return blob
+
+    # Gets the blob to write, creating it when it does not exist or when a blob of another type is replaced
+    def _get_or_create_blob(self, container_name, blob_name, blob_type, lease_id, replace_type=True):
+        container = self._get_container(container_name)
+        blob = container.blobs.get(blob_name)
+        if blob is not None and blob.committed:
+            blob.lease.check_write(lease_id)
+            if not replace_type and blob.blob_type != blob_type:
+                _error(409, 'InvalidBlobType', 'The blob type is invalid for this operation.')
+            self._complete_copy(blob)
+            if blob.copy is not None and blob.copy.status == 'pending':
+                _error(409, 'PendingCopyOperation')
+        if blob is None or blob.blob_type != blob_type:
+            replaced = blob
+            blob = _FakeBlob(blob_type)
+            if replaced is not None and replaced.committed:
+                blob.lease = replaced.lease
+                blob.snapshots = replaced.snapshots
+            container.blobs[blob_name] = blob
+        return blob
+
+    # Gets an existing blob of the given type for an operation that modifies it in place
+    def _get_blob_for_update(self, container_name, blob_name, blob_type, lease_id, if_match, if_none_match):
+        blob = self._get_blob(container_name, blob_name)
+        if blob.blob_type != blob_type:
+            _error(409, 'InvalidBlobType', 'The blob type is invalid for this operation.')
+        blob.lease.check_write(lease_id)
+        self._check_conditions(blob, if_match, if_none_match, False)
+        if blob.copy is not None and blob.copy.status == 'pending':
+            _error(409, 'PendingCopyOperation')
+        return blob
+
+    def _complete_copy(self, blob):
+        if blob.copy_completes_at is not None and time.time() >= blob.copy_completes_at:
+            blob.content = blob.pending_copy_content
+            blob.pending_copy_content = None
+            blob.copy_completes_at = None
+            blob.copy.status = 'success'
+            blob.copy.progress = '{0}/{0}'.format(len(blob.content))
+            blob.copy.completion_time = datetime.datetime.utcnow().replace(tzinfo=datetime.timezone.utc)
+
+    def _check_conditions(self, blob, if_match, if_none_match, is_read):
+        if if_match is not None and if_match != '*' and if_match != blob.etag:
+            _error(412, 'ConditionNotMet', 'The condition specified using HTTP conditional header(s) is not met.')
+        if if_none_match is not None and (if_none_match == '*' or if_none_match == blob.etag):
+            if is_read:
+                _error(304, 'Not Modified')
+            _error(412, 'ConditionNotMet', 'The condition specified using HTTP conditional header(s) is not met.')
+
+    def _parse_blob_url(self, url):
+        parsed = urlparse(url)
+        account_name = parsed.netloc.split('.')[0]
+        with _accounts_lock:
+            account = _accounts.get(account_name)
+        if account is None:
+            _error(404, 'CannotVerifyCopySource', 'The specified account does not exist.')
+        container_name, _, blob_name = unquote(parsed.path).lstrip('/').partition('/')
+        snapshot = parse_qs(parsed.query).get('snapshot', [None])[0]
+        return account, container_name, blob_name, snapshot
+
+    # Gets one page of a listing from (key, item) pairs sorted by key. The marker is the key of the
+    # first item of the next page, so items added or removed between pages are not skipped.
+    def _page(self, results, marker, max_results):
+        if marker:
+            marker_key = tuple(marker.split('\n', 1))
+            results = [(key, item) for key, item in results if key >= marker_key]
+        count = max_results or DEFAULT_LIST_RESULTS
+        page = _FakeList(item for key, item in results[:count])
+        page.next_marker = '\n'.join(results[count][0]) if len(results) > count else None
+        return page
+
+    def _container_properties(self, container):
+        properties = ContainerProperties()
+        properties.etag = container.etag
+        properties.last_modified = container.last_modified
+        properties.public_access = container.public_access
+        container.lease.to_properties(properties.lease)
+        return properties
+
+    def _resource_properties(self, resource, properties_class=ResourceProperties):
+        properties = properties_class()
+        properties.etag = resource.etag
+        properties.last_modified = resource.last_modified
+        return properties
+
+    def _make_blob(self, name, blob, snapshot, include_metadata):
+        properties = BlobProperties()
+        properties.blob_type = blob.blob_type
+        properties.etag = blob.etag
+        properties.last_modified = blob.last_modified
+        properties.content_length = len(blob.content)
+        properties.content_settings = copy.copy(blob.content_settings)
+        if blob.blob_type == 'AppendBlob':
+            properties.append_blob_committed_block_count = blob.committed_block_count
+        if blob.blob_type == 'PageBlob':
+            properties.page_blob_sequence_number = blob.sequence_number
+        if blob.copy is not None:
+            properties.copy = copy.copy(blob.copy)
+        blob.lease.to_properties(properties.lease)
+        return Blob(name, snapshot, None, properties, dict(blob.metadata) if include_metadata else None)
+
+    # Replaces the content and properties of a blob. Like the service, the MD5 of the content is
+    # only computed for blobs uploaded in a single request.
+    def _set_blob_content(self, blob, content, content_settings, metadata, compute_md5=True):
+        blob.content = bytearray(content)
+        blob.content_settings = copy.copy(content_settings) if content_settings else ContentSettings()
+        if compute_md5 and blob.content_settings.content_md5 is None:
+            blob.content_settings.content_md5 = base64.b64encode(hashlib.md5(content).digest()).decode('utf-8')
+        blob.metadata = dict(metadata or {})
+        blob.committed = True
+
+
+#
+# Block blob service stand-in
+#
+class FakeBlockBlobService(_FakeBaseBlobService):
+
+    # Largest blob uploaded in one request and size of the blocks of larger ones, as in BlockBlobService
+    MAX_SINGLE_PUT_SIZE = 64 * 1024 * 1024
+    MAX_BLOCK_SIZE = 4 * 1024 * 1024
+
+    def put_block(self, container_name, blob_name, block, block_id, validate_content=False, lease_id=None, timeout=None):
+        if block is None or block_id is None:
+            raise ValueError('block and block_id should not be None.')
+        if hasattr(block, 'read'):
+            block = block.read()
+        elif not isinstance(block, bytes):
+            raise TypeError('block should be of type bytes or a readable file-like/io.IOBase stream object.')
+        if len(block) > MAX_SERVICE_BLOCK_SIZE:
+            _error(413, 'RequestBodyTooLarge')
+        if len(str(block_id).encode('utf-8')) > MAX_BLOCK_ID_LENGTH:
+            _error(400, 'InvalidQueryParameterValue', 'The block id is longer than 64 bytes.')
+
+        self._simulate_request(len(block))
+        with self.store.lock:
+            blob = self._get_or_create_blob(container_name, blob_name, 'BlockBlob', lease_id, replace_type=False)
+            lengths = set(len(existing) for existing in blob.uncommitted_blocks)
+            lengths.update(len(existing) for existing, size in blob.committed_blocks)
+            if lengths and lengths != set([len(block_id)]):
+                _error(400, 'InvalidBlobOrBlock', 'All block ids of a blob must have the same length.')
+            blob.uncommitted_blocks[block_id] = bytes(block)
+
+    def put_block_list(self, container_name, blob_name, block_list, content_settings=None, metadata=None,
+                       validate_content=False, lease_id=None, if_modified_since=None, if_unmodified_since=None,
+                       if_match=None, if_none_match=None, timeout=None):
+        if len(block_list) > MAX_BLOCK_COUNT:
+            _error(400, 'BlockCountExceedsLimit')
+        self._simulate_request()
+        with self.store.lock:
+            blob = self._get_or_create_blob(container_name, blob_name, 'BlockBlob', lease_id)
+            if blob.committed:
+                self._check_conditions(blob, if_match, if_none_match, False)
+            block_data = {}
+            committed = []
+            for block in block_list:
+                data = None
+                if block.state in (BlobBlockState.Uncommitted, BlobBlockState.Latest):
+                    data = blob.uncommitted_blocks.get(block.id)
+                if data is None and block.state in (BlobBlockState.Committed, BlobBlockState.Latest):
+                    data = blob.block_data.get(block.id)
+                if data is None:
+                    _error(400, 'InvalidBlockList', 'The specified block list is invalid.')
+                block_data[block.id] = data
+                committed.append((block.id, len(data)))
+
+            content = b''.join(block_data[block_id] for block_id, size in committed)
+            self._set_blob_content(blob, content, content_settings, metadata, compute_md5=False)
+            blob.committed_blocks = committed
+            blob.block_data = block_data
+            blob.uncommitted_blocks = {}
+            blob.copy = None
+            self.store.touch(blob)
+            return self._resource_properties(blob)
+
+    def get_block_list(self, container_name, blob_name, snapshot=None, block_list_type=None, lease_id=None, timeout=None):
+        self._simulate_request()
+        with self.store.lock:
+            container = self._get_container(container_name)
+            blob = container.blobs.get(blob_name)
+            if blob is None or blob.blob_type != 'BlockBlob':
+                _error(404, 'BlobNotFound', 'The specified blob does not exist.')
+            if snapshot is not None:
+                blob = self._get_blob(container_name, blob_name, snapshot)
+            blob.lease.check_read(lease_id)
+
+            block_list = BlobBlockList()
+            if block_list_type in (None, 'committed', 'all'):
+                for block_id, size in blob.committed_blocks:
+                    block = BlobBlock(id=block_id, state=BlobBlockState.Committed)
+                    block.size = size
+                    block_list.committed_blocks.append(block)
+            if block_list_type in ('uncommitted', 'all'):
+                for block_id, data in blob.uncommitted_blocks.items():
+                    block = BlobBlock(id=block_id, state=BlobBlockState.Uncommitted)
+                    block.size = len(data)
+                    block_list.uncommitted_blocks.append(block)
+            return block_list
+
+    def create_blob_from_bytes(self, container_name, blob_name, blob, index=0, count=None, content_settings=None,
+                               metadata=None, validate_content=False, progress_callback=None, max_connections=2,
+                               lease_id=None, if_modified_since=None, if_unmodified_since=None, if_match=None,
+                               if_none_match=None, timeout=None):
+        if count is None:
+            count = len(blob) - index
+        if count >= self.MAX_SINGLE_PUT_SIZE:
+            return self._create_blob_from_blocks(container_name, blob_name, blob, index, count, content_settings,
+                                                 metadata, progress_callback, max_connections, lease_id, if_match,
+                                                 if_none_match)
+        content = bytes(blob[index:index + count])
+        self._simulate_request(len(content))
+        with self.store.lock:
+            existing = self._get_container(container_name).blobs.get(blob_name)
+            if existing is not None and existing.committed:
+                self._check_conditions(existing, if_match, if_none_match, False)
+            fake_blob = self._get_or_create_blob(container_name, blob_name, 'BlockBlob', lease_id)
+            self._set_blob_content(fake_blob, content, content_settings, metadata)
+            fake_blob.committed_blocks = []
+            fake_blob.block_data = {}
+            fake_blob.uncommitted_blocks = {}
+            fake_blob.copy = None
+            self.store.touch(fake_blob)
+        if progress_callback:
+            progress_callback(len(content), len(content))
+        return self._resource_properties(fake_blob)
+
+    def create_blob_from_text(self, container_name, blob_name, text, encoding='utf-8', content_settings=None,
+                              metadata=None, validate_content=False, progress_callback=None, max_connections=2,
+                              lease_id=None, if_modified_since=None, if_unmodified_since=None, if_match=None,
+                              if_none_match=None, timeout=None):
+        if not isinstance(text, bytes):
+            text = text.encode(encoding)
+        return self.create_blob_from_bytes(container_name, blob_name, text, content_settings=content_settings,
+                                           metadata=metadata, progress_callback=progress_callback,
+                                           max_connections=max_connections, lease_id=lease_id,
+                                           if_match=if_match, if_none_match=if_none_match)
+
+    def create_blob_from_stream(self, container_name, blob_name, stream, count=None, content_settings=None, metadata=None,
+                                validate_content=False, progress_callback=None, max_connections=2, lease_id=None,
+                                if_modified_since=None, if_unmodified_since=None, if_match=None, if_none_match=None,
+                                timeout=None, use_byte_buffer=False):
+        content = stream.read() if count is None else stream.read(count)
+        return self.create_blob_from_bytes(container_name, blob_name, content, content_settings=content_settings,
+                                           metadata=metadata, progress_callback=progress_callback,
+                                           max_connections=max_connections, lease_id=lease_id,
+                                           if_match=if_match, if_none_match=if_none_match)
+
+    def create_blob_from_path(self, container_name, blob_name, file_path, content_settings=None, metadata=None,
+                              validate_content=False, progress_callback=None, max_connections=2, lease_id=None,
+                              if_modified_since=None, if_unmodified_since=None, if_match=None, if_none_match=None,
+                              timeout=None):
+        with open(file_path, 'rb') as stream:
+            return self.create_blob_from_stream(container_name, blob_name, stream, content_settings=content_settings,
+                                                metadata=metadata, progress_callback=progress_callback,
+                                                max_connections=max_connections, lease_id=lease_id,
+                                                if_match=if_match, if_none_match=if_none_match)
+
+    # Uploads a blob of MAX_SINGLE_PUT_SIZE bytes or more as the SDK does, in blocks of MAX_BLOCK_SIZE
+    # bytes named after their offset and committed at the end
+    def _create_blob_from_blocks(self, container_name, blob_name, blob, index, count, content_settings, metadata,
+                                 progress_callback, max_connections, lease_id, if_match, if_none_match):
+        block_size = self.MAX_BLOCK_SIZE
+        offsets = range(0, count, block_size)
+
+        def get_block_id(offset):
+            return base64.b64encode('{0:032d}'.format(offset).encode('utf-8')).decode('utf-8')
+
+        def transfer(offset):
+            block = bytes(blob[index + offset:index + min(offset + block_size, count)])
+            self.put_block(container_name, blob_name, block, get_block_id(offset), lease_id=lease_id)
+            return len(block)
+
+        if progress_callback:
+            progress_callback(0, count)
+        self._transfer_chunks(transfer, offsets, max_connections, progress_callback, count)
+        return self.put_block_list(container_name, blob_name, [BlobBlock(id=get_block_id(offset)) for offset in offsets],
+                                   content_settings=content_settings, metadata=metadata, lease_id=lease_id,
+                                   if_match=if_match, if_none_match=if_none_match)
+
+
+#
+# Page blob service stand-in
+#
+class FakePageBlobService(_FakeBaseBlobService):
+
+    # Size of the pages written by each request of an upload, as in PageBlobService
+    MAX_PAGE_SIZE = 4 * 1024 * 1024
+
+    def create_blob(self, container_name, blob_name, content_length, content_settings=None, sequence_number=None,
+                    metadata=None, lease_id=None, if_modified_since=None, if_unmodified_since=None, if_match=None,
+                    if_none_match=None, timeout=None, premium_page_blob_tier=None):
+        if content_length % PAGE_SIZE != 0:
+            _error(400, 'InvalidHeaderValue', 'Page blob size must be aligned to a 512-byte boundary.')
+        self._simulate_request()
+        with self.store.lock:
+            existing = self._get_container(container_name).blobs.get(blob_name)
+            if existing is not None and existing.committed:
+                self._check_conditions(existing, if_match, if_none_match, False)
+            blob = self._get_or_create_blob(container_name, blob_name, 'PageBlob', lease_id)
+            self._set_blob_content(blob, bytes(content_length), content_settings, metadata, compute_md5=False)
+            blob.pages = {}
+            blob.sequence_number = sequence_number or 0
+            blob.copy = None
+            self.store.touch(blob)
+            return self._resource_properties(blob)
+
+    def update_page(self, container_name, blob_name, page, start_range, end_range, validate_content=False, lease_id=None,
+                    if_sequence_number_lte=None, if_sequence_number_lt=None, if_sequence_number_eq=None,
+                    if_modified_since=None, if_unmodified_since=None, if_match=None, if_none_match=None, timeout=None):
+        if not isinstance(page, bytes):
+            raise TypeError('page should be of type bytes.')
+        self._validate_page_range(start_range, end_range)
+        if len(page) != end_range - start_range + 1:
+            _error(400, 'InvalidHeaderValue', 'The page content length does not match the range.')
+        if len(page) > MAX_PAGE_RANGE_SIZE:
+            _error(413, 'RequestBodyTooLarge')
+
+        self._simulate_request(len(page))
+        with self.store.lock:
+            blob = self._get_blob_for_update(container_name, blob_name, 'PageBlob', lease_id, if_match, if_none_match)
+            self._check_sequence_number(blob, if_sequence_number_lte, if_sequence_number_lt, if_sequence_number_eq)
+            if end_range >= len(blob.content):
+                _error(416, 'InvalidPageRange', 'The page range specified is invalid.')
+            blob.content[start_range:end_range + 1] = page
+            stamp = self.store.touch(blob)
+            for index in range(start_range // PAGE_SIZE, (end_range + 1) // PAGE_SIZE):
+                blob.pages[index] = stamp
+            return self._page_blob_properties(blob)
+
+    def clear_page(self, container_name, blob_name, start_range, end_range, lease_id=None, if_sequence_number_lte=None,
+                   if_sequence_number_lt=None, if_sequence_number_eq=None, if_modified_since=None,
+                   if_unmodified_since=None, if_match=None, if_none_match=None, timeout=None):
+        self._validate_page_range(start_range, end_range)
+        self._simulate_request()
+        with self.store.lock:
+            blob = self._get_blob_for_update(container_name, blob_name, 'PageBlob', lease_id, if_match, if_none_match)
+            self._check_sequence_number(blob, if_sequence_number_lte, if_sequence_number_lt, if_sequence_number_eq)
+            end_range = min(end_range, len(blob.content) - 1)
+            blob.content[start_range:end_range + 1] = bytes(end_range - start_range + 1)
+            for index in range(start_range // PAGE_SIZE, (end_range + 1) // PAGE_SIZE):
+                blob.pages.pop(index, None)
+            self.store.touch(blob)
+            return self._page_blob_properties(blob)
+
+    def get_page_ranges(self, container_name, blob_name, snapshot=None, start_range=None, end_range=None, lease_id=None,
+                        if_modified_since=None, if_unmodified_since=None, if_match=None, if_none_match=None, timeout=None):
+        self._simulate_request()
+        with self.store.lock:
+            blob = self._get_blob(container_name, blob_name, snapshot)
+            blob.lease.check_read(lease_id)
+            self._check_conditions(blob, if_match, if_none_match, True)
+            indexes = self._filter_pages(blob.pages, start_range, end_range)
+            return self._to_page_ranges(indexes, False)
+
+    def get_page_ranges_diff(self, container_name, blob_name, previous_snapshot, snapshot=None, start_range=None,
+                             end_range=None, lease_id=None, if_modified_since=None, if_unmodified_since=None,
+                             if_match=None, if_none_match=None, timeout=None):
+        self._simulate_request()
+        with self.store.lock:
+            blob = self._get_blob(container_name, blob_name, snapshot)
+            previous = self._get_blob(container_name, blob_name, previous_snapshot)
+            blob.lease.check_read(lease_id)
+            self._check_conditions(blob, if_match, if_none_match, True)
+            changed = [index for index, stamp in blob.pages.items() if previous.pages.get(index) != stamp]
+            cleared = [index for index in previous.pages if index not in blob.pages]
+            ranges = self._to_page_ranges(self._filter_pages(dict.fromkeys(changed), start_range, end_range), False)
+            ranges.extend(self._to_page_ranges(self._filter_pages(dict.fromkeys(cleared), start_range, end_range), True))
+            ranges.sort(key=lambda page_range: page_range.start)
+            return ranges
+
+    def resize_blob(self, container_name, blob_name, content_length, lease_id=None, if_modified_since=None,
+                    if_unmodified_since=None, if_match=None, if_none_match=None, timeout=None):
+        if content_length % PAGE_SIZE != 0:
+            _error(400, 'InvalidHeaderValue', 'Page blob size must be aligned to a 512-byte boundary.')
+        self._simulate_request()
+        with self.store.lock:
+            blob = self._get_blob_for_update(container_name, blob_name, 'PageBlob', lease_id, if_match, if_none_match)
+            if content_length < len(blob.content):
+                del blob.content[content_length:]
+                for index in [index for index in blob.pages if index >= content_length // PAGE_SIZE]:
+                    del blob.pages[index]
+            else:
+                blob.content.extend(bytes(content_length - len(blob.content)))
+            self.store.touch(blob)
+            return self._page_blob_properties(blob)
+
+    def create_blob_from_bytes(self, container_name, blob_name, blob, index=0, count=None, content_settings=None,
+                               metadata=None, validate_content=False, progress_callback=None, max_connections=2,
+                               lease_id=None, if_modified_since=None, if_unmodified_since=None, if_match=None,
+                               if_none_match=None, timeout=None, premium_page_blob_tier=None):
+        if count is None:
+            count = len(blob) - index
+        if count % PAGE_SIZE != 0:
+            raise ValueError('Page blob size must be aligned to a 512-byte boundary.')
+        self.create_blob(container_name, blob_name, count, content_settings=content_settings, metadata=metadata,
+                         lease_id=lease_id, if_match=if_match, if_none_match=if_none_match)
+        properties = None
+        for offset in range(0, count, self.MAX_PAGE_SIZE):
+            length = min(self.MAX_PAGE_SIZE, count - offset)
+            page = bytes(blob[index + offset:index + offset + length])
+            properties = self.update_page(container_name, blob_name, page, offset, offset + length - 1, lease_id=lease_id)
+            if progress_callback:
+                progress_callback(offset + length, count)
+        return properties
+
+    def create_blob_from_stream(self, container_name, blob_name, stream, count, content_settings=None, metadata=None,
+                                validate_content=False, progress_callback=None, max_connections=2, lease_id=None,
+                                if_modified_since=None, if_unmodified_since=None, if_match=None, if_none_match=None,
+                                timeout=None, premium_page_blob_tier=None):
+        return self.create_blob_from_bytes(container_name, blob_name, stream.read(count), content_settings=content_settings,
+                                           metadata=metadata, progress_callback=progress_callback, lease_id=lease_id,
+                                           if_match=if_match, if_none_match=if_none_match)
+
+    def create_blob_from_path(self, container_name, blob_name, file_path, content_settings=None, metadata=None,
+                              validate_content=False, progress_callback=None, max_connections=2, lease_id=None,
+                              if_modified_since=None, if_unmodified_since=None, if_match=None, if_none_match=None,
+                              timeout=None, premium_page_blob_tier=None):
+        with open(file_path, 'rb') as stream:
+            return self.create_blob_from_bytes(container_name, blob_name, stream.read(), content_settings=content_settings,
+                                               metadata=metadata, progress_callback=progress_callback,
+                                               lease_id=lease_id, if_match=if_match, if_none_match=if_none_match)
+
+    def _validate_page_range(self, start_range, end_range):
+        if start_range % PAGE_SIZE != 0 or (end_range + 1) % PAGE_SIZE != 0 or end_range < start_range:
+            raise ValueError('start_range must align with 512 page size and end_range must align with 512 page size')
+
+    def _check_sequence_number(self, blob, if_sequence_number_lte, if_sequence_number_lt, if_sequence_number_eq):
+        if ((if_sequence_number_lte is not None and not blob.sequence_number <= if_sequence_number_lte) or
+                (if_sequence_number_lt is not None and not blob.sequence_number < if_sequence_number_lt) or
+                (if_sequence_number_eq is not None and not blob.sequence_number == if_sequence_number_eq)):
+            _error(412, 'SequenceNumberConditionNotMet')
+
+    def _filter_pages(self, pages, start_range, end_range):
+        first = 0 if start_range is None else start_range // PAGE_SIZE
+        last = None if end_range is None else end_range // PAGE_SIZE
+        return sorted(index for index in pages if index >= first and (last is None or index <= last))
+
+    def _to_page_ranges(self, indexes, is_cleared):
+        ranges = []
+        for index in indexes:
+            if ranges and ranges[-1].end + 1 == index * PAGE_SIZE:
+                ranges[-1].end = (index + 1) * PAGE_SIZE - 1
+            else:
+                ranges.append(PageRange(index * PAGE_SIZE, (index + 1) * PAGE_SIZE - 1, is_cleared))
+        return ranges
+
+    def _page_blob_properties(self, blob):
+        properties = self._resource_properties(blob, PageBlobProperties)
+        properties.sequence_number = blob.sequence_number
+        return properties
+
+
+#
+# Append blob service stand-in
+#
+class FakeAppendBlobService(_FakeBaseBlobService):
+
+    # Size of the blocks appended by each request of an upload, as in AppendBlobService
+    MAX_BLOCK_SIZE = 4 * 1024 * 1024
+
+    def create_blob(self, container_name, blob_name, content_settings=None, metadata=None, lease_id=None,
+                    if_modified_since=None, if_unmodified_since=None, if_match=None, if_none_match=None, timeout=None):
+        self._simulate_request()
+        with self.store.lock:
+            existing = self._get_container(container_name).blobs.get(blob_name)
+            if existing is not None and existing.committed:
+                self._check_conditions(existing, if_match, if_none_match, False)
+            blob = self._get_or_create_blob(container_name, blob_name, 'AppendBlob', lease_id)
+            self._set_blob_content(blob, b'', content_settings, metadata, compute_md5=False)
+            blob.committed_block_count = 0
+            blob.copy = None
+            self.store.touch(blob)
+            return self._resource_properties(blob)
+
+    def append_block(self, container_name, blob_name, block, validate_content=False, maxsize_condition=None,
+                     appendpos_condition=None, lease_id=None, if_modified_since=None, if_unmodified_since=None,
+                     if_match=None, if_none_match=None, timeout=None):
+        if block is None:
+            raise ValueError('block should not be None.')
+        if not isinstance(block, bytes):
+            raise TypeError('block should be of type bytes.')
+        if len(block) > MAX_APPEND_BLOCK_SIZE:
+            _error(413, 'RequestBodyTooLarge')
+
+        self._simulate_request(len(block))
+        with self.store.lock:
+            blob = self._get_blob_for_update(container_name, blob_name, 'AppendBlob', lease_id, if_match, if_none_match)
+            if maxsize_condition is not None and len(blob.content) + len(block) > maxsize_condition:
+                _error(412, 'MaxBlobSizeConditionNotMet')
+            if appendpos_condition is not None and len(blob.content) != appendpos_condition:
+                _error(412, 'AppendPositionConditionNotMet')
+            if blob.committed_block_count >= MAX_BLOCK_COUNT:
+                _error(409, 'BlockCountExceedsLimit')
+
+            properties = self._resource_properties(blob, AppendBlockProperties)
+            properties.append_offset = len(blob.content)
+            blob.content.extend(block)
+            blob.committed_block_count += 1
+            self.store.touch(blob)
+            properties.etag = blob.etag
+            properties.last_modified = blob.last_modified
+            properties.committed_block_count = blob.committed_block_count
+            return properties
+
+    def append_blob_from_bytes(self, container_name, blob_name, blob, index=0, count=None, validate_content=False,
+                               maxsize_condition=None, progress_callback=None, lease_id=None, timeout=None):
+        if count is None:
+            count = len(blob) - index
+        properties = None
+        for offset in range(0, count, self.MAX_BLOCK_SIZE):
+            length = min(self.MAX_BLOCK_SIZE, count - offset)
+            block = bytes(blob[index + offset:index + offset + length])
+            properties = self.append_block(container_name, blob_name, block, maxsize_condition=maxsize_condition,
+                                           lease_id=lease_id)
+            if progress_callback:
+                progress_callback(offset + length, count)
+        return self._resource_properties(properties) if properties is not None else None
+
+    def append_blob_from_text(self, container_name, blob_name, text, encoding='utf-8', validate_content=False,
+                              maxsize_condition=None, progress_callback=None, lease_id=None, timeout=None):
+        if not isinstance(text, bytes):
+            text = text.encode(encoding)
+        return self.append_blob_from_bytes(container_name, blob_name, text, maxsize_condition=maxsize_condition,
+                                           progress_callback=progress_callback, lease_id=lease_id)
+
+    def append_blob_from_stream(self, container_name, blob_name, stream, count=None, validate_content=False,
+                                maxsize_condition=None, progress_callback=None, lease_id=None, timeout=None):
+        content = stream.read() if count is None else stream.read(count)
+        return self.append_blob_from_bytes(container_name, blob_name, content, maxsize_condition=maxsize_condition,
+                                           progress_callback=progress_callback, lease_id=lease_id)
+
+    def append_blob_from_path(self, container_name, blob_name, file_path, validate_content=False, maxsize_condition=None,
+                              progress_callback=None, lease_id=None, timeout=None):
+        with open(file_path, 'rb') as stream:
+            return self.append_blob_from_stream(container_name, blob_name, stream, maxsize_condition=maxsize_condition,
+                                                progress_callback=progress_callback, lease_id=lease_id)
+
+
+class _FakeList(list):
+    next_marker = None
+
+
+class _FakeAcl(dict):
+    public_access = None
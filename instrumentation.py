@@ -0,0 +1,314 @@
+#----------------------------------------------------------------------------------
+# Microsoft Developer & Platform Evangelism
+#
+# Copyright (c) Microsoft Corporation. All rights reserved.
+#
+# THIS CODE AND INFORMATION ARE PROVIDED "AS IS" WITHOUT WARRANTY OF ANY KIND,
+# EITHER EXPRESSED OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE IMPLIED WARRANTIES
+# OF MERCHANTABILITY AND/OR FITNESS FOR A PARTICULAR PURPOSE.
+#----------------------------------------------------------------------------------
+# The example companies, organizations, products, domain names,
+# e-mail addresses, logos, people, places, and events depicted
+# herein are fictitious.  No association with any real company,
+# organization, product, domain name, email address, logo, person,
+# places, or events is intended or should be inferred.
+#----------------------------------------------------------------------------------
+
+import copy
+import inspect
+import json
+import os
+import threading
+import time
+from service_factory import LOCAL_METHODS
+
+# Upper bounds in seconds of the latency histogram buckets
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# Arguments of the upload methods that hold the uploaded content
+CONTENT_ARGUMENTS = ('blob', 'block', 'page', 'text')
+
+# Operation that requests and retries are counted under when they are sent from a thread the
+# wrapper does not know, such as the worker threads of a parallel SDK upload
+UNATTRIBUTED = 'unattributed'
+
+# Counters of one operation
+class _OperationMetrics():
+
+    def __init__(self, bucket_count):
+        self.count = 0
+        self.requests = 0
+        self.retries = 0
+        self.bytes_sent = 0
+        self.bytes_received = 0
+        self.errors = {}
+        self.latency_sum = 0.0
+        self.latency_buckets = [0] * bucket_count
+
+
+#
+# Blob metrics - Thread-safe counters, per operation, of calls, HTTP requests, retries, bytes sent
+# and received, errors by exception class and a latency histogram. A snapshot can be exported as
+# JSON or in the Prometheus text exposition format.
+#
+class BlobMetrics():
+
+    # Input Arguments:
+    # buckets - ascending upper bounds in seconds of the latency histogram buckets
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        self._operations = {}
+        self._lock = threading.Lock()
+
+    # Records a completed call.
+    # Input Arguments:
+    # operation - name of the service method
+    # latency - seconds the call took
+    # bytes_sent, bytes_received - content bytes uploaded and downloaded by the call
+    # error - the exception raised by the call, if any
+    def record(self, operation, latency, bytes_sent=0, bytes_received=0, error=None):
+        with self._lock:
+            metrics = self._get(operation)
+            metrics.count += 1
+            metrics.bytes_sent += bytes_sent
+            metrics.bytes_received += bytes_received
+            metrics.latency_sum += latency
+            for index, bound in enumerate(self.buckets):
+                if latency <= bound:
+                    metrics.latency_buckets[index] += 1
+                    break
+            if error is not None:
+                error_class = type(error).__name__
+                metrics.errors[error_class] = metrics.errors.get(error_class, 0) + 1
+
+    def record_request(self, operation):
+        with self._lock:
+            self._get(operation).requests += 1
+
+    def record_retry(self, operation):
+        with self._lock:
+            self._get(operation).retries += 1
+
+    def reset(self):
+        with self._lock:
+            self._operations.clear()
+
+    # Gets a dictionary of operation name to its counters, latency buckets are cumulative
+    def snapshot(self):
+        with self._lock:
+            snapshot = {}
+            for operation, metrics in self._operations.items():
+                cumulative = 0
+                buckets = []
+                for bound, count in zip(self.buckets, metrics.latency_buckets):
+                    cumulative += count
+                    buckets.append([bound, cumulative])
+                snapshot[operation] = {
+                    'count': metrics.count,
+                    'requests': metrics.requests,
+                    'retries': metrics.retries,
+                    'bytes_sent': metrics.bytes_sent,
+                    'bytes_received': metrics.bytes_received,
+                    'errors': dict(metrics.errors),
+                    'latency_sum': metrics.latency_sum,
+                    'latency_buckets': buckets,
+                }
+            return snapshot
+
+    def to_json(self, indent=2):
+        return json.dumps(self.snapshot(), indent=indent, sort_keys=True)
+
+    # Gets the metrics in the Prometheus text exposition format
+    # Input Arguments:
+    # prefix - prefix of the metric names
+    def to_prometheus(self, prefix='azure_blob'):
+        snapshot = self.snapshot()
+        operations = sorted(snapshot)
+        lines = []
+
+        def add_counter(name, help_text, key):
+            lines.append('# HELP {0}_{1} {2}'.format(prefix, name, help_text))
+            lines.append('# TYPE {0}_{1} counter'.format(prefix, name))
+            for operation in operations:
+                lines.append('{0}_{1}{{operation="{2}"}} {3}'.format(prefix, name, operation, snapshot[operation][key]))
+
+        add_counter('requests_total', 'HTTP requests sent, including retries.', 'requests')
+        add_counter('retries_total', 'Requests retried by the retry policy.', 'retries')
+        add_counter('sent_bytes_total', 'Content bytes uploaded.', 'bytes_sent')
+        add_counter('received_bytes_total', 'Content bytes downloaded.', 'bytes_received')
+
+        lines.append('# HELP {0}_errors_total Calls that raised, by exception class.'.format(prefix))
+        lines.append('# TYPE {0}_errors_total counter'.format(prefix))
+        for operation in operations:
+            for error_class, count in sorted(snapshot[operation]['errors'].items()):
+                lines.append('{0}_errors_total{{operation="{1}",error="{2}"}} {3}'.format(prefix, operation, error_class, count))
+
+        lines.append('# HELP {0}_operation_duration_seconds Latency of the service calls.'.format(prefix))
+        lines.append('# TYPE {0}_operation_duration_seconds histogram'.format(prefix))
+        for operation in operations:
+            metrics = snapshot[operation]
+            for bound, count in metrics['latency_buckets']:
+                lines.append('{0}_operation_duration_seconds_bucket{{operation="{1}",le="{2}"}} {3}'.format(
+                    prefix, operation, bound, count))
+            lines.append('{0}_operation_duration_seconds_bucket{{operation="{1}",le="+Inf"}} {2}'.format(
+                prefix, operation, metrics['count']))
+            lines.append('{0}_operation_duration_seconds_sum{{operation="{1}"}} {2}'.format(prefix, operation, metrics['latency_sum']))
+            lines.append('{0}_operation_duration_seconds_count{{operation="{1}"}} {2}'.format(prefix, operation, metrics['count']))
+
+        return '\n'.join(lines) + '\n'
+
+    def _get(self, operation):
+        metrics = self._operations.get(operation)
+        if metrics is None:
+            metrics = _OperationMetrics(len(self.buckets))
+            self._operations[operation] = metrics
+        return metrics
+
+
+# The calls running on each thread as a list of (BlobMetrics, operation name), outermost first,
+# shared by all wrappers. Wrappers can be nested, for example per sample inside one for the whole run.
+_current = threading.local()
+
+# Calls record_request or record_retry of every BlobMetrics whose call is running on this thread,
+# under the innermost operation name, or of the BlobMetrics of the wrappers of the service the
+# request was sent by when there is none
+def _record_on_current_calls(unattributed_metrics, record):
+    calls = getattr(_current, 'calls', None)
+    if not calls:
+        for metrics in unattributed_metrics:
+            record(metrics, UNATTRIBUTED)
+        return
+    recorded = []
+    for metrics, operation in reversed(calls):
+        if not any(metrics is other for other in recorded):
+            recorded.append(metrics)
+            record(metrics, operation)
+
+
+# Gets a copy of a blob service whose request_callback and retry_callback record into the calls
+# running on the thread, or into unattributed_metrics for the requests sent from threads the
+# wrappers do not know, such as the worker threads of a parallel SDK upload. The copy shares the
+# HTTP session of the service, whose own callbacks are still called but no longer changed, as
+# services can be shared (see service_factory.py). A wrapped InstrumentedBlobService is copied
+# along with the service it wraps, so every level of nested wrappers gets those requests.
+def _instrument(blob_service, unattributed_metrics):
+    if isinstance(blob_service, InstrumentedBlobService):
+        wrapper = object.__new__(InstrumentedBlobService)
+        wrapper.metrics = blob_service.metrics
+        wrapper.source_service = blob_service.source_service
+        wrapper.blob_service = _instrument(blob_service.source_service, unattributed_metrics + [blob_service.metrics])
+        return wrapper
+
+    instrumented_service = copy.copy(blob_service)
+    previous_request_callback = blob_service.request_callback
+    previous_retry_callback = blob_service.retry_callback
+
+    def request_callback(request):
+        _record_on_current_calls(unattributed_metrics, BlobMetrics.record_request)
+        if previous_request_callback:
+            previous_request_callback(request)
+
+    def retry_callback(retry_context):
+        _record_on_current_calls(unattributed_metrics, BlobMetrics.record_retry)
+        if previous_retry_callback:
+            previous_retry_callback(retry_context)
+
+    instrumented_service.request_callback = request_callback
+    instrumented_service.retry_callback = retry_callback
+    return instrumented_service
+
+#
+# Instrumented blob service - Wraps a Block, Page or Append Blob service and records every call
+# in a BlobMetrics. HTTP requests and retries are counted through the request_callback and
+# retry_callback of a copy of the wrapped service (existing callbacks are still called) and
+# attributed to the calls running on the same thread, or to this wrapper when none is. Content
+# bytes are taken from the uploaded arguments and the downloaded results.
+#
+class InstrumentedBlobService():
+
+    # Input Arguments:
+    # blob_service - BlockBlobService, PageBlobService or AppendBlobService to wrap
+    # metrics - BlobMetrics to record into, several services can share one
+    def __init__(self, blob_service, metrics=None):
+        self.metrics = metrics if metrics is not None else BlobMetrics()
+        self.source_service = blob_service
+        self.blob_service = _instrument(blob_service, [self.metrics])
+
+    def __getattr__(self, name):
+        attribute = getattr(self.blob_service, name)
+        if not callable(attribute) or name.startswith(LOCAL_METHODS):
+            return attribute
+
+        def call(*args, **kwargs):
+            calls = _current.__dict__.setdefault('calls', [])
+            calls.append((self.metrics, name))
+            start = time.time()
+            try:
+                result = attribute(*args, **kwargs)
+            except Exception as e:
+                self.metrics.record(name, time.time() - start, error=e)
+                raise
+            finally:
+                calls.pop()
+
+            self.metrics.record(name, time.time() - start, self._get_bytes_sent(attribute, args, kwargs),
+                                self._get_bytes_received(name, result))
+            return result
+        return call
+
+    def _get_bytes_sent(self, method, args, kwargs):
+        try:
+            arguments = inspect.signature(method).bind_partial(*args, **kwargs).arguments
+        except TypeError:
+            return 0
+
+        for name in CONTENT_ARGUMENTS:
+            content = arguments.get(name)
+            if isinstance(content, (bytes, bytearray, memoryview)):
+                return len(content)
+            if isinstance(content, str):
+                return len(content.encode(arguments.get('encoding') or 'utf-8'))
+        if arguments.get('file_path'):
+            return os.path.getsize(arguments['file_path'])
+        if arguments.get('stream') is not None and arguments.get('count'):
+            return arguments['count']
+        return 0
+
+    def _get_bytes_received(self, name, result):
+        if not name.startswith('get_blob_to_'):
+            return 0
+        if isinstance(result.content, bytes):
+            return len(result.content)
+        if isinstance(result.content, str):
+            return len(result.content.encode('utf-8'))
+        # get_blob_to_path and get_blob_to_stream return the Blob without its content
+        return result.properties.content_length or 0
+
+
+#
+# A storage account whose create_*_service methods return InstrumentedBlobService objects that
+# record into one shared BlobMetrics. Other attributes come from the wrapped account.
+#
+class InstrumentedStorageAccount():
+
+    # Input Arguments:
+    # account - CloudStorageAccount, PooledStorageAccount or FakeStorageAccount to wrap
+    # metrics - BlobMetrics to record into
+    def __init__(self, account, metrics=None):
+        self.account = account
+        self.metrics = metrics if metrics is not None else BlobMetrics()
+
+    def create_block_blob_service(self):
+        return InstrumentedBlobService(self.account.create_block_blob_service(), self.metrics)
+
+    def create_page_blob_service(self):
+        return InstrumentedBlobService(self.account.create_page_blob_service(), self.metrics)
+
+    def create_append_blob_service(self):
+        return InstrumentedBlobService(self.account.create_append_blob_service(), self.metrics)
+
+    def with_sas_token(self, sas_token):
+        return InstrumentedStorageAccount(self.account.with_sas_token(sas_token), self.metrics)
+
+    def __getattr__(self, name):
+        return getattr(self.account, name)
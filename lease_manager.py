@@ -0,0 +1,201 @@
+#----------------------------------------------------------------------------------
+# Microsoft Developer & Platform Evangelism
+#
+# Copyright (c) Microsoft Corporation. All rights reserved.
+#
+# THIS CODE AND INFORMATION ARE PROVIDED "AS IS" WITHOUT WARRANTY OF ANY KIND,
+# EITHER EXPRESSED OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE IMPLIED WARRANTIES
+# OF MERCHANTABILITY AND/OR FITNESS FOR A PARTICULAR PURPOSE.
+#----------------------------------------------------------------------------------
+# The example companies, organizations, products, domain names,
+# e-mail addresses, logos, people, places, and events depicted
+# herein are fictitious.  No association with any real company,
+# organization, product, domain name, email address, logo, person,
+# places, or events is intended or should be inferred.
+#----------------------------------------------------------------------------------
+
+import heapq
+import itertools
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from azure.common import AzureHttpError
+
+# Leases are renewed when this fraction of their duration has passed
+RENEW_FRACTION = 0.5
+
+# Seconds to wait before trying again a renewal that failed for a transient reason
+RENEW_RETRY_INTERVAL = 1.0
+
+# Status codes meaning the lease was lost: broken, released or taken by someone else
+LEASE_LOST_STATUS_CODES = (409, 412)
+
+# Status codes of a release meaning there is no lease left to release: the resource was deleted
+# (404, or 409 ContainerBeingDeleted while a container is being deleted) or the lease was lost (409)
+ALREADY_RELEASED_STATUS_CODES = (404, 409)
+
+#
+# Managed lease - A blob or container lease held by a LeaseManager. Used as a context manager it
+# acquires the lease on entry and releases it on exit. lease_id is the ID to pass to writes such as
+# put_block or delete_blob. If a renewal fails because the lease was broken or taken, lost is set
+# and error holds the exception, the writes then fail with the service's lease errors.
+#
+class ManagedLease():
+
+    def __init__(self, manager, blob_service, container_name, blob_name, lease_duration, proposed_lease_id):
+        self.manager = manager
+        self.blob_service = blob_service
+        self.container_name = container_name
+        self.blob_name = blob_name
+        self.lease_duration = lease_duration
+        self.lease_id = proposed_lease_id
+        self.renewals = 0
+        self.lost = False
+        self.error = None
+        self.active = False
+        # Held during a renewal so a release never overtakes it
+        self._lock = threading.Lock()
+        self._expires_at = None
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.release()
+
+    def acquire(self):
+        if self.blob_name is None:
+            self.lease_id = self.blob_service.acquire_container_lease(
+                self.container_name, self.lease_duration, self.lease_id)
+        else:
+            self.lease_id = self.blob_service.acquire_blob_lease(
+                self.container_name, self.blob_name, self.lease_duration, self.lease_id)
+        self._expires_at = time.monotonic() + self.lease_duration
+        self.active = True
+        self.manager._schedule(self, self.lease_duration * RENEW_FRACTION)
+
+    # Stops renewing the lease and releases it, unless it was lost or the leased resource was deleted
+    def release(self):
+        with self._lock:
+            if not self.active:
+                return
+            self.active = False
+            if self.lost:
+                return
+            try:
+                if self.blob_name is None:
+                    self.blob_service.release_container_lease(self.container_name, self.lease_id)
+                else:
+                    self.blob_service.release_blob_lease(self.container_name, self.blob_name, self.lease_id)
+            except AzureHttpError as e:
+                if e.status_code not in ALREADY_RELEASED_STATUS_CODES:
+                    raise
+
+    # Renews the lease and returns the seconds until the next renewal, or None to stop renewing
+    def _renew(self):
+        with self._lock:
+            if not self.active:
+                return None
+            try:
+                if self.blob_name is None:
+                    self.blob_service.renew_container_lease(self.container_name, self.lease_id)
+                else:
+                    self.blob_service.renew_blob_lease(self.container_name, self.blob_name, self.lease_id)
+            except Exception as e:
+                if isinstance(e, AzureHttpError) and e.status_code in LEASE_LOST_STATUS_CODES \
+                        or time.monotonic() >= self._expires_at:
+                    self.lost = True
+                    self.error = e
+                    return None
+                # Try again while the lease has not expired
+                return min(RENEW_RETRY_INTERVAL, max(0.0, self._expires_at - time.monotonic()))
+
+            self.renewals += 1
+            self._expires_at = time.monotonic() + self.lease_duration
+            return self.lease_duration * RENEW_FRACTION
+
+
+#
+# Lease manager - Keeps any number of fixed-duration leases alive from one scheduler thread: the
+# next renewal of every lease is kept in a single heap ordered by due time, the thread sleeps until
+# the earliest one and hands the due renewals to a small pool so a slow request does not delay the
+# others. Leases of 15 to 60 seconds expire on their own shortly after a worker dies, unlike
+# infinite leases, while a live worker can hold them for as long as it needs.
+#
+class LeaseManager():
+
+    # Input Arguments:
+    # max_workers - number of renewal requests sent at once
+    def __init__(self, max_workers=4):
+        if max_workers <= 0:
+            raise ValueError('max_workers must be at least 1')
+
+        self._heap = []
+        self._sequence = itertools.count()
+        self._condition = threading.Condition()
+        self._closed = False
+        self._executor = ThreadPoolExecutor(max_workers=max_workers)
+        self._thread = threading.Thread(target=self._run)
+        self._thread.daemon = True
+        self._thread.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    # Gets a ManagedLease on a blob, acquired when used as a context manager or by calling acquire().
+    # Input Arguments:
+    # blob_service - Block, Page or Append Blob service
+    # container_name, blob_name - the leased blob
+    # lease_duration - seconds between 15 and 60, the lease lasts this long after the last renewal
+    # proposed_lease_id - lease ID to use, the service generates one when None
+    def lease_blob(self, blob_service, container_name, blob_name, lease_duration=15, proposed_lease_id=None):
+        self._check_duration(lease_duration)
+        return ManagedLease(self, blob_service, container_name, blob_name, lease_duration, proposed_lease_id)
+
+    # Gets a ManagedLease on a container, see lease_blob
+    def lease_container(self, blob_service, container_name, lease_duration=15, proposed_lease_id=None):
+        self._check_duration(lease_duration)
+        return ManagedLease(self, blob_service, container_name, None, lease_duration, proposed_lease_id)
+
+    # Stops the scheduler. Leases still held are no longer renewed and expire on their own.
+    def close(self):
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+        self._thread.join()
+        self._executor.shutdown(wait=True)
+
+    def _check_duration(self, lease_duration):
+        if not 15 <= lease_duration <= 60:
+            raise ValueError('lease_duration must be between 15 and 60 seconds')
+
+    def _schedule(self, lease, delay):
+        with self._condition:
+            if self._closed:
+                raise ValueError('The lease manager is closed')
+            heapq.heappush(self._heap, (time.monotonic() + delay, next(self._sequence), lease))
+            self._condition.notify_all()
+
+    def _run(self):
+        with self._condition:
+            while not self._closed:
+                now = time.monotonic()
+                while self._heap and self._heap[0][0] <= now:
+                    lease = heapq.heappop(self._heap)[2]
+                    # Released leases stay in the heap until they are due
+                    if lease.active:
+                        self._executor.submit(self._renew, lease)
+                timeout = self._heap[0][0] - now if self._heap else None
+                self._condition.wait(timeout)
+
+    def _renew(self, lease):
+        delay = lease._renew()
+        if delay is not None:
+            with self._condition:
+                if not self._closed:
+                    heapq.heappush(self._heap, (time.monotonic() + delay, next(self._sequence), lease))
+                    self._condition.notify_all()
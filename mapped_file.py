@@ -0,0 +1,57 @@
+#----------------------------------------------------------------------------------
+# Microsoft Developer & Platform Evangelism
+#
+# Copyright (c) Microsoft Corporation. All rights reserved.
+#
+# THIS CODE AND INFORMATION ARE PROVIDED "AS IS" WITHOUT WARRANTY OF ANY KIND,
+# EITHER EXPRESSED OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE IMPLIED WARRANTIES
+# OF MERCHANTABILITY AND/OR FITNESS FOR A PARTICULAR PURPOSE.
+#----------------------------------------------------------------------------------
+# The example companies, organizations, products, domain names,
+# e-mail addresses, logos, people, places, and events depicted
+# herein are fictitious.  No association with any real company,
+# organization, product, domain name, email address, logo, person,
+# places, or events is intended or should be inferred.
+#----------------------------------------------------------------------------------
+
+import mmap
+import os
+
+#
+# Memory-mapped upload source - Maps a local file read-only so upload workers can take their
+# ranges straight from the page cache. view() returns a memoryview slice without copying, which
+# is enough to inspect the content (for example to skip pages of zeros). The blob services only
+# accept bytes for update_page and do not rewind stream bodies when a request is retried, so
+# read() copies a range exactly once, into the bytes object sent with the request, instead of
+# going through a file buffer first. Any number of threads can read ranges at the same time.
+#
+class MappedFile():
+
+    # Input Arguments:
+    # file_path - path of the file to map
+    def __init__(self, file_path):
+        self._file = open(file_path, 'rb')
+        self.size = os.fstat(self._file.fileno()).st_size
+        # Empty files cannot be mapped
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if self.size > 0 else b''
+        self._view = memoryview(self._map)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    # Gets a memoryview of length bytes at offset, shorter at the end of the file. Release it before close().
+    def view(self, offset, length):
+        return self._view[offset:offset + length]
+
+    # Gets a copy of length bytes at offset as bytes, shorter at the end of the file
+    def read(self, offset, length):
+        return self._map[offset:offset + length]
+
+    def close(self):
+        self._view.release()
+        if self.size > 0:
+            self._map.close()
+        self._file.close()
@@ -0,0 +1,228 @@
+#----------------------------------------------------------------------------------
+# Microsoft Developer & Platform Evangelism
+#
+# Copyright (c) Microsoft Corporation. All rights reserved.
+#
+# THIS CODE AND INFORMATION ARE PROVIDED "AS IS" WITHOUT WARRANTY OF ANY KIND,
+# EITHER EXPRESSED OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE IMPLIED WARRANTIES
+# OF MERCHANTABILITY AND/OR FITNESS FOR A PARTICULAR PURPOSE.
+#----------------------------------------------------------------------------------
+# The example companies, organizations, products, domain names,
+# e-mail addresses, logos, people, places, and events depicted
+# herein are fictitious.  No association with any real company,
+# organization, product, domain name, email address, logo, person,
+# places, or events is intended or should be inferred.
+#----------------------------------------------------------------------------------
+
+import datetime
+import json
+import os
+import threading
+from concurrent.futures import FIRST_EXCEPTION, ThreadPoolExecutor, wait
+from azure.common import AzureMissingResourceHttpError
+from blob_downloader import MAX_VALIDATED_RANGE_SIZE
+
+# Name of the manifest in a backup directory
+MANIFEST_NAME = 'manifest.json'
+
+#
+# Incremental page blob backup - Backs up a page blob (such as a VM disk) into a local directory.
+# Every backup takes a snapshot of the blob. The first one downloads the written page ranges of the
+# snapshot into a sparse image file of the blob's size; the next ones ask the service which page
+# ranges changed since the previous snapshot (get_page_ranges_diff) and download only those, one
+# after the other, into a delta file. Ranges are split into requests of up to range_size bytes
+# fetched in parallel. manifest.json chains the backups: for each one its snapshot, the previous
+# snapshot, the blob size, its file and the ranges it holds, including ranges that were cleared.
+# Once a backup is recorded, the snapshot before it is no longer needed and is deleted; the snapshot
+# of a backup that fails is deleted right away.
+#
+class IncrementalPageBlobBackup():
+
+    # Input Arguments:
+    # pageblob_service - PageBlobService used to snapshot and read the blob
+    # range_size - largest range read in a single request
+    # max_workers - number of range requests kept in flight at once
+    # delete_previous_snapshot - delete the snapshot of the previous backup once the new one is recorded
+    def __init__(self, pageblob_service, range_size=MAX_VALIDATED_RANGE_SIZE, max_workers=8, delete_previous_snapshot=True):
+        if range_size <= 0 or range_size % 512 != 0:
+            raise ValueError('range_size must be a positive multiple of 512 bytes')
+        if max_workers <= 0:
+            raise ValueError('max_workers must be at least 1')
+
+        self.pageblob_service = pageblob_service
+        self.range_size = range_size
+        self.max_workers = max_workers
+        self.delete_previous_snapshot = delete_previous_snapshot
+
+    # Backs up a page blob, incrementally when the directory already holds a backup of it.
+    # Input Arguments:
+    # container_name - name of the container
+    # blob_name - name of the page blob
+    # backup_dir - local directory of the backups of this blob, created if it does not exist
+    # Returns the manifest entry of the new backup
+    def backup(self, container_name, blob_name, backup_dir):
+        if not os.path.isdir(backup_dir):
+            os.makedirs(backup_dir)
+        manifest = self.read_manifest(backup_dir)
+        if manifest is None:
+            manifest = {'container': container_name, 'blob': blob_name, 'backups': []}
+        elif manifest['container'] != container_name or manifest['blob'] != blob_name:
+            raise ValueError('backup_dir holds the backups of another blob')
+
+        snapshot = self.pageblob_service.snapshot_blob(container_name, blob_name).snapshot
+        # Snapshots are billed, a failed backup deletes the one it took
+        try:
+            entry = self._backup_snapshot(container_name, blob_name, snapshot, backup_dir, manifest)
+        except Exception:
+            try:
+                self.pageblob_service.delete_blob(container_name, blob_name, snapshot=snapshot)
+            except Exception:
+                # The error of the backup is the one reported
+                pass
+            raise
+
+        if self.delete_previous_snapshot and len(manifest['backups']) > 1:
+            try:
+                self.pageblob_service.delete_blob(container_name, blob_name, snapshot=manifest['backups'][-2]['snapshot'])
+            except AzureMissingResourceHttpError:
+                pass
+        return entry
+
+    # Downloads the pages of a new snapshot and records them in the manifest
+    def _backup_snapshot(self, container_name, blob_name, snapshot, backup_dir, manifest):
+        size = self.pageblob_service.get_blob_properties(container_name, blob_name, snapshot=snapshot).properties.content_length
+        previous = manifest['backups'][-1] if manifest['backups'] else None
+
+        ranges = None
+        if previous is not None:
+            try:
+                ranges = self.pageblob_service.get_page_ranges_diff(container_name, blob_name, previous['snapshot'],
+                                                                    snapshot=snapshot)
+            except AzureMissingResourceHttpError:
+                # The previous snapshot was deleted, start a new chain with a full backup
+                previous = None
+
+        index = len(manifest['backups'])
+        if previous is None:
+            file_name = '{0:06d}-full.img'.format(index)
+            written = [(page_range.start, page_range.end)
+                       for page_range in self.pageblob_service.get_page_ranges(container_name, blob_name, snapshot=snapshot)]
+            cleared = []
+            self._download_ranges(container_name, blob_name, snapshot, written, os.path.join(backup_dir, file_name),
+                                  size, in_place=True)
+        else:
+            file_name = '{0:06d}-delta.bin'.format(index)
+            written = [(page_range.start, page_range.end) for page_range in ranges if not page_range.is_cleared]
+            cleared = [(page_range.start, page_range.end) for page_range in ranges if page_range.is_cleared]
+            self._download_ranges(container_name, blob_name, snapshot, written, os.path.join(backup_dir, file_name),
+                                  sum(end - start + 1 for start, end in written), in_place=False)
+
+        entry = {
+            'snapshot': snapshot,
+            'previous_snapshot': previous['snapshot'] if previous else None,
+            'type': 'full' if previous is None else 'delta',
+            'file': file_name,
+            'size': size,
+            'ranges': written,
+            'cleared': cleared,
+            'bytes': sum(end - start + 1 for start, end in written),
+            'time': datetime.datetime.utcnow().isoformat() + 'Z',
+        }
+        manifest['backups'].append(entry)
+        self._write_manifest(backup_dir, manifest)
+        return entry
+
+    # Rebuilds the content of the blob at a backed up snapshot into a local file, sparse where the
+    # blob has no pages.
+    # Input Arguments:
+    # backup_dir - directory holding the backups
+    # file_path - path of the file to write, replaced if it exists
+    # snapshot - snapshot to restore, the latest backup when None
+    def restore(self, backup_dir, file_path, snapshot=None):
+        manifest = self.read_manifest(backup_dir)
+        if manifest is None or not manifest['backups']:
+            raise ValueError('backup_dir holds no backup')
+        backups = manifest['backups']
+        if snapshot is None:
+            last = len(backups) - 1
+        else:
+            last = next((index for index, entry in enumerate(backups) if entry['snapshot'] == snapshot), None)
+            if last is None:
+                raise ValueError('No backup of snapshot ' + snapshot)
+        first = max(index for index in range(last + 1) if backups[index]['type'] == 'full')
+
+        with open(file_path, 'wb') as target:
+            for entry in backups[first:last + 1]:
+                target.truncate(entry['size'])
+                with open(os.path.join(backup_dir, entry['file']), 'rb') as source:
+                    for start, end in entry['ranges']:
+                        if start >= entry['size']:
+                            continue
+                        if entry['type'] == 'full':
+                            source.seek(start)
+                        target.seek(start)
+                        remaining = end - start + 1
+                        while remaining > 0:
+                            data = source.read(min(remaining, self.range_size))
+                            target.write(data)
+                            remaining -= len(data)
+                for start, end in entry['cleared']:
+                    if start < entry['size']:
+                        target.seek(start)
+                        target.write(bytes(min(end, entry['size'] - 1) - start + 1))
+
+    # Gets the manifest of a backup directory, or None when there is none
+    def read_manifest(self, backup_dir):
+        try:
+            with open(os.path.join(backup_dir, MANIFEST_NAME)) as manifest_file:
+                return json.load(manifest_file)
+        except IOError:
+            return None
+
+    # Replaces the manifest in one step so an interrupted backup leaves the previous one intact
+    def _write_manifest(self, backup_dir, manifest):
+        path = os.path.join(backup_dir, MANIFEST_NAME)
+        with open(path + '.tmp', 'w') as manifest_file:
+            json.dump(manifest, manifest_file, indent=2)
+        os.replace(path + '.tmp', path)
+
+    # Downloads ranges of a snapshot into a file of file_size bytes, at their offset in the blob when
+    # in_place is True, otherwise one after the other
+    def _download_ranges(self, container_name, blob_name, snapshot, ranges, file_path, file_size, in_place):
+        requests = []
+        position = 0
+        for start, end in ranges:
+            for offset in range(start, end + 1, self.range_size):
+                length = min(self.range_size, end + 1 - offset)
+                requests.append((offset, length, offset if in_place else position))
+                position += length
+        validate_content = self.range_size <= MAX_VALIDATED_RANGE_SIZE
+        lock = threading.Lock()
+        errors = []
+
+        with open(file_path, 'wb+') as file:
+            file.truncate(file_size)
+
+            def download(offset, length, file_offset):
+                # A range a worker takes after the first failure, before it is cancelled, is skipped
+                if errors:
+                    return
+                try:
+                    blob = self.pageblob_service.get_blob_to_bytes(container_name, blob_name, snapshot=snapshot,
+                                                                   start_range=offset, end_range=offset + length - 1,
+                                                                   validate_content=validate_content)
+                    with lock:
+                        file.seek(file_offset)
+                        file.write(blob.content)
+                except Exception as e:
+                    errors.append(e)
+                    raise
+
+            # The ranges not started yet are cancelled after the first failure
+            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                futures = [executor.submit(download, *request) for request in requests]
+                done, not_done = wait(futures, return_when=FIRST_EXCEPTION)
+                for future in not_done:
+                    future.cancel()
+        if errors:
+            raise errors[0]
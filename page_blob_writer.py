@@ -0,0 +1,215 @@
+#----------------------------------------------------------------------------------
+# Microsoft Developer & Platform Evangelism
+#
+# Copyright (c) Microsoft Corporation. All rights reserved.
+#
+# THIS CODE AND INFORMATION ARE PROVIDED "AS IS" WITHOUT WARRANTY OF ANY KIND,
+# EITHER EXPRESSED OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE IMPLIED WARRANTIES
+# OF MERCHANTABILITY AND/OR FITNESS FOR A PARTICULAR PURPOSE.
+#----------------------------------------------------------------------------------
+# The example companies, organizations, products, domain names,
+# e-mail addresses, logos, people, places, and events depicted
+# herein are fictitious.  No association with any real company,
+# organization, product, domain name, email address, logo, person,
+# places, or events is intended or should be inferred.
+#----------------------------------------------------------------------------------
+
+import functools
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from mapped_file import MappedFile
+from transfer_tuner import with_retry_hook
+
+# Page blobs are written in 512 byte pages and a single update_page call may carry up to 4 MB
+PAGE_SIZE = 512
+MAX_RANGE_SIZE = 4 * 1024 * 1024
+
+# Compared against pages and appended to the final partial page, never modified
+ZERO_PAGE = bytes(PAGE_SIZE)
+
+#
+# Sparse page blob writer - Uploads disk-image like content to a page blob.
+# Contiguous non-empty pages are coalesced into ranges of up to 4 MB, pages that only
+# contain zeros are never sent so the blob stays sparse, and the ranges are written
+# by several threads at once.
+#
+class SparsePageBlobWriter():
+
+    # Input Arguments:
+    # pageblob_service - PageBlobService used to write the pages
+    # max_range_size - largest range sent in a single update_page call, a multiple of 512 up to 4 MB
+    # max_workers - number of update_page requests kept in flight at once
+    # tuner - TransferTuner (see transfer_tuner.py) that sets the number of requests in flight
+    #         instead of max_workers as the upload goes, ranges still follow the pages of data
+    def __init__(self, pageblob_service, max_range_size=MAX_RANGE_SIZE, max_workers=8, tuner=None):
+        if max_range_size <= 0 or max_range_size % PAGE_SIZE != 0 or max_range_size > MAX_RANGE_SIZE:
+            raise ValueError('max_range_size must be a multiple of 512 bytes no larger than 4 MB')
+        if max_workers <= 0:
+            raise ValueError('max_workers must be at least 1')
+
+        self.pageblob_service = pageblob_service if tuner is None else with_retry_hook(pageblob_service)
+        self.max_range_size = max_range_size
+        self.max_workers = max_workers
+        self.tuner = tuner
+        self._zero_range = memoryview(bytes(max_range_size))
+
+    # Creates a page blob sized to the file (rounded up to a whole page) and uploads the file into it.
+    # Input Arguments:
+    # container_name - name of an existing container
+    # blob_name - name of the page blob to create or overwrite
+    # file_path - path of the file to upload
+    # Returns the number of bytes actually sent to the service
+    def upload_file(self, container_name, blob_name, file_path, lease_id=None):
+        file_size = os.path.getsize(file_path)
+        blob_size = (file_size + PAGE_SIZE - 1) // PAGE_SIZE * PAGE_SIZE
+        self.pageblob_service.create_blob(container_name, blob_name, blob_size, lease_id=lease_id)
+
+        return self.write_file(container_name, blob_name, file_path, lease_id=lease_id)
+
+    # Writes a local file into an existing page blob. The file is memory-mapped: pages of zeros are
+    # found in place without being copied, and each range is copied once, straight from the map,
+    # by the thread that sends it. The last partial page is padded with zeros and sent on its own.
+    # Input Arguments:
+    # container_name - name of an existing container
+    # blob_name - name of an existing page blob, large enough to hold the file
+    # file_path - path of the file to upload
+    # offset - page aligned position in the blob where the file content starts
+    # Returns the number of bytes actually sent to the service
+    def write_file(self, container_name, blob_name, file_path, offset=0, lease_id=None):
+        if offset % PAGE_SIZE != 0:
+            raise ValueError('offset must be aligned to a 512 byte page boundary')
+
+        with MappedFile(file_path) as source:
+            def get_ranges():
+                for chunk_start in range(0, source.size, self.max_range_size):
+                    view = source.view(chunk_start, self.max_range_size)
+                    ranges = self._get_data_ranges(view)
+                    view.release()
+                    for start, end in ranges:
+                        for page_range in self._split_final_page(chunk_start + start, chunk_start + end, source.read, offset):
+                            yield page_range
+
+            return self._write_ranges(container_name, blob_name, get_ranges(), lease_id)
+
+    # Writes the content of a readable binary stream into an existing page blob.
+    # The last partial page is padded with zeros and sent on its own.
+    # Input Arguments:
+    # container_name - name of an existing container
+    # blob_name - name of an existing page blob, large enough to hold the stream
+    # stream - readable binary stream
+    # offset - page aligned position in the blob where the stream content starts
+    # Returns the number of bytes actually sent to the service
+    def write_stream(self, container_name, blob_name, stream, offset=0, lease_id=None):
+        if offset % PAGE_SIZE != 0:
+            raise ValueError('offset must be aligned to a 512 byte page boundary')
+
+        def get_ranges(offset):
+            while True:
+                chunk = stream.read(self.max_range_size)
+                if len(chunk) == 0:
+                    break
+
+                def read(position, length, chunk=chunk):
+                    return chunk[position:position + length]
+
+                for start, end in self._get_data_ranges(chunk):
+                    for page_range in self._split_final_page(start, end, read, offset):
+                        yield page_range
+
+                offset += len(chunk)
+
+        return self._write_ranges(container_name, blob_name, get_ranges(offset), lease_id)
+
+    # Sends ranges from several threads.
+    # Input Arguments:
+    # ranges - iterable of (page aligned position in the blob, length, function returning the page aligned data)
+    # Returns the number of bytes sent
+    def _write_ranges(self, container_name, blob_name, ranges, lease_id):
+        futures = []
+        errors = []
+        sent = 0
+        # Ranges held in memory, either queued or being sent. With a tuner every range is sent as
+        # soon as it is submitted, so the limit is the number of requests in flight.
+        in_flight = [0]
+        condition = threading.Condition()
+        if self.tuner is None:
+            workers = self.max_workers
+            get_limit = lambda: self.max_workers * 2
+        else:
+            workers = self.tuner.max_concurrency
+            get_limit = lambda: self.tuner.concurrency
+
+        def update_page(start, get_data):
+            try:
+                data = get_data()
+                if self.tuner is None:
+                    self.pageblob_service.update_page(container_name, blob_name, data, start, start + len(data) - 1,
+                                                      lease_id=lease_id)
+                else:
+                    self.tuner.run(len(data), self.pageblob_service.update_page, container_name, blob_name, data,
+                                   start, start + len(data) - 1, lease_id=lease_id)
+            except Exception as e:
+                errors.append(e)
+                raise
+            finally:
+                with condition:
+                    in_flight[0] -= 1
+                    condition.notify_all()
+
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            for start, length, get_data in ranges:
+                with condition:
+                    while in_flight[0] >= get_limit():
+                        condition.wait()
+                    if errors:
+                        break
+                    in_flight[0] += 1
+                futures.append(executor.submit(update_page, start, get_data))
+                sent += length
+
+        for future in futures:
+            future.result()
+
+        return sent
+
+    # Splits a [start, end) range of data whose end is not page aligned into its whole pages and its
+    # final partial page, padded with zeros on its own so the padding copies less than a page instead
+    # of the whole range.
+    # Input Arguments:
+    # start, end - positions of the range in the source
+    # read - function(position, length) returning bytes of the source
+    # offset - position in the blob where the source starts
+    # Returns a generator of (position in the blob, length, function returning the page aligned data)
+    def _split_final_page(self, start, end, read, offset):
+        aligned_end = start + (end - start) // PAGE_SIZE * PAGE_SIZE
+        if aligned_end > start:
+            yield offset + start, aligned_end - start, functools.partial(read, start, aligned_end - start)
+        if aligned_end < end:
+            yield offset + aligned_end, PAGE_SIZE, functools.partial(self._read_final_page, read, aligned_end, end - aligned_end)
+
+    def _read_final_page(self, read, position, length):
+        return read(position, length) + ZERO_PAGE[length:]
+
+    # Gets the [start, end) byte ranges of a chunk (bytes or memoryview) that contain at least one
+    # non-zero byte. Adjacent non-empty pages are returned as a single range. A partial last page
+    # counts as empty when it only contains zeros.
+    def _get_data_ranges(self, chunk):
+        ranges = []
+        view = memoryview(chunk)
+        if view == self._zero_range[:len(view)]:
+            return ranges
+
+        range_start = None
+        for position in range(0, len(view), PAGE_SIZE):
+            page = view[position:position + PAGE_SIZE]
+            if page == ZERO_PAGE[:len(page)]:
+                if range_start is not None:
+                    ranges.append((range_start, position))
+                    range_start = None
+            elif range_start is None:
+                range_start = position
+
+        if range_start is not None:
+            ranges.append((range_start, len(view)))
+        return ranges
@@ -0,0 +1,172 @@
+#----------------------------------------------------------------------------------
+# Microsoft Developer & Platform Evangelism
+#
+# Copyright (c) Microsoft Corporation. All rights reserved.
+#
+# THIS CODE AND INFORMATION ARE PROVIDED "AS IS" WITHOUT WARRANTY OF ANY KIND,
+# EITHER EXPRESSED OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE IMPLIED WARRANTIES
+# OF MERCHANTABILITY AND/OR FITNESS FOR A PARTICULAR PURPOSE.
+#----------------------------------------------------------------------------------
+# The example companies, organizations, products, domain names,
+# e-mail addresses, logos, people, places, and events depicted
+# herein are fictitious.  No association with any real company,
+# organization, product, domain name, email address, logo, person,
+# places, or events is intended or should be inferred.
+#----------------------------------------------------------------------------------
+
+import threading
+import time
+from collections import OrderedDict
+from azure.common import AzureHttpError
+from service_factory import LOCAL_METHODS
+
+# Methods of the blob services that never change a container or a blob
+READ_ONLY_METHODS = ('get_', 'list_', 'exists') + LOCAL_METHODS
+
+# Gets the container and blob a blob service method was called for. Every container method takes
+# container_name first and every blob method takes container_name and blob_name first, passed by
+# position or by keyword. The arguments are read directly rather than bound to the signature of
+# the method, which a wrapper such as InstrumentedBlobService hides behind (*args, **kwargs).
+# Returns (container_name, blob_name), blob_name is None for container methods and both are None
+# for account methods.
+def get_called_names(method_name, args, kwargs):
+    container_name = kwargs['container_name'] if 'container_name' in kwargs else (args[0] if args else None)
+    if not isinstance(container_name, str):
+        return None, None
+    if 'container' in method_name:
+        return container_name, None
+    blob_name = kwargs['blob_name'] if 'blob_name' in kwargs else (args[1] if len(args) > 1 else None)
+    return container_name, blob_name
+
+
+# Wraps a method of a blob service that writes so that invalidate(container_name, blob_name) of a
+# cache is called once it returns or raises. Used by the caches of properties and of content.
+def invalidating(cache, method_name, method):
+    def write(*args, **kwargs):
+        try:
+            return method(*args, **kwargs)
+        finally:
+            container_name, blob_name = get_called_names(method_name, args, kwargs)
+            if container_name is not None:
+                cache.invalidate(container_name, blob_name)
+    return write
+
+
+#
+# Caching blob service - Wraps a Block, Page or Append Blob service and keeps the properties and
+# metadata of recently used blobs and containers in a bounded LRU cache. Entries younger than ttl
+# seconds are returned without a request. Older blob entries are revalidated with a conditional
+# request on their ETag, which the service answers with 304 Not Modified and no body when the blob
+# is unchanged. Every other method is passed to the wrapped service, and a method that writes
+# drops the cached entries of the container and blob it was called for. Reads with an access
+# condition are passed to the service, which evaluates it.
+# Changes made through other clients are seen once an entry is older than ttl.
+#
+class CachingBlobService():
+
+    # Input Arguments:
+    # blob_service - BlockBlobService, PageBlobService or AppendBlobService to wrap
+    # max_entries - number of blobs and containers kept, the least recently used one is dropped first
+    # ttl - seconds an entry is returned without checking the service
+    def __init__(self, blob_service, max_entries=1024, ttl=30.0):
+        if max_entries <= 0:
+            raise ValueError('max_entries must be at least 1')
+
+        self.blob_service = blob_service
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.revalidations = 0
+
+        # (container_name, blob_name, snapshot) -> [time checked, Blob or Container]
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    # Gets the Blob (without content) with its properties and metadata, see BaseBlobService.get_blob_properties
+    def get_blob_properties(self, container_name, blob_name, snapshot=None, lease_id=None, if_modified_since=None,
+                            if_unmodified_since=None, if_match=None, if_none_match=None, timeout=None):
+        if (if_modified_since is not None or if_unmodified_since is not None or if_match is not None or
+                if_none_match is not None):
+            return self.blob_service.get_blob_properties(container_name, blob_name, snapshot=snapshot, lease_id=lease_id,
+                                                         if_modified_since=if_modified_since,
+                                                         if_unmodified_since=if_unmodified_since, if_match=if_match,
+                                                         if_none_match=if_none_match, timeout=timeout)
+
+        key = (container_name, blob_name, snapshot)
+        entry = self._get_entry(key)
+        if entry is not None and time.time() - entry[0] < self.ttl:
+            self._count('hits')
+            return entry[1]
+
+        if entry is not None:
+            try:
+                blob = self.blob_service.get_blob_properties(container_name, blob_name, snapshot=snapshot,
+                                                             lease_id=lease_id,
+                                                             if_none_match=entry[1].properties.etag, timeout=timeout)
+            except AzureHttpError as e:
+                if e.status_code != 304:
+                    raise
+                self._count('revalidations')
+                entry[0] = time.time()
+                return entry[1]
+        else:
+            blob = self.blob_service.get_blob_properties(container_name, blob_name, snapshot=snapshot,
+                                                         lease_id=lease_id, timeout=timeout)
+
+        self._count('misses')
+        self._put_entry(key, blob)
+        return blob
+
+    def get_blob_metadata(self, container_name, blob_name, snapshot=None, lease_id=None, if_modified_since=None,
+                          if_unmodified_since=None, if_match=None, if_none_match=None, timeout=None):
+        return self.get_blob_properties(container_name, blob_name, snapshot, lease_id, if_modified_since,
+                                        if_unmodified_since, if_match, if_none_match, timeout).metadata
+
+    # Gets the Container with its properties and metadata, see BaseBlobService.get_container_properties.
+    # Containers do not support conditional reads, expired entries are read again.
+    def get_container_properties(self, container_name, lease_id=None, timeout=None):
+        key = (container_name, None, None)
+        entry = self._get_entry(key)
+        if entry is not None and time.time() - entry[0] < self.ttl:
+            self._count('hits')
+            return entry[1]
+
+        container = self.blob_service.get_container_properties(container_name, lease_id=lease_id, timeout=timeout)
+        self._count('misses')
+        self._put_entry(key, container)
+        return container
+
+    def get_container_metadata(self, container_name, lease_id=None, timeout=None):
+        return self.get_container_properties(container_name, lease_id, timeout).metadata
+
+    # Drops the cached entries of a blob and its snapshots, or of a container and all its blobs when blob_name is None
+    def invalidate(self, container_name, blob_name=None):
+        with self._lock:
+            for key in list(self._entries):
+                if key[0] == container_name and (blob_name is None or key[1] == blob_name):
+                    del self._entries[key]
+
+    def __getattr__(self, name):
+        attribute = getattr(self.blob_service, name)
+        if not callable(attribute) or name.startswith(READ_ONLY_METHODS):
+            return attribute
+        return invalidating(self, name, attribute)
+
+    def _get_entry(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def _put_entry(self, key, value):
+        with self._lock:
+            self._entries[key] = [time.time(), value]
+            self._entries.move_to_end(key)
+            if len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def _count(self, counter):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
@@ -1,4 +1,4 @@
-import random, string
+import os, random, string
 from random import randint
 
 # Gets random data to use in samples
@@ -10,9 +10,34 @@ class RandomData:
     # Gets Random Bytes of specified size for use in samples.
     # Input Arguments:
     # size - size of random bytes to get
-    def get_random_bytes(self, size):
-        rand = random.Random()
-        result = bytearray(size)
-        for i in range(size):
-            result[i] = rand.randint(0, 255)
-        return bytes(result)
\ No newline at end of file
+    # seed - optional seed; the same seed always produces the same bytes.
+    #        Without a seed the bytes come from os.urandom, which is the fastest source.
+    def get_random_bytes(self, size, seed=None):
+        if seed is None:
+            return os.urandom(size)
+        return self._get_seeded_bytes(random.Random(seed), size)
+
+    # Gets Random Bytes of specified size as a sequence of chunks, so large payloads
+    # never have to be held in memory at once.
+    # Input Arguments:
+    # size - total size of random bytes to get
+    # chunk_size - size of each chunk, the last chunk may be smaller
+    # seed - optional seed; the same seed and chunk_size always produce the same stream of bytes
+    def iter_random_bytes(self, size, chunk_size=4 * 1024 * 1024, seed=None):
+        rand = random.Random(seed) if seed is not None else None
+        remaining = size
+        while remaining > 0:
+            count = min(chunk_size, remaining)
+            if rand is None:
+                yield os.urandom(count)
+            else:
+                yield self._get_seeded_bytes(rand, count)
+            remaining -= count
+
+    # Generates size bytes from a seeded generator in a single call instead of byte by byte.
+    def _get_seeded_bytes(self, rand, size):
+        if size == 0:
+            return b''
+        if hasattr(rand, 'randbytes'):
+            return rand.randbytes(size)
+        return rand.getrandbits(size * 8).to_bytes(size, 'little')
@@ -0,0 +1,117 @@
+#----------------------------------------------------------------------------------
+# Microsoft Developer & Platform Evangelism
+#
+# Copyright (c) Microsoft Corporation. All rights reserved.
+#
+# THIS CODE AND INFORMATION ARE PROVIDED "AS IS" WITHOUT WARRANTY OF ANY KIND,
+# EITHER EXPRESSED OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE IMPLIED WARRANTIES
+# OF MERCHANTABILITY AND/OR FITNESS FOR A PARTICULAR PURPOSE.
+#----------------------------------------------------------------------------------
+# The example companies, organizations, products, domain names,
+# e-mail addresses, logos, people, places, and events depicted
+# herein are fictitious.  No association with any real company,
+# organization, product, domain name, email address, logo, person,
+# places, or events is intended or should be inferred.
+#----------------------------------------------------------------------------------
+
+import functools
+import hashlib
+import json
+import os
+import tempfile
+from azure.common import AzureMissingResourceHttpError
+from azure.storage.blob.models import BlobBlock
+from block_blob_uploader import ParallelBlockUploader
+from mapped_file import MappedFile
+
+#
+# Resumable block upload - Uploads a file as a block blob whose block IDs are derived from the
+# block offsets and a fingerprint of the file (size and modification time). An on-disk journal
+# records that an upload of this version of the file was started. When an upload is restarted for
+# the same unchanged file, the uncommitted blocks already on the service are found with
+# get_block_list and only the missing blocks are sent, the block list of the service being the
+# record of which blocks arrived. The journal is removed once the block list is committed.
+# Uncommitted blocks are discarded by the service after a week or when another block list is committed.
+#
+class ResumableBlockUploader(ParallelBlockUploader):
+
+    # Input Arguments:
+    # blockblob_service - BlockBlobService used to put and commit the blocks
+    # block_size - size in bytes of each block (the service allows up to 100 MB per block)
+    # max_workers - number of put_block requests kept in flight at once
+    # journal_dir - directory of the journal files, defaults to the temporary directory
+    def __init__(self, blockblob_service, block_size=4 * 1024 * 1024, max_workers=8, journal_dir=None):
+        ParallelBlockUploader.__init__(self, blockblob_service, block_size, max_workers)
+        self.journal_dir = journal_dir or tempfile.gettempdir()
+
+    # Uploads a local file to a block blob, resuming an earlier interrupted upload of the same file.
+    # Input Arguments:
+    # container_name - name of an existing container
+    # blob_name - name of the blob to create or overwrite
+    # file_path - path of the file to upload
+    # put_block_list_kwargs - extra arguments for put_block_list (content_settings, metadata, lease_id...)
+    # Returns the number of blocks sent and the number of blocks found on the service
+    def upload_file(self, container_name, blob_name, file_path, **put_block_list_kwargs):
+        lease_id = put_block_list_kwargs.get('lease_id')
+        stat = os.stat(file_path)
+        header = {
+            'container': container_name,
+            'blob': blob_name,
+            'file_size': stat.st_size,
+            'file_mtime': stat.st_mtime,
+            'block_size': self.block_size,
+        }
+        fingerprint = hashlib.sha1(json.dumps(header, sort_keys=True).encode('utf-8')).hexdigest()[:8]
+        offsets = range(0, stat.st_size, self.block_size)
+        block_ids = [self._get_block_id(fingerprint, offset) for offset in offsets]
+        block_sizes = dict((block_id, min(self.block_size, stat.st_size - offset)) for offset, block_id in zip(offsets, block_ids))
+
+        journal_path = self._get_journal_path(container_name, blob_name, file_path)
+        uploaded = self._get_uploaded_block_ids(container_name, blob_name, header, block_sizes, journal_path, lease_id)
+        missing = [offset for offset, block_id in zip(offsets, block_ids) if block_id not in uploaded]
+
+        # The journal only needs to exist before the first block is sent
+        with open(journal_path, 'w') as journal:
+            journal.write(json.dumps(header) + '\n')
+
+        with MappedFile(file_path) as source:
+            self.put_blocks(container_name, blob_name,
+                            ((self._get_block_id(fingerprint, offset), functools.partial(source.read, offset, self.block_size))
+                             for offset in missing),
+                            lease_id)
+
+        self.blockblob_service.put_block_list(container_name, blob_name, [BlobBlock(id=block_id) for block_id in block_ids],
+                                              **put_block_list_kwargs)
+        os.remove(journal_path)
+        return len(missing), len(block_ids) - len(missing)
+
+    # Gets the IDs of the blocks of this upload already on the service, none when there is no journal
+    # of an interrupted upload of this version of the file
+    def _get_uploaded_block_ids(self, container_name, blob_name, header, block_sizes, journal_path, lease_id):
+        if not self._is_journal_of(journal_path, header):
+            return set()
+
+        try:
+            block_list = self.blockblob_service.get_block_list(container_name, blob_name, None, 'uncommitted',
+                                                               lease_id=lease_id)
+        except AzureMissingResourceHttpError:
+            return set()
+
+        # Blocks are reused as long as their size matches
+        return set(block.id for block in block_list.uncommitted_blocks if block_sizes.get(block.id) == block.size)
+
+    # Checks that a journal exists and was written for this version of the file
+    def _is_journal_of(self, journal_path, header):
+        try:
+            with open(journal_path) as journal:
+                return json.loads(journal.readline()) == header
+        except (IOError, ValueError):
+            return False
+
+    def _get_journal_path(self, container_name, blob_name, file_path):
+        key = '\n'.join([str(self.blockblob_service.account_name), container_name, blob_name, os.path.abspath(file_path)])
+        return os.path.join(self.journal_dir, 'upload-' + hashlib.sha1(key.encode('utf-8')).hexdigest() + '.journal')
+
+    # Block IDs are the file fingerprint followed by the offset in hexadecimal, all of the same length
+    def _get_block_id(self, fingerprint, offset):
+        return '{0}-{1:016x}'.format(fingerprint, offset)
@@ -0,0 +1,132 @@
+#----------------------------------------------------------------------------------
+# Microsoft Developer & Platform Evangelism
+#
+# Copyright (c) Microsoft Corporation. All rights reserved.
+#
+# THIS CODE AND INFORMATION ARE PROVIDED "AS IS" WITHOUT WARRANTY OF ANY KIND,
+# EITHER EXPRESSED OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE IMPLIED WARRANTIES
+# OF MERCHANTABILITY AND/OR FITNESS FOR A PARTICULAR PURPOSE.
+#----------------------------------------------------------------------------------
+# The example companies, organizations, products, domain names,
+# e-mail addresses, logos, people, places, and events depicted
+# herein are fictitious.  No association with any real company,
+# organization, product, domain name, email address, logo, person,
+# places, or events is intended or should be inferred.
+#----------------------------------------------------------------------------------
+
+import io
+import sys
+import threading
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from instrumentation import BlobMetrics, InstrumentedStorageAccount
+
+# Result of one scenario
+class ScenarioResult():
+
+    def __init__(self, title):
+        self.title = title
+        self.seconds = 0.0
+        self.requests = 0
+        self.error = None
+        self.output = ''
+
+    def is_successful(self):
+        return self.error is None
+
+
+# Sends what is printed on a thread running a scenario to that scenario's buffer, and the rest to
+# the original stream
+class _ScenarioOutput():
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.local = threading.local()
+
+    def write(self, text):
+        buffer = getattr(self.local, 'buffer', None)
+        return (buffer or self.stream).write(text)
+
+    def flush(self):
+        if getattr(self.local, 'buffer', None) is None:
+            self.stream.flush()
+
+
+#
+# Sample runner - Runs independent sample scenarios (see get_scenarios of BlobBasicSamples and
+# BlobAdvancedSamples) on a thread pool. Each scenario gets its own InstrumentedStorageAccount
+# to count the requests it sends, its printed output is buffered and printed in one piece when it
+# finishes, and a failure is recorded without stopping the others. Exclusive scenarios, which
+# change account-wide settings, run one at a time after the others. A summary table of the wall
+# time, requests and result of every scenario is printed at the end.
+#
+class SampleRunner():
+
+    # Input Arguments:
+    # max_parallel - number of scenarios run at once
+    def __init__(self, max_parallel=4):
+        if max_parallel <= 0:
+            raise ValueError('max_parallel must be at least 1')
+
+        self.max_parallel = max_parallel
+
+    # Runs scenarios and prints their output and the summary.
+    # Input Arguments:
+    # account - account to run the scenarios with
+    # scenarios - iterable of (title, function taking the account, exclusive)
+    # Returns the list of ScenarioResult in the order of scenarios
+    def run(self, account, scenarios):
+        scenarios = list(scenarios)
+        results = [ScenarioResult(title) for title, sample, exclusive in scenarios]
+        output = _ScenarioOutput(sys.stdout)
+        start = time.time()
+
+        sys.stdout = output
+        try:
+            with ThreadPoolExecutor(max_workers=self.max_parallel) as executor:
+                futures = [executor.submit(self._run_scenario, account, scenario, result, output)
+                           for scenario, result in zip(scenarios, results) if not scenario[2]]
+                for future in as_completed(futures):
+                    self._print_result(future.result())
+
+            for scenario, result in zip(scenarios, results):
+                if scenario[2]:
+                    self._print_result(self._run_scenario(account, scenario, result, output))
+        finally:
+            sys.stdout = output.stream
+
+        self.print_summary(results, time.time() - start)
+        return results
+
+    def print_summary(self, results, seconds):
+        width = max([len('Scenario')] + [len(result.title) for result in results])
+        print('\n{0:<{1}}  {2:>9}  {3:>8}  {4}'.format('Scenario', width, 'Seconds', 'Requests', 'Result'))
+        for result in results:
+            print('{0:<{1}}  {2:>9.2f}  {3:>8}  {4}'.format(
+                result.title, width, result.seconds, result.requests,
+                'OK' if result.is_successful() else 'FAILED: ' + str(result.error).splitlines()[0]))
+        failed = sum(1 for result in results if not result.is_successful())
+        print('{0} scenarios, {1} failed, {2:.2f} seconds with {3} in parallel'.format(
+            len(results), failed, seconds, self.max_parallel))
+
+    def _run_scenario(self, account, scenario, result, output):
+        title, sample, exclusive = scenario
+        metrics = BlobMetrics()
+        output.local.buffer = io.StringIO()
+        start = time.time()
+        try:
+            sample(InstrumentedStorageAccount(account, metrics))
+        except Exception as e:
+            result.error = e
+            traceback.print_exc(file=output.local.buffer)
+        finally:
+            result.seconds = time.time() - start
+            result.requests = sum(operation['requests'] for operation in metrics.snapshot().values())
+            result.output = output.local.buffer.getvalue()
+            output.local.buffer = None
+        return result
+
+    def _print_result(self, result):
+        print('\n\n* ' + result.title + ' *\n')
+        print(result.output, end='')
@@ -0,0 +1,160 @@
+#----------------------------------------------------------------------------------
+# Microsoft Developer & Platform Evangelism
+#
+# Copyright (c) Microsoft Corporation. All rights reserved.
+#
+# THIS CODE AND INFORMATION ARE PROVIDED "AS IS" WITHOUT WARRANTY OF ANY KIND,
+# EITHER EXPRESSED OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE IMPLIED WARRANTIES
+# OF MERCHANTABILITY AND/OR FITNESS FOR A PARTICULAR PURPOSE.
+#----------------------------------------------------------------------------------
+# The example companies, organizations, products, domain names,
+# e-mail addresses, logos, people, places, and events depicted
+# herein are fictitious.  No association with any real company,
+# organization, product, domain name, email address, logo, person,
+# places, or events is intended or should be inferred.
+#----------------------------------------------------------------------------------
+
+import base64
+import datetime
+import hashlib
+import hmac
+import threading
+import time
+from collections import OrderedDict
+from urllib.parse import quote, unquote
+from azure.storage.blob.models import BlobPermissions
+
+# Query parameters of a blob SAS in the order they appear in the string to sign after the
+# canonicalized resource
+_AFTER_RESOURCE = ('si', 'sip', 'spr', 'sv', 'rscc', 'rscd', 'rsce', 'rscl', 'rsct')
+
+#
+# SAS issuer - Hands out shared access signatures without signing or building a client each time:
+#   - account, container and blob SAS are cached per (resource, permissions, policy id) and signed
+#     again only when they get within refresh_margin of their expiry
+#   - sign_blob_urls signs the URLs of many blobs at once: the token is generated once by the SDK
+#     as a template, and for each blob only the signature is computed, from an HMAC-SHA256 state
+#     keyed with the decoded account key once
+#   - get_service returns one Block Blob service per SAS, created on first use and reused after
+#
+class SasIssuer():
+
+    # Input Arguments:
+    # blob_service - Blob service created with the account key, used to sign
+    # account - account whose with_sas_token() creates the clients of get_service, such as a
+    #           PooledStorageAccount (see service_factory.py)
+    # lifetime - seconds a SAS is valid for
+    # refresh_margin - a cached SAS is signed again when it expires within this many seconds
+    # max_entries - number of SAS and clients cached, the least recently used are dropped first
+    def __init__(self, blob_service, account=None, lifetime=3600, refresh_margin=300, max_entries=4096):
+        if refresh_margin >= lifetime:
+            raise ValueError('refresh_margin must be shorter than lifetime')
+        if max_entries <= 0:
+            raise ValueError('max_entries must be at least 1')
+
+        self.blob_service = blob_service
+        self.account = account
+        self.lifetime = lifetime
+        self.refresh_margin = refresh_margin
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+
+        self._tokens = OrderedDict()
+        self._services = OrderedDict()
+        self._lock = threading.Lock()
+        self._hmac = hmac.new(base64.b64decode(blob_service.account_key), digestmod=hashlib.sha256)
+
+    # Gets an account SAS.
+    # Input Arguments:
+    # resource_types - ResourceTypes the SAS gives access to
+    # permission - AccountPermissions of the SAS
+    def get_account_sas(self, resource_types, permission):
+        return self._get_token(('account', str(resource_types), str(permission)),
+                               lambda expiry: self.blob_service.generate_account_shared_access_signature(
+                                   resource_types, permission, expiry))
+
+    # Gets a container SAS.
+    # Input Arguments:
+    # container_name - name of the container
+    # permission - ContainerPermissions of the SAS, None when the access policy sets them
+    # id - identifier of a stored access policy of the container, which then sets the expiry
+    def get_container_sas(self, container_name, permission=None, id=None):
+        return self._get_token(('container', container_name, str(permission or ''), id),
+                               lambda expiry: self.blob_service.generate_container_shared_access_signature(
+                                   container_name, permission, None if id else expiry, id=id))
+
+    # Gets a blob SAS, see get_container_sas
+    def get_blob_sas(self, container_name, blob_name, permission=BlobPermissions.READ, id=None):
+        return self._get_token(('blob', container_name, blob_name, str(permission or ''), id),
+                               lambda expiry: self.blob_service.generate_blob_shared_access_signature(
+                                   container_name, blob_name, permission, None if id else expiry, id=id))
+
+    # Gets a Block Blob service that authenticates with a SAS, the same object for the same SAS
+    def get_service(self, sas_token):
+        if self.account is None:
+            raise ValueError('An account is needed to create services')
+        with self._lock:
+            service = self._services.get(sas_token)
+            if service is not None:
+                self._services.move_to_end(sas_token)
+                return service
+
+        service = self.account.with_sas_token(sas_token).create_block_blob_service()
+        with self._lock:
+            service = self._services.setdefault(sas_token, service)
+            self._services.move_to_end(sas_token)
+            while len(self._services) > self.max_entries:
+                self._services.popitem(last=False)
+        return service
+
+    # Signs a URL for each of many blobs of a container. URLs are not cached, every call signs them
+    # with a new expiry.
+    # Input Arguments:
+    # container_name - name of the container
+    # blob_names - iterable of blob names
+    # permission - BlobPermissions of the SAS, None when the access policy sets them
+    # id - identifier of a stored access policy of the container
+    # Returns a list of URLs in the order of blob_names
+    def sign_blob_urls(self, container_name, blob_names, permission=BlobPermissions.READ, id=None):
+        # Generate the token of an empty blob name as the template, only the resource path differs per blob
+        template = self.blob_service.generate_blob_shared_access_signature(
+            container_name, '', permission, None if id else self._get_expiry(), id=id)
+        token_prefix, _, _ = template.rpartition('sig=')
+        query = dict(pair.split('=', 1) for pair in template.split('&'))
+        values = dict((name, unquote(value)) for name, value in query.items())
+
+        string_prefix = '\n'.join([values.get('sp', ''), values.get('st', ''), values.get('se', ''),
+                                   '/blob/' + self.blob_service.account_name + '/' + container_name + '/'])
+        string_suffix = '\n' + '\n'.join(values.get(name, '') for name in _AFTER_RESOURCE)
+        url_prefix = self.blob_service.make_blob_url(container_name, '')
+
+        urls = []
+        for blob_name in blob_names:
+            signer = self._hmac.copy()
+            signer.update((string_prefix + blob_name + string_suffix).encode('utf-8'))
+            signature = base64.b64encode(signer.digest()).decode('utf-8')
+            urls.append(url_prefix + quote(blob_name) + '?' + token_prefix + 'sig=' + quote(signature))
+        return urls
+
+    # Gets the expiry of a SAS signed now, truncated to the second as it appears in the token
+    def _get_expiry(self):
+        return datetime.datetime.utcnow().replace(microsecond=0) + datetime.timedelta(seconds=self.lifetime)
+
+    def _get_token(self, key, generate):
+        now = time.time()
+        with self._lock:
+            entry = self._tokens.get(key)
+            if entry is not None and entry[1] > now:
+                self._tokens.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+            self.misses += 1
+
+        token = generate(self._get_expiry())
+        with self._lock:
+            self._tokens[key] = (token, now + self.lifetime - self.refresh_margin)
+            self._tokens.move_to_end(key)
+            while len(self._tokens) > self.max_entries:
+                self._tokens.popitem(last=False)
+        return token
@@ -0,0 +1,122 @@
+#----------------------------------------------------------------------------------
+# Microsoft Developer & Platform Evangelism
+#
+# Copyright (c) Microsoft Corporation. All rights reserved.
+#
+# THIS CODE AND INFORMATION ARE PROVIDED "AS IS" WITHOUT WARRANTY OF ANY KIND,
+# EITHER EXPRESSED OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE IMPLIED WARRANTIES
+# OF MERCHANTABILITY AND/OR FITNESS FOR A PARTICULAR PURPOSE.
+#----------------------------------------------------------------------------------
+# The example companies, organizations, products, domain names,
+# e-mail addresses, logos, people, places, and events depicted
+# herein are fictitious.  No association with any real company,
+# organization, product, domain name, email address, logo, person,
+# places, or events is intended or should be inferred.
+#----------------------------------------------------------------------------------
+
+import threading
+import requests
+from collections import OrderedDict
+from requests.adapters import HTTPAdapter
+from azure.storage import CloudStorageAccount
+from azure.storage.blob import BlockBlobService, PageBlobService, AppendBlobService
+
+# Methods of the blob services that build URLs or signatures locally and do not send a request
+LOCAL_METHODS = ('make_blob_url', 'generate_')
+
+#
+# Blob service factory - Hands out Block, Page and Append Blob service objects that share pooled
+# keep-alive HTTP sessions, so connections (and their TCP and TLS handshakes) are reused across
+# samples instead of every service object opening its own. Sessions are shared per storage endpoint,
+# so services signed with the account key, an account SAS or a container SAS all draw from the
+# same pool. Service objects are cached by account and credential.
+# Cached services are shared: do not change their settings (such as MAX_BLOCK_SIZE) in place.
+#
+class BlobServiceFactory():
+
+    # Input Arguments:
+    # pool_size - connections kept open per endpoint, set it to the concurrency of parallel transfers
+    # max_services - number of service objects cached, the least recently used one is dropped first
+    def __init__(self, pool_size=16, max_services=64):
+        if pool_size <= 0:
+            raise ValueError('pool_size must be at least 1')
+
+        self.pool_size = pool_size
+        self.max_services = max_services
+        self._sessions = {}
+        self._services = OrderedDict()
+        self._lock = threading.Lock()
+
+    def create_block_blob_service(self, account_name=None, account_key=None, sas_token=None, is_emulated=False):
+        return self._get_service(BlockBlobService, account_name, account_key, sas_token, is_emulated)
+
+    def create_page_blob_service(self, account_name=None, account_key=None, sas_token=None, is_emulated=False):
+        return self._get_service(PageBlobService, account_name, account_key, sas_token, is_emulated)
+
+    def create_append_blob_service(self, account_name=None, account_key=None, sas_token=None, is_emulated=False):
+        return self._get_service(AppendBlobService, account_name, account_key, sas_token, is_emulated)
+
+    # Gets a PooledStorageAccount that creates its services through this factory
+    def get_account(self, account_name=None, account_key=None, sas_token=None, is_emulated=False):
+        return PooledStorageAccount(self, account_name, account_key, sas_token, is_emulated)
+
+    # Closes the pooled connections and forgets the cached services
+    def close(self):
+        with self._lock:
+            for session in self._sessions.values():
+                session.close()
+            self._sessions.clear()
+            self._services.clear()
+
+    def _get_service(self, service_class, account_name, account_key, sas_token, is_emulated):
+        is_emulated = bool(is_emulated)
+        key = (service_class, account_name, account_key, sas_token, is_emulated)
+        with self._lock:
+            service = self._services.get(key)
+            if service is not None:
+                self._services.move_to_end(key)
+                return service
+
+            service = service_class(account_name, account_key, sas_token=sas_token, is_emulated=is_emulated,
+                                    request_session=self._get_session(account_name, is_emulated))
+            self._services[key] = service
+            if len(self._services) > self.max_services:
+                self._services.popitem(last=False)
+            return service
+
+    def _get_session(self, account_name, is_emulated):
+        key = (account_name, is_emulated)
+        session = self._sessions.get(key)
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size)
+            session.mount('https://', adapter)
+            session.mount('http://', adapter)
+            self._sessions[key] = session
+        return session
+
+
+#
+# A CloudStorageAccount whose create_*_service methods return pooled services from a BlobServiceFactory
+#
+class PooledStorageAccount(CloudStorageAccount):
+
+    def __init__(self, factory, account_name=None, account_key=None, sas_token=None, is_emulated=False):
+        super(PooledStorageAccount, self).__init__(account_name, account_key, sas_token, is_emulated)
+        self.factory = factory
+
+    def create_block_blob_service(self):
+        return self.factory.create_block_blob_service(self.account_name, self.account_key,
+                                                      self.sas_token, self.is_emulated)
+
+    def create_page_blob_service(self):
+        return self.factory.create_page_blob_service(self.account_name, self.account_key,
+                                                     self.sas_token, self.is_emulated)
+
+    def create_append_blob_service(self):
+        return self.factory.create_append_blob_service(self.account_name, self.account_key,
+                                                       self.sas_token, self.is_emulated)
+
+    # Gets an account for the same storage account that signs its requests with a shared access signature
+    def with_sas_token(self, sas_token):
+        return PooledStorageAccount(self.factory, self.account_name, sas_token=sas_token)
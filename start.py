@@ -25,34 +25,56 @@
 # 1. Open the config.py file and set IS_EMULATED to false.
 # 2. Create a Storage Account through the Azure Portal and provide your STORAGE_ACCOUNT_NAME and STORAGE_ACCOUNT_KEY in the config.py file. See https://azure.microsoft.com/en-us/documentation/articles/storage-create-storage-account/ for more information.
 # 3. Set breakpoints and run the project. 
+
+# To run the sample without the emulator or a Storage account (for example on Linux or in CI)
+# 1. Open the config.py file and set USE_FAKE_SERVICE to true. The samples then run against an in-process fake Blob service.
+# 2. Optionally set FAKE_SERVICE_LATENCY and FAKE_SERVICE_BANDWIDTH to simulate a network link.
 #---------------------------------------------------------------------------
 
 import config
 import azure.common
-from azure.storage import CloudStorageAccount
 from blob_basic_samples import BlobBasicSamples
 from blob_advanced_samples import BlobAdvancedSamples
+from fake_blob_service import FakeStorageAccount
+from service_factory import BlobServiceFactory
+from instrumentation import InstrumentedStorageAccount
+from sample_runner import SampleRunner
 
 print('Azure Blob Storage samples for Python')
 
 # Create the storage account object and specify its credentials 
-# to either point to the local Emulator or your Azure subscription
-if config.IS_EMULATED:
-    account = CloudStorageAccount(is_emulated=True)
+# to either point to the local Emulator, the in-process fake service or your Azure subscription.
+# The samples share the pooled connections of one service factory.
+service_factory = BlobServiceFactory(pool_size=config.CONNECTION_POOL_SIZE)
+if config.USE_FAKE_SERVICE:
+    account = FakeStorageAccount(latency=config.FAKE_SERVICE_LATENCY, bandwidth=config.FAKE_SERVICE_BANDWIDTH)
+elif config.IS_EMULATED:
+    account = service_factory.get_account(is_emulated=True)
 else:
     account_name = config.STORAGE_ACCOUNT_NAME
     account_key = config.STORAGE_ACCOUNT_KEY
-    account = CloudStorageAccount(account_name, account_key)
-
-#Basic Blob samples
-print ('---------------------------------------------------------------')
-print('Azure Storage Blob samples')
-blob_basic_samples = BlobBasicSamples()
-blob_basic_samples.run_all_samples(account)
+    account = service_factory.get_account(account_name, account_key)
 
+if config.METRICS_FILE:
+    account = InstrumentedStorageAccount(account)
 
-#Advanced Blob samples
+#Basic and Advanced Blob samples
+# Every scenario uses its own containers, so they run in parallel and a failure does not stop the others
 print ('---------------------------------------------------------------')
-print('Azure Storage Advanced Blob samples')
+print('Azure Storage Blob and Advanced Blob samples')
+blob_basic_samples = BlobBasicSamples()
 blob_advanced_samples = BlobAdvancedSamples()
-blob_advanced_samples.run_all_samples(account)
\ No newline at end of file
+sample_runner = SampleRunner(max_parallel=config.SAMPLE_PARALLELISM)
+sample_runner.run(account, blob_basic_samples.get_scenarios() + blob_advanced_samples.get_scenarios())
+if (config.USE_FAKE_SERVICE):
+    print('\nShared Access Signature is not supported in the fake service')
+elif (config.IS_EMULATED):
+    print('\nShared Access Signature is not supported in emulator')
+
+if config.METRICS_FILE:
+    with open(config.METRICS_FILE, 'w') as metrics_file:
+        if config.METRICS_FILE.endswith('.prom'):
+            metrics_file.write(account.metrics.to_prometheus())
+        else:
+            metrics_file.write(account.metrics.to_json())
+    print('Metrics written to ' + config.METRICS_FILE)
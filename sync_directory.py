@@ -0,0 +1,283 @@
+#----------------------------------------------------------------------------------
+# Microsoft Developer & Platform Evangelism
+#
+# Copyright (c) Microsoft Corporation. All rights reserved.
+#
+# THIS CODE AND INFORMATION ARE PROVIDED "AS IS" WITHOUT WARRANTY OF ANY KIND,
+# EITHER EXPRESSED OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE IMPLIED WARRANTIES
+# OF MERCHANTABILITY AND/OR FITNESS FOR A PARTICULAR PURPOSE.
+#----------------------------------------------------------------------------------
+# The example companies, organizations, products, domain names,
+# e-mail addresses, logos, people, places, and events depicted
+# herein are fictitious.  No association with any real company,
+# organization, product, domain name, email address, logo, person,
+# places, or events is intended or should be inferred.
+#----------------------------------------------------------------------------------
+# Synchronizes a local directory tree to a container: files missing from the container or
+# changed since they were uploaded are uploaded, and with --delete blobs whose file was removed
+# are deleted.
+#
+# The tool uses the same account settings as start.py (config.py), for example:
+#     python sync_directory.py ./site websitecontainer --prefix www/ --delete
+# Run "python sync_directory.py --help" for all the options.
+#----------------------------------------------------------------------------------
+
+import argparse
+import base64
+import hashlib
+import mimetypes
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import config
+from blob_lister import PrefetchingBlobLister
+from fake_blob_service import FakeStorageAccount
+from service_factory import BlobServiceFactory
+from azure.common import AzureHttpError
+from azure.storage.blob.models import ContentSettings, Include
+
+# Blob metadata holding the modification time of the uploaded file
+MTIME_METADATA = 'localmtime'
+
+# Aggregate result of a synchronization
+class SyncReport():
+
+    def __init__(self):
+        self.files = 0
+        self.uploaded = 0
+        self.bytes_uploaded = 0
+        self.hashed = 0
+        self.unchanged = 0
+        self.deleted = 0
+        self.errors = []
+
+
+#
+# Directory sync - Walks a local directory tree and lists the blobs under a prefix at the same
+# time, then decides per file:
+#   - no blob or a different size: upload
+#   - same size and the modification time recorded in the blob metadata: unchanged
+#   - same size but another modification time: compare the MD5 of the file with the blob's
+#     Content-MD5 and upload only if they differ, otherwise record the new modification time
+# Listing, hashing and uploading run as concurrent stages: the listing is sorted by name, so a
+# file is decided as soon as the listing has passed its name, while later pages are still being
+# fetched. Uploads set Content-MD5 and the modification time so the next run can skip the file.
+#
+class DirectorySync():
+
+    # Input Arguments:
+    # blockblob_service - BlockBlobService of the destination account
+    # max_workers - number of uploads and deletes in flight at once
+    # hash_workers - number of files hashed at once
+    def __init__(self, blockblob_service, max_workers=16, hash_workers=4):
+        if max_workers <= 0 or hash_workers <= 0:
+            raise ValueError('max_workers and hash_workers must be at least 1')
+
+        self.blockblob_service = blockblob_service
+        self.max_workers = max_workers
+        self.hash_workers = hash_workers
+
+    # Synchronizes a directory tree to a container.
+    # Input Arguments:
+    # local_dir - root of the local tree
+    # container_name - name of an existing container
+    # prefix - prefix of the blob names, files are stored as prefix + path relative to local_dir with '/' separators
+    # delete - delete the blobs under prefix whose file no longer exists
+    # Returns the SyncReport
+    def sync(self, local_dir, container_name, prefix='', delete=False):
+        report = SyncReport()
+        listing = _RemoteListing(PrefetchingBlobLister(self.blockblob_service), container_name, prefix)
+        local_names = set()
+        # Bounds the files waiting in the hash and upload stages
+        slots = threading.BoundedSemaphore(4 * (self.max_workers + self.hash_workers))
+        lock = threading.Lock()
+
+        def record_error(name, error):
+            with lock:
+                report.errors.append((name, error))
+
+        def upload(name, path, stat, md5=None):
+            try:
+                if md5 is None:
+                    md5 = self._get_md5(path)
+                content_settings = ContentSettings(content_type=mimetypes.guess_type(path)[0], content_md5=md5)
+                self.blockblob_service.create_blob_from_path(container_name, name, path,
+                                                             content_settings=content_settings,
+                                                             metadata={MTIME_METADATA: repr(stat.st_mtime)})
+                with lock:
+                    report.uploaded += 1
+                    report.bytes_uploaded += stat.st_size
+            except Exception as e:
+                record_error(name, e)
+            finally:
+                slots.release()
+
+        def compare(name, path, stat, blob):
+            try:
+                md5 = self._get_md5(path)
+                with lock:
+                    report.hashed += 1
+                if md5 == blob.content_md5:
+                    # Record the new modification time so the next run does not hash the file again
+                    metadata = dict(blob.metadata or {})
+                    metadata[MTIME_METADATA] = repr(stat.st_mtime)
+                    try:
+                        self.blockblob_service.set_blob_metadata(container_name, name, metadata, if_match=blob.etag)
+                    except AzureHttpError as e:
+                        # The blob changed since it was listed, the next run compares it again
+                        if e.status_code != 412:
+                            raise
+                    with lock:
+                        report.unchanged += 1
+                    slots.release()
+                else:
+                    upload_executor.submit(upload, name, path, stat, md5)
+            except Exception as e:
+                record_error(name, e)
+                slots.release()
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as upload_executor, \
+             ThreadPoolExecutor(max_workers=self.hash_workers) as hash_executor:
+            for name, path, stat in self._walk(local_dir, prefix):
+                report.files += 1
+                local_names.add(name)
+                blob = listing.get(name)
+
+                if blob is not None and blob.size == stat.st_size:
+                    mtime = (blob.metadata or {}).get(MTIME_METADATA)
+                    if mtime == repr(stat.st_mtime):
+                        with lock:
+                            report.unchanged += 1
+                        continue
+                    if blob.content_md5 is not None:
+                        slots.acquire()
+                        hash_executor.submit(compare, name, path, stat, blob)
+                        continue
+
+                slots.acquire()
+                upload_executor.submit(upload, name, path, stat)
+
+            # The hash stage must finish handing files to the upload stage before it shuts down
+            hash_executor.shutdown(wait=True)
+
+            if delete:
+                def delete_blob(name):
+                    try:
+                        self.blockblob_service.delete_blob(container_name, name)
+                        with lock:
+                            report.deleted += 1
+                    except Exception as e:
+                        record_error(name, e)
+                for name in listing.get_all_names():
+                    if name not in local_names:
+                        upload_executor.submit(delete_blob, name)
+
+        listing.raise_error()
+        return report
+
+    # Walks the local tree in sorted order and returns a generator of (blob name, path, os.stat_result)
+    def _walk(self, local_dir, prefix):
+        for root, dirs, files in os.walk(local_dir):
+            dirs.sort()
+            relative_root = os.path.relpath(root, local_dir)
+            for file_name in sorted(files):
+                path = os.path.join(root, file_name)
+                relative_path = file_name if relative_root == os.curdir else os.path.join(relative_root, file_name)
+                yield prefix + relative_path.replace(os.sep, '/'), path, os.stat(path)
+
+    # Gets the base64 MD5 of a file, as stored in Content-MD5
+    def _get_md5(self, path):
+        md5 = hashlib.md5()
+        with open(path, 'rb') as stream:
+            for data in iter(lambda: stream.read(1024 * 1024), b''):
+                md5.update(data)
+        return base64.b64encode(md5.digest()).decode('utf-8')
+
+
+# Lists the blobs under a prefix on a background thread and answers lookups as soon as the sorted
+# listing has passed the name looked up
+class _RemoteListing():
+
+    def __init__(self, lister, container_name, prefix):
+        self._blobs = {}
+        self._last_name = None
+        self._done = False
+        self._error = None
+        self._condition = threading.Condition()
+
+        def fetch():
+            try:
+                for page in lister.list_blob_pages(container_name, prefix=prefix or None, include=Include.METADATA):
+                    with self._condition:
+                        for blob in page:
+                            self._blobs[blob.name] = blob
+                        if page:
+                            self._last_name = page[-1].name
+                        self._condition.notify_all()
+            except Exception as e:
+                self._error = e
+            finally:
+                with self._condition:
+                    self._done = True
+                    self._condition.notify_all()
+
+        thread = threading.Thread(target=fetch)
+        thread.daemon = True
+        thread.start()
+
+    # Gets the BlobEntry of a blob, or None if it does not exist
+    def get(self, name):
+        with self._condition:
+            while not self._done and (self._last_name is None or self._last_name < name):
+                self._condition.wait()
+            self.raise_error()
+            return self._blobs.get(name)
+
+    # Gets the names of all listed blobs
+    def get_all_names(self):
+        with self._condition:
+            while not self._done:
+                self._condition.wait()
+            self.raise_error()
+            return list(self._blobs)
+
+    def raise_error(self):
+        if self._error is not None:
+            raise self._error
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Synchronize a local directory tree to a blob container.')
+    parser.add_argument('local_dir', help='local directory to upload')
+    parser.add_argument('container', help='destination container, created if it does not exist')
+    parser.add_argument('--prefix', default='', help='prefix of the blob names')
+    parser.add_argument('--delete', action='store_true', help='delete blobs whose local file no longer exists')
+    parser.add_argument('--workers', type=int, default=16, help='number of uploads in flight')
+    parser.add_argument('--hash-workers', type=int, default=4, help='number of files hashed at once')
+    parser.add_argument('--fake', action='store_true', default=config.USE_FAKE_SERVICE, help='use the in-process fake Blob service')
+    args = parser.parse_args()
+
+    if args.fake:
+        account = FakeStorageAccount(latency=config.FAKE_SERVICE_LATENCY, bandwidth=config.FAKE_SERVICE_BANDWIDTH)
+    else:
+        factory = BlobServiceFactory(pool_size=max(args.workers, config.CONNECTION_POOL_SIZE))
+        if config.IS_EMULATED:
+            account = factory.get_account(is_emulated=True)
+        else:
+            account = factory.get_account(config.STORAGE_ACCOUNT_NAME, config.STORAGE_ACCOUNT_KEY)
+
+    blockblob_service = account.create_block_blob_service()
+    blockblob_service.create_container(args.container)
+    report = DirectorySync(blockblob_service, args.workers, args.hash_workers).sync(
+        args.local_dir, args.container, args.prefix, args.delete)
+
+    print('{0} files: {1} uploaded ({2} bytes), {3} unchanged ({4} hashed), {5} blobs deleted'.format(
+        report.files, report.uploaded, report.bytes_uploaded, report.unchanged, report.hashed, report.deleted))
+    for name, error in report.errors:
+        print('Failed ' + name + ': ' + str(error))
+    if report.errors:
+        raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,87 @@
+#----------------------------------------------------------------------------------
+# Microsoft Developer & Platform Evangelism
+#
+# Copyright (c) Microsoft Corporation. All rights reserved.
+#
+# THIS CODE AND INFORMATION ARE PROVIDED "AS IS" WITHOUT WARRANTY OF ANY KIND,
+# EITHER EXPRESSED OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE IMPLIED WARRANTIES
+# OF MERCHANTABILITY AND/OR FITNESS FOR A PARTICULAR PURPOSE.
+#----------------------------------------------------------------------------------
+# The example companies, organizations, products, domain names,
+# e-mail addresses, logos, people, places, and events depicted
+# herein are fictitious.  No association with any real company,
+# organization, product, domain name, email address, logo, person,
+# places, or events is intended or should be inferred.
+#----------------------------------------------------------------------------------
+
+
+import threading
+import pytest
+from azure.common import AzureHttpError
+from block_blob_uploader import ParallelBlockUploader
+from fake_blob_service import FakeStorageAccount
+
+
+# Fails the put_block calls after the first fail_after and records whether a block list was committed
+class FailingService():
+
+    def __init__(self, blob_service, fail_after):
+        self.blob_service = blob_service
+        self.fail_after = fail_after
+        self.put_block_count = 0
+        self.committed = False
+        self._lock = threading.Lock()
+
+    def put_block(self, *args, **kwargs):
+        with self._lock:
+            self.put_block_count += 1
+            if self.put_block_count > self.fail_after:
+                raise AzureHttpError('ServerBusy', 503)
+        return self.blob_service.put_block(*args, **kwargs)
+
+    def put_block_list(self, *args, **kwargs):
+        self.committed = True
+        return self.blob_service.put_block_list(*args, **kwargs)
+
+    def __getattr__(self, name):
+        return getattr(self.blob_service, name)
+
+
+# Stream of block_count blocks of 16 bytes that counts the blocks read from it
+class CountingStream():
+
+    def __init__(self, block_count):
+        self.block_count = block_count
+        self.blocks_read = 0
+
+    def read(self, size):
+        if self.blocks_read == self.block_count:
+            return b''
+        self.blocks_read += 1
+        return b'x' * size
+
+
+def upload_failing_blocks(max_workers, max_pending_blocks):
+    blockblob_service = FakeStorageAccount().create_block_blob_service()
+    blockblob_service.create_container('container')
+    failing_service = FailingService(blockblob_service, fail_after=5)
+    uploader = ParallelBlockUploader(failing_service, block_size=16, max_workers=max_workers,
+                                     max_pending_blocks=max_pending_blocks)
+    stream = CountingStream(100)
+    with pytest.raises(AzureHttpError):
+        uploader.upload_stream('container', 'blob', stream)
+    return failing_service, stream.blocks_read
+
+
+def test_failed_block_stops_the_upload_before_the_commit():
+    # With one slot the blocks are sent one at a time, none is taken after the failed sixth
+    failing_service, blocks_read = upload_failing_blocks(max_workers=1, max_pending_blocks=0)
+    assert failing_service.put_block_count == 6
+    assert blocks_read == 6
+    assert not failing_service.committed
+
+    # With more slots at most the blocks already in flight are sent
+    failing_service, blocks_read = upload_failing_blocks(max_workers=4, max_pending_blocks=4)
+    assert failing_service.put_block_count <= 6 + 7
+    assert blocks_read <= 6 + 8
+    assert not failing_service.committed
@@ -0,0 +1,79 @@
+#----------------------------------------------------------------------------------
+# Microsoft Developer & Platform Evangelism
+#
+# Copyright (c) Microsoft Corporation. All rights reserved.
+#
+# THIS CODE AND INFORMATION ARE PROVIDED "AS IS" WITHOUT WARRANTY OF ANY KIND,
+# EITHER EXPRESSED OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE IMPLIED WARRANTIES
+# OF MERCHANTABILITY AND/OR FITNESS FOR A PARTICULAR PURPOSE.
+#----------------------------------------------------------------------------------
+# The example companies, organizations, products, domain names,
+# e-mail addresses, logos, people, places, and events depicted
+# herein are fictitious.  No association with any real company,
+# organization, product, domain name, email address, logo, person,
+# places, or events is intended or should be inferred.
+#----------------------------------------------------------------------------------
+
+
+import pytest
+from azure.common import AzureHttpError
+from content_cache import DiskCachingBlobService
+from fake_blob_service import FakeStorageAccount
+from instrumentation import BlobMetrics, InstrumentedStorageAccount
+
+
+def test_write_through_instrumented_service_invalidates_content(tmp_path):
+    account = InstrumentedStorageAccount(FakeStorageAccount(), BlobMetrics())
+    blockblob_service = DiskCachingBlobService(account.create_block_blob_service(), str(tmp_path), ttl=3600)
+    blockblob_service.create_container('container')
+    blockblob_service.create_blob_from_bytes('container', 'blob', b'old')
+    assert blockblob_service.get_blob_to_bytes('container', 'blob').content == b'old'
+
+    blockblob_service.create_blob_from_bytes('container', 'blob', b'new')
+    assert blockblob_service.get_blob_to_bytes('container', 'blob').content == b'new'
+
+
+def test_only_chunks_are_evicted(tmp_path):
+    (tmp_path / 'notes.txt').write_bytes(b'x' * 4096)
+    (tmp_path / 'data').mkdir()
+    (tmp_path / 'data' / '0').write_bytes(b'x' * 4096)
+    blockblob_service = FakeStorageAccount().create_block_blob_service()
+    blockblob_service.create_container('container')
+    blockblob_service.create_blob_from_bytes('container', 'blob', b'x' * 4096)
+
+    cached_service = DiskCachingBlobService(blockblob_service, str(tmp_path), max_size=1024, chunk_size=1024)
+    assert cached_service.get_blob_to_bytes('container', 'blob').content == b'x' * 4096
+    assert (tmp_path / 'notes.txt').exists()
+    assert (tmp_path / 'data' / '0').exists()
+
+    # A new cache over the same directory indexes the chunks left behind and nothing else
+    cached_service = DiskCachingBlobService(blockblob_service, str(tmp_path), max_size=4096, chunk_size=1024)
+    assert list(cached_service._chunks.values()) == [1024]
+    assert cached_service.get_blob_to_bytes('container', 'blob', start_range=3072, end_range=4095).content == b'x' * 1024
+    assert cached_service.hits == 1
+
+
+def test_reads_take_the_arguments_of_the_sdk(tmp_path):
+    blockblob_service = FakeStorageAccount().create_block_blob_service()
+    blockblob_service.create_container('container')
+    etag = blockblob_service.create_blob_from_bytes('container', 'blob', b'0123456789').etag
+    cached_service = DiskCachingBlobService(blockblob_service, str(tmp_path), max_size=16, chunk_size=4)
+    progress = []
+
+    blob = cached_service.get_blob_to_bytes('container', 'blob', start_range=2, end_range=8, validate_content=True,
+                                            progress_callback=lambda current, total: progress.append((current, total)),
+                                            max_connections=4, if_match=etag, timeout=30)
+    assert blob.content == b'2345678'
+    assert progress == [(2, 7), (6, 7), (7, 7)]
+
+    text_path = tmp_path / 'blob.txt'
+    cached_service.get_blob_to_path('container', 'blob', str(text_path), validate_content=True, timeout=30)
+    assert text_path.read_bytes() == b'0123456789'
+    assert cached_service.get_blob_to_text('container', 'blob', max_connections=1).content == '0123456789'
+
+    with pytest.raises(AzureHttpError) as error:
+        cached_service.get_blob_to_bytes('container', 'blob', if_match='"0x0"')
+    assert error.value.status_code == 412
+    with pytest.raises(AzureHttpError) as error:
+        cached_service.get_blob_to_bytes('container', 'blob', if_none_match=etag)
+    assert error.value.status_code == 304
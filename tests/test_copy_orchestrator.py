@@ -0,0 +1,40 @@
+#----------------------------------------------------------------------------------
+# Microsoft Developer & Platform Evangelism
+#
+# Copyright (c) Microsoft Corporation. All rights reserved.
+#
+# THIS CODE AND INFORMATION ARE PROVIDED "AS IS" WITHOUT WARRANTY OF ANY KIND,
+# EITHER EXPRESSED OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE IMPLIED WARRANTIES
+# OF MERCHANTABILITY AND/OR FITNESS FOR A PARTICULAR PURPOSE.
+#----------------------------------------------------------------------------------
+# The example companies, organizations, products, domain names,
+# e-mail addresses, logos, people, places, and events depicted
+# herein are fictitious.  No association with any real company,
+# organization, product, domain name, email address, logo, person,
+# places, or events is intended or should be inferred.
+#----------------------------------------------------------------------------------
+
+
+from copy_orchestrator import BulkCopyOrchestrator
+from fake_blob_service import FakeStorageAccount
+
+
+def test_progress_includes_pending_copies():
+    blockblob_service = FakeStorageAccount(copy_duration=0.3).create_block_blob_service()
+    blockblob_service.create_container('container')
+    blockblob_service.create_blob_from_bytes('container', 'source', b'x' * 1000)
+    source_url = blockblob_service.make_blob_url('container', 'source')
+    progress = []
+
+    def progress_callback(report):
+        progress.append((report.in_flight, report.bytes_copied, report.total_bytes))
+
+    orchestrator = BulkCopyOrchestrator(blockblob_service, initial_poll_interval=0.05, progress_callback=progress_callback)
+    report = orchestrator.copy_blobs([(source_url, 'container', 'copy{0}'.format(index)) for index in range(3)])
+
+    assert report.succeeded == 3
+    assert report.bytes_copied == report.total_bytes == 3000
+    # Every start and status check is reported, including those of copies still pending
+    assert len(progress) == report.requests
+    assert progress[0] == (3, 0, 1000)
+    assert progress[-1] == (0, 3000, 3000)
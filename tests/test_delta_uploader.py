@@ -0,0 +1,83 @@
+#----------------------------------------------------------------------------------
+# Microsoft Developer & Platform Evangelism
+#
+# Copyright (c) Microsoft Corporation. All rights reserved.
+#
+# THIS CODE AND INFORMATION ARE PROVIDED "AS IS" WITHOUT WARRANTY OF ANY KIND,
+# EITHER EXPRESSED OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE IMPLIED WARRANTIES
+# OF MERCHANTABILITY AND/OR FITNESS FOR A PARTICULAR PURPOSE.
+#----------------------------------------------------------------------------------
+# The example companies, organizations, products, domain names,
+# e-mail addresses, logos, people, places, and events depicted
+# herein are fictitious.  No association with any real company,
+# organization, product, domain name, email address, logo, person,
+# places, or events is intended or should be inferred.
+#----------------------------------------------------------------------------------
+
+
+import random
+import pytest
+import delta_uploader
+from azure.storage.blob.models import BlockListType
+from delta_uploader import DeltaBlockUploader
+from fake_blob_service import FakeStorageAccount
+
+
+# Records the IDs of the blocks sent with put_block
+class RecordingService():
+
+    def __init__(self, blob_service):
+        self.blob_service = blob_service
+        self.sent_block_ids = []
+
+    def put_block(self, container_name, blob_name, block, block_id, **kwargs):
+        self.sent_block_ids.append(block_id)
+        return self.blob_service.put_block(container_name, blob_name, block, block_id, **kwargs)
+
+    def __getattr__(self, name):
+        return getattr(self.blob_service, name)
+
+
+def random_bytes(seed, size):
+    generator = random.Random(seed)
+    return bytes(generator.getrandbits(8) for _ in range(size))
+
+
+def make_uploader(blob_service):
+    return DeltaBlockUploader(blob_service, min_block_size=2 * 1024, average_block_size=8 * 1024,
+                              max_block_size=32 * 1024, max_workers=4)
+
+
+def test_upload_of_an_edited_file_sends_only_the_changed_blocks(tmp_path):
+    blockblob_service = FakeStorageAccount().create_block_blob_service()
+    blockblob_service.create_container('container')
+    data = bytearray(random_bytes(1, 256 * 1024))
+    file_path = tmp_path / 'source.bin'
+    file_path.write_bytes(bytes(data))
+    assert make_uploader(blockblob_service).upload_file('container', 'blob', str(file_path)) == (len(data), 0)
+    before = set(block.id for block in blockblob_service.get_block_list('container', 'blob').committed_blocks)
+
+    # Insert a few bytes in the middle, only the block around them changes
+    data[128 * 1024:128 * 1024] = b'edited'
+    file_path.write_bytes(bytes(data))
+    recording_service = RecordingService(blockblob_service)
+    bytes_sent, bytes_reused = make_uploader(recording_service).upload_file('container', 'blob', str(file_path))
+
+    after = [block.id for block in blockblob_service.get_block_list('container', 'blob',
+                                                                    block_list_type=BlockListType.Committed).committed_blocks]
+    assert sorted(recording_service.sent_block_ids) == sorted(set(after) - before)
+    assert 1 <= len(recording_service.sent_block_ids) <= 2
+    assert bytes_sent + bytes_reused == len(data)
+    assert bytes_sent <= 2 * 32 * 1024
+    assert blockblob_service.get_blob_to_bytes('container', 'blob').content == bytes(data)
+
+
+def test_vectorized_scan_finds_the_boundaries_of_the_byte_loop(monkeypatch):
+    pytest.importorskip('numpy')
+    uploader = make_uploader(None)
+    data = random_bytes(2, 512 * 1024)
+    offsets = range(0, len(data), 7 * 1024 + 3)
+    vectorized = [uploader._find_boundary(data[offset:]) for offset in offsets]
+
+    monkeypatch.setattr(delta_uploader, 'numpy', None)
+    assert [uploader._find_boundary(data[offset:]) for offset in offsets] == vectorized
@@ -0,0 +1,195 @@
+#----------------------------------------------------------------------------------
+# Microsoft Developer & Platform Evangelism
+#
+# Copyright (c) Microsoft Corporation. All rights reserved.
+#
+# THIS CODE AND INFORMATION ARE PROVIDED "AS IS" WITHOUT WARRANTY OF ANY KIND,
+# EITHER EXPRESSED OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE IMPLIED WARRANTIES
+# OF MERCHANTABILITY AND/OR FITNESS FOR A PARTICULAR PURPOSE.
+#----------------------------------------------------------------------------------
+# The example companies, organizations, products, domain names,
+# e-mail addresses, logos, people, places, and events depicted
+# herein are fictitious.  No association with any real company,
+# organization, product, domain name, email address, logo, person,
+# places, or events is intended or should be inferred.
+#----------------------------------------------------------------------------------
+
+
+import pytest
+from azure.common import AzureConflictHttpError, AzureHttpError, AzureMissingResourceHttpError
+from azure.storage.blob.models import BlobBlock, BlobBlockState, BlockListType
+from fake_blob_service import FakeStorageAccount
+
+
+# The fake answers as the Blob service does, these check the behaviors the samples rely on
+
+def test_missing_container_and_blob_are_not_found():
+    blob_service = FakeStorageAccount().create_block_blob_service()
+    with pytest.raises(AzureMissingResourceHttpError):
+        blob_service.get_container_properties('container')
+    blob_service.create_container('container')
+    with pytest.raises(AzureMissingResourceHttpError):
+        blob_service.get_blob_to_bytes('container', 'blob')
+    assert blob_service.exists('container')
+    assert not blob_service.exists('container', 'blob')
+
+
+def test_existing_container_conflicts_only_with_fail_on_exist():
+    blob_service = FakeStorageAccount().create_block_blob_service()
+    assert blob_service.create_container('container')
+    assert not blob_service.create_container('container')
+    with pytest.raises(AzureConflictHttpError):
+        blob_service.create_container('container', fail_on_exist=True)
+
+
+def test_leased_blob_needs_the_lease_id():
+    blob_service = FakeStorageAccount().create_block_blob_service()
+    blob_service.create_container('container')
+    blob_service.create_blob_from_bytes('container', 'blob', b'data')
+    lease_id = blob_service.acquire_blob_lease('container', 'blob', lease_duration=15)
+
+    with pytest.raises(AzureHttpError) as error:
+        blob_service.create_blob_from_bytes('container', 'blob', b'other')
+    assert error.value.status_code == 412
+    with pytest.raises(AzureHttpError) as error:
+        blob_service.delete_blob('container', 'blob')
+    assert error.value.status_code == 412
+
+    blob_service.create_blob_from_bytes('container', 'blob', b'other', lease_id=lease_id)
+    # Reads do not need the lease
+    assert blob_service.get_blob_to_bytes('container', 'blob').content == b'other'
+    with pytest.raises(AzureConflictHttpError):
+        blob_service.acquire_blob_lease('container', 'blob', lease_duration=15)
+
+
+def test_conditional_requests():
+    blob_service = FakeStorageAccount().create_block_blob_service()
+    blob_service.create_container('container')
+    etag = blob_service.create_blob_from_bytes('container', 'blob', b'data').etag
+
+    assert blob_service.get_blob_to_bytes('container', 'blob', if_match=etag).content == b'data'
+    with pytest.raises(AzureHttpError) as error:
+        blob_service.get_blob_to_bytes('container', 'blob', if_none_match=etag)
+    assert error.value.status_code == 304
+
+    new_etag = blob_service.create_blob_from_bytes('container', 'blob', b'new data').etag
+    assert new_etag != etag
+    with pytest.raises(AzureHttpError) as error:
+        blob_service.get_blob_to_bytes('container', 'blob', if_match=etag)
+    assert error.value.status_code == 412
+    assert blob_service.get_blob_to_bytes('container', 'blob', if_none_match=etag).content == b'new data'
+
+
+def test_block_list_keeps_uncommitted_blocks_apart():
+    blob_service = FakeStorageAccount().create_block_blob_service()
+    blob_service.create_container('container')
+    blob_service.put_block('container', 'blob', b'first', 'block-1')
+    blob_service.put_block('container', 'blob', b'second', 'block-2')
+    assert not blob_service.exists('container', 'blob')
+
+    blob_service.put_block_list('container', 'blob', [BlobBlock(id='block-2'), BlobBlock(id='block-1')])
+    blob_service.put_block('container', 'blob', b'third', 'block-3')
+
+    block_list = blob_service.get_block_list('container', 'blob', block_list_type=BlockListType.All)
+    assert [block.id for block in block_list.committed_blocks] == ['block-2', 'block-1']
+    assert [block.id for block in block_list.uncommitted_blocks] == ['block-3']
+    assert blob_service.get_blob_to_bytes('container', 'blob').content == b'secondfirst'
+
+    # A committed block can be committed again, a block that was never put cannot
+    blob_service.put_block_list('container', 'blob', [BlobBlock(id='block-1', state=BlobBlockState.Committed),
+                                                      BlobBlock(id='block-3', state=BlobBlockState.Uncommitted)])
+    assert blob_service.get_blob_to_bytes('container', 'blob').content == b'firstthird'
+    with pytest.raises(AzureHttpError) as error:
+        blob_service.put_block_list('container', 'blob', [BlobBlock(id='block-4')])
+    assert error.value.status_code == 400
+
+
+def test_page_ranges_and_diff():
+    pageblob_service = FakeStorageAccount().create_page_blob_service()
+    pageblob_service.create_container('container')
+    pageblob_service.create_blob('container', 'blob', 4 * 512)
+    # The SDK checks the alignment before sending, the service the size of the blob
+    with pytest.raises(ValueError):
+        pageblob_service.update_page('container', 'blob', b'x' * 100, 0, 99)
+    with pytest.raises(AzureHttpError) as error:
+        pageblob_service.update_page('container', 'blob', b'x' * 512, 2048, 2559)
+    assert error.value.status_code == 416
+
+    pageblob_service.update_page('container', 'blob', b'a' * 1024, 0, 1023)
+    snapshot = pageblob_service.snapshot_blob('container', 'blob').snapshot
+    pageblob_service.clear_page('container', 'blob', 0, 511)
+    pageblob_service.update_page('container', 'blob', b'b' * 512, 1536, 2047)
+
+    assert [(page_range.start, page_range.end) for page_range in pageblob_service.get_page_ranges('container', 'blob')] == \
+        [(512, 1023), (1536, 2047)]
+    diff = pageblob_service.get_page_ranges_diff('container', 'blob', snapshot)
+    assert sorted((page_range.start, page_range.end, page_range.is_cleared) for page_range in diff) == \
+        [(0, 511, True), (1536, 2047, False)]
+    # Cleared pages read as zeros
+    assert pageblob_service.get_blob_to_bytes('container', 'blob', start_range=0, end_range=511).content == bytes(512)
+
+
+def test_snapshot_does_not_change_with_the_blob():
+    blob_service = FakeStorageAccount().create_block_blob_service()
+    blob_service.create_container('container')
+    blob_service.create_blob_from_bytes('container', 'blob', b'before')
+    snapshot = blob_service.snapshot_blob('container', 'blob').snapshot
+    blob_service.create_blob_from_bytes('container', 'blob', b'after')
+
+    assert blob_service.get_blob_to_bytes('container', 'blob', snapshot=snapshot).content == b'before'
+    assert blob_service.get_blob_to_bytes('container', 'blob').content == b'after'
+    # A blob with snapshots is only deleted along with them
+    with pytest.raises(AzureConflictHttpError):
+        blob_service.delete_blob('container', 'blob')
+
+
+def test_append_blocks_add_to_the_end():
+    account = FakeStorageAccount()
+    appendblob_service = account.create_append_blob_service()
+    appendblob_service.create_container('container')
+    appendblob_service.create_blob('container', 'blob')
+    assert appendblob_service.append_block('container', 'blob', b'first').append_offset == 0
+    assert appendblob_service.append_block('container', 'blob', b'second').append_offset == 5
+    with pytest.raises(AzureHttpError) as error:
+        appendblob_service.append_block('container', 'blob', b'third', appendpos_condition=5)
+    assert error.value.status_code == 412
+    assert appendblob_service.get_blob_to_bytes('container', 'blob').content == b'firstsecond'
+
+    # The other blob services do not write append blobs
+    with pytest.raises(AzureConflictHttpError):
+        account.create_block_blob_service().put_block('container', 'blob', b'data', 'block-1')
+
+
+def test_transfers_are_split_by_the_chunk_sizes_of_the_sdk():
+    blob_service = FakeStorageAccount().create_block_blob_service()
+    blob_service.create_container('container')
+    requests = []
+    blob_service.request_callback = requests.append
+    data = bytes(range(256)) * 64
+
+    blob_service.create_blob_from_bytes('container', 'blob', data)
+    assert len(requests) == 1
+
+    # Above MAX_SINGLE_PUT_SIZE, a put_block per MAX_BLOCK_SIZE bytes and the commit
+    blob_service.MAX_SINGLE_PUT_SIZE = 4096
+    blob_service.MAX_BLOCK_SIZE = 4096
+    del requests[:]
+    blob_service.create_blob_from_bytes('container', 'blob', data)
+    assert len(requests) == 4 + 1
+    blob_service.MAX_BLOCK_SIZE = 1024
+    del requests[:]
+    blob_service.create_blob_from_bytes('container', 'blob', data)
+    assert len(requests) == 16 + 1
+    block_list = blob_service.get_block_list('container', 'blob')
+    assert [block.size for block in block_list.committed_blocks] == [1024] * 16
+
+    # A first GET of MAX_SINGLE_GET_SIZE bytes, then ranges of MAX_CHUNK_GET_SIZE bytes
+    blob_service.MAX_SINGLE_GET_SIZE = 4096
+    blob_service.MAX_CHUNK_GET_SIZE = 2048
+    del requests[:]
+    progress = []
+    blob = blob_service.get_blob_to_bytes('container', 'blob', max_connections=4,
+                                          progress_callback=lambda current, total: progress.append(current))
+    assert blob.content == data
+    assert len(requests) == 1 + 6
+    assert progress[0] == 4096 and progress[-1] == len(data)
@@ -0,0 +1,68 @@
+#----------------------------------------------------------------------------------
+# Microsoft Developer & Platform Evangelism
+#
+# Copyright (c) Microsoft Corporation. All rights reserved.
+#
+# THIS CODE AND INFORMATION ARE PROVIDED "AS IS" WITHOUT WARRANTY OF ANY KIND,
+# EITHER EXPRESSED OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE IMPLIED WARRANTIES
+# OF MERCHANTABILITY AND/OR FITNESS FOR A PARTICULAR PURPOSE.
+#----------------------------------------------------------------------------------
+# The example companies, organizations, products, domain names,
+# e-mail addresses, logos, people, places, and events depicted
+# herein are fictitious.  No association with any real company,
+# organization, product, domain name, email address, logo, person,
+# places, or events is intended or should be inferred.
+#----------------------------------------------------------------------------------
+
+
+import threading
+from fake_blob_service import FakeStorageAccount
+from instrumentation import UNATTRIBUTED, BlobMetrics, InstrumentedBlobService
+
+
+# Sends a request from a new thread, as the SDK does for the blocks of a parallel upload
+def send_from_worker_thread(instrumented_service):
+    worker = threading.Thread(target=instrumented_service.blob_service.get_container_properties, args=('container',))
+    worker.start()
+    worker.join()
+
+
+def test_wrappers_of_a_shared_service_count_their_own_requests():
+    shared_service = FakeStorageAccount().create_block_blob_service()
+    shared_service.create_container('container')
+    first = InstrumentedBlobService(shared_service, BlobMetrics())
+    second = InstrumentedBlobService(shared_service, BlobMetrics())
+
+    first.get_container_properties('container')
+    send_from_worker_thread(second)
+    send_from_worker_thread(second)
+
+    assert first.metrics.snapshot()['get_container_properties']['requests'] == 1
+    assert UNATTRIBUTED not in first.metrics.snapshot()
+    assert second.metrics.snapshot()[UNATTRIBUTED]['requests'] == 2
+    # The shared service is left as it was
+    assert shared_service.request_callback is None
+    assert shared_service.retry_callback is None
+
+
+def test_nested_wrappers_all_count_requests():
+    requests = []
+    blob_service = FakeStorageAccount().create_block_blob_service()
+    blob_service.request_callback = requests.append
+    blob_service.create_container('container')
+    inner = InstrumentedBlobService(blob_service, BlobMetrics())
+    outer = InstrumentedBlobService(inner, BlobMetrics())
+
+    outer.get_container_properties('container')
+    send_from_worker_thread(outer.blob_service)
+
+    for metrics in (inner.metrics, outer.metrics):
+        snapshot = metrics.snapshot()
+        assert snapshot['get_container_properties']['requests'] == 1
+        assert snapshot[UNATTRIBUTED]['requests'] == 1
+    # The callback the service already had is still called
+    assert len(requests) == 3
+    # Using the inner wrapper on its own is not counted by the outer one
+    inner.get_container_properties('container')
+    assert inner.metrics.snapshot()['get_container_properties']['requests'] == 2
+    assert outer.metrics.snapshot()['get_container_properties']['requests'] == 1
@@ -0,0 +1,57 @@
+#----------------------------------------------------------------------------------
+# Microsoft Developer & Platform Evangelism
+#
+# Copyright (c) Microsoft Corporation. All rights reserved.
+#
+# THIS CODE AND INFORMATION ARE PROVIDED "AS IS" WITHOUT WARRANTY OF ANY KIND,
+# EITHER EXPRESSED OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE IMPLIED WARRANTIES
+# OF MERCHANTABILITY AND/OR FITNESS FOR A PARTICULAR PURPOSE.
+#----------------------------------------------------------------------------------
+# The example companies, organizations, products, domain names,
+# e-mail addresses, logos, people, places, and events depicted
+# herein are fictitious.  No association with any real company,
+# organization, product, domain name, email address, logo, person,
+# places, or events is intended or should be inferred.
+#----------------------------------------------------------------------------------
+
+
+from azure.common import AzureHttpError
+from fake_blob_service import FakeStorageAccount
+from lease_manager import LeaseManager
+
+
+# Answers the release of a container lease as the service does while the container is being deleted
+class ContainerBeingDeletedService():
+
+    def __init__(self, blob_service):
+        self.blob_service = blob_service
+
+    def release_container_lease(self, container_name, lease_id):
+        raise AzureHttpError('ContainerBeingDeleted', 409)
+
+    def __getattr__(self, name):
+        return getattr(self.blob_service, name)
+
+
+def test_lease_of_a_deleted_container_is_already_released():
+    blob_service = FakeStorageAccount().create_block_blob_service()
+    blob_service.create_container('container')
+    with LeaseManager() as lease_manager:
+        with lease_manager.lease_container(blob_service, 'container', lease_duration=15) as lease:
+            blob_service.delete_container('container', lease_id=lease.lease_id)
+        assert not lease.active
+
+        blob_service.create_container('container')
+        with lease_manager.lease_container(ContainerBeingDeletedService(blob_service), 'container', lease_duration=15) as lease:
+            pass
+        assert not lease.active
+
+
+def test_lease_of_a_deleted_blob_is_already_released():
+    blob_service = FakeStorageAccount().create_block_blob_service()
+    blob_service.create_container('container')
+    blob_service.create_blob_from_bytes('container', 'blob', b'content')
+    with LeaseManager() as lease_manager:
+        with lease_manager.lease_blob(blob_service, 'container', 'blob', lease_duration=15) as lease:
+            blob_service.delete_blob('container', 'blob', lease_id=lease.lease_id)
+        assert not lease.active
@@ -0,0 +1,63 @@
+#----------------------------------------------------------------------------------
+# Microsoft Developer & Platform Evangelism
+#
+# Copyright (c) Microsoft Corporation. All rights reserved.
+#
+# THIS CODE AND INFORMATION ARE PROVIDED "AS IS" WITHOUT WARRANTY OF ANY KIND,
+# EITHER EXPRESSED OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE IMPLIED WARRANTIES
+# OF MERCHANTABILITY AND/OR FITNESS FOR A PARTICULAR PURPOSE.
+#----------------------------------------------------------------------------------
+# The example companies, organizations, products, domain names,
+# e-mail addresses, logos, people, places, and events depicted
+# herein are fictitious.  No association with any real company,
+# organization, product, domain name, email address, logo, person,
+# places, or events is intended or should be inferred.
+#----------------------------------------------------------------------------------
+
+
+import pytest
+from azure.common import AzureHttpError
+from azure.storage.blob.models import Include
+from fake_blob_service import FakeStorageAccount
+from page_blob_backup import IncrementalPageBlobBackup
+
+
+# Fails the downloads of ranges after the first few
+class FailingDownloadService():
+
+    def __init__(self, blob_service, successful_downloads):
+        self.blob_service = blob_service
+        self.downloads = 0
+        self.successful_downloads = successful_downloads
+
+    def get_blob_to_bytes(self, *args, **kwargs):
+        self.downloads += 1
+        if self.downloads > self.successful_downloads:
+            raise AzureHttpError('ServerBusy', 503)
+        return self.blob_service.get_blob_to_bytes(*args, **kwargs)
+
+    def __getattr__(self, name):
+        return getattr(self.blob_service, name)
+
+
+def get_snapshots(pageblob_service):
+    return [blob.snapshot for blob in pageblob_service.list_blobs('container', include=Include.SNAPSHOTS) if blob.snapshot]
+
+
+def test_failed_backup_deletes_its_snapshot(tmp_path):
+    pageblob_service = FakeStorageAccount().create_page_blob_service()
+    pageblob_service.create_container('container')
+    pageblob_service.create_blob('container', 'disk', 64 * 1024)
+    pageblob_service.update_page('container', 'disk', b'\x01' * 64 * 1024, 0, 64 * 1024 - 1)
+    entry = IncrementalPageBlobBackup(pageblob_service).backup('container', 'disk', str(tmp_path))
+
+    pageblob_service.update_page('container', 'disk', b'\x02' * 64 * 1024, 0, 64 * 1024 - 1)
+    failing_service = FailingDownloadService(pageblob_service, successful_downloads=1)
+    backup = IncrementalPageBlobBackup(failing_service, range_size=4096, max_workers=1)
+    with pytest.raises(AzureHttpError):
+        backup.backup('container', 'disk', str(tmp_path))
+
+    # The ranges after the failed one were not downloaded
+    assert failing_service.downloads == 2
+    assert get_snapshots(pageblob_service) == [entry['snapshot']]
+    assert [backup_entry['snapshot'] for backup_entry in backup.read_manifest(str(tmp_path))['backups']] == [entry['snapshot']]
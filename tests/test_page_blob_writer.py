@@ -0,0 +1,73 @@
+#----------------------------------------------------------------------------------
+# Microsoft Developer & Platform Evangelism
+#
+# Copyright (c) Microsoft Corporation. All rights reserved.
+#
+# THIS CODE AND INFORMATION ARE PROVIDED "AS IS" WITHOUT WARRANTY OF ANY KIND,
+# EITHER EXPRESSED OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE IMPLIED WARRANTIES
+# OF MERCHANTABILITY AND/OR FITNESS FOR A PARTICULAR PURPOSE.
+#----------------------------------------------------------------------------------
+# The example companies, organizations, products, domain names,
+# e-mail addresses, logos, people, places, and events depicted
+# herein are fictitious.  No association with any real company,
+# organization, product, domain name, email address, logo, person,
+# places, or events is intended or should be inferred.
+#----------------------------------------------------------------------------------
+
+
+import io
+import os
+from fake_blob_service import FakeStorageAccount
+from page_blob_writer import PAGE_SIZE, SparsePageBlobWriter
+
+
+# Content with a page of zeros in the middle and a partial final page
+CONTENT = os.urandom(3 * PAGE_SIZE) + bytes(PAGE_SIZE) + os.urandom(2 * PAGE_SIZE + 100)
+BLOB_SIZE = 7 * PAGE_SIZE
+
+
+def create_page_blob():
+    pageblob_service = FakeStorageAccount().create_page_blob_service()
+    pageblob_service.create_container('container')
+    pageblob_service.create_blob('container', 'blob', BLOB_SIZE)
+    return pageblob_service
+
+
+def check_blob(pageblob_service, updates):
+    assert pageblob_service.get_blob_to_bytes('container', 'blob').content == CONTENT + bytes(BLOB_SIZE - len(CONTENT))
+    # The final partial page is sent on its own, padded to a whole page
+    assert updates == [(0, 3 * PAGE_SIZE - 1), (4 * PAGE_SIZE, 6 * PAGE_SIZE - 1), (6 * PAGE_SIZE, 7 * PAGE_SIZE - 1)]
+
+
+# Records the page ranges sent by update_page
+class RecordingService():
+
+    def __init__(self, pageblob_service):
+        self.pageblob_service = pageblob_service
+        self.updates = []
+
+    def update_page(self, container_name, blob_name, page, start_range, end_range, **kwargs):
+        assert len(page) == end_range - start_range + 1
+        self.updates.append((start_range, end_range))
+        return self.pageblob_service.update_page(container_name, blob_name, page, start_range, end_range, **kwargs)
+
+    def __getattr__(self, name):
+        return getattr(self.pageblob_service, name)
+
+
+def test_write_file_pads_only_the_final_page(tmp_path):
+    file_path = tmp_path / 'disk.img'
+    file_path.write_bytes(CONTENT)
+    service = RecordingService(create_page_blob())
+    sent = SparsePageBlobWriter(service, max_workers=1).write_file('container', 'blob', str(file_path))
+
+    assert sent == 6 * PAGE_SIZE
+    check_blob(service.pageblob_service, sorted(service.updates))
+
+
+def test_write_stream_pads_only_the_final_page():
+    service = RecordingService(create_page_blob())
+    sent = SparsePageBlobWriter(service, max_workers=1).write_stream('container', 'blob', io.BytesIO(CONTENT))
+
+    assert sent == 6 * PAGE_SIZE
+    check_blob(service.pageblob_service, sorted(service.updates))
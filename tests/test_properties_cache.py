@@ -0,0 +1,81 @@
+#----------------------------------------------------------------------------------
+# Microsoft Developer & Platform Evangelism
+#
+# Copyright (c) Microsoft Corporation. All rights reserved.
+#
+# THIS CODE AND INFORMATION ARE PROVIDED "AS IS" WITHOUT WARRANTY OF ANY KIND,
+# EITHER EXPRESSED OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE IMPLIED WARRANTIES
+# OF MERCHANTABILITY AND/OR FITNESS FOR A PARTICULAR PURPOSE.
+#----------------------------------------------------------------------------------
+# The example companies, organizations, products, domain names,
+# e-mail addresses, logos, people, places, and events depicted
+# herein are fictitious.  No association with any real company,
+# organization, product, domain name, email address, logo, person,
+# places, or events is intended or should be inferred.
+#----------------------------------------------------------------------------------
+
+
+import pytest
+from azure.common import AzureHttpError
+from fake_blob_service import FakeStorageAccount
+from instrumentation import BlobMetrics, InstrumentedStorageAccount
+from properties_cache import CachingBlobService, get_called_names
+
+
+def test_get_called_names_reads_positions_and_keywords():
+    assert get_called_names('set_blob_metadata', ('container', 'blob', {'a': '1'}), {}) == ('container', 'blob')
+    assert get_called_names('set_blob_metadata', ('container',), {'blob_name': 'blob'}) == ('container', 'blob')
+    assert get_called_names('delete_blob', (), {'container_name': 'container', 'blob_name': 'blob'}) == ('container', 'blob')
+    assert get_called_names('set_container_metadata', ('container', {'a': '1'}), {}) == ('container', None)
+    assert get_called_names('set_blob_service_properties', (None, None), {}) == (None, None)
+
+
+def test_write_through_instrumented_service_invalidates_entries():
+    account = InstrumentedStorageAccount(FakeStorageAccount(), BlobMetrics())
+    blockblob_service = CachingBlobService(account.create_block_blob_service(), ttl=3600)
+    blockblob_service.create_container('container')
+    blockblob_service.create_blob_from_bytes('container', 'blob', b'content', metadata={'category': 'a'})
+
+    assert blockblob_service.get_blob_metadata('container', 'blob') == {'category': 'a'}
+    blockblob_service.set_blob_metadata('container', 'blob', {'category': 'b'})
+    assert blockblob_service.get_blob_metadata('container', 'blob') == {'category': 'b'}
+
+    blockblob_service.set_container_metadata('container', {'owner': 'x'})
+    assert blockblob_service.get_container_metadata('container') == {'owner': 'x'}
+    blockblob_service.set_container_metadata(container_name='container', metadata={'owner': 'y'})
+    assert blockblob_service.get_container_metadata('container') == {'owner': 'y'}
+
+
+def test_failed_write_still_invalidates_entries():
+    blockblob_service = CachingBlobService(FakeStorageAccount().create_block_blob_service(), ttl=3600)
+    blockblob_service.create_container('container')
+    blockblob_service.create_blob_from_bytes('container', 'blob', b'content')
+    blockblob_service.get_blob_properties('container', 'blob')
+
+    with pytest.raises(AzureHttpError):
+        blockblob_service.set_blob_metadata('container', 'blob', {'category': 'b'}, if_match='"0x0"')
+    blockblob_service.get_blob_properties('container', 'blob')
+    assert blockblob_service.misses == 2
+
+
+def test_reads_take_the_arguments_of_the_sdk():
+    blockblob_service = FakeStorageAccount().create_block_blob_service()
+    blockblob_service.create_container('container')
+    etag = blockblob_service.create_blob_from_bytes('container', 'blob', b'content', metadata={'category': 'a'}).etag
+    cached_service = CachingBlobService(blockblob_service, ttl=3600)
+
+    assert cached_service.get_blob_metadata('container', 'blob', timeout=5) == {'category': 'a'}
+    assert cached_service.get_container_properties('container', timeout=5).name == 'container'
+    assert cached_service.get_container_metadata('container', timeout=5) == {}
+    assert (cached_service.misses, cached_service.hits) == (2, 1)
+
+    # Reads with an access condition are sent to the service and not counted as hits
+    assert cached_service.get_blob_properties('container', 'blob', if_match='*').properties.etag == etag
+    assert cached_service.get_blob_metadata('container', 'blob', if_match=etag, timeout=5) == {'category': 'a'}
+    with pytest.raises(AzureHttpError) as error:
+        cached_service.get_blob_properties('container', 'blob', if_match='"0x0"')
+    assert error.value.status_code == 412
+    with pytest.raises(AzureHttpError) as error:
+        cached_service.get_blob_properties('container', 'blob', if_none_match=etag)
+    assert error.value.status_code == 304
+    assert (cached_service.misses, cached_service.hits) == (2, 1)
@@ -0,0 +1,87 @@
+#----------------------------------------------------------------------------------
+# Microsoft Developer & Platform Evangelism
+#
+# Copyright (c) Microsoft Corporation. All rights reserved.
+#
+# THIS CODE AND INFORMATION ARE PROVIDED "AS IS" WITHOUT WARRANTY OF ANY KIND,
+# EITHER EXPRESSED OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE IMPLIED WARRANTIES
+# OF MERCHANTABILITY AND/OR FITNESS FOR A PARTICULAR PURPOSE.
+#----------------------------------------------------------------------------------
+# The example companies, organizations, products, domain names,
+# e-mail addresses, logos, people, places, and events depicted
+# herein are fictitious.  No association with any real company,
+# organization, product, domain name, email address, logo, person,
+# places, or events is intended or should be inferred.
+#----------------------------------------------------------------------------------
+
+
+import os
+import threading
+import pytest
+from azure.common import AzureHttpError
+from fake_blob_service import FakeStorageAccount
+from resumable_uploader import ResumableBlockUploader
+
+
+# Counts the put_block calls and fails them once fail_after blocks were sent
+class CountingService():
+
+    def __init__(self, blob_service, fail_after=None):
+        self.blob_service = blob_service
+        self.fail_after = fail_after
+        self.put_block_count = 0
+        self._lock = threading.Lock()
+
+    def put_block(self, *args, **kwargs):
+        with self._lock:
+            if self.fail_after is not None and self.put_block_count >= self.fail_after:
+                raise AzureHttpError('ServerBusy', 503)
+            self.put_block_count += 1
+        return self.blob_service.put_block(*args, **kwargs)
+
+    def __getattr__(self, name):
+        return getattr(self.blob_service, name)
+
+
+def make_interrupted_upload(tmp_path, data):
+    blockblob_service = FakeStorageAccount().create_block_blob_service()
+    blockblob_service.create_container('container')
+    file_path = tmp_path / 'source.bin'
+    file_path.write_bytes(data)
+    journal_dir = tmp_path / 'journals'
+    journal_dir.mkdir()
+
+    interrupted_service = CountingService(blockblob_service, fail_after=3)
+    with pytest.raises(AzureHttpError):
+        ResumableBlockUploader(interrupted_service, block_size=1024, max_workers=1,
+                               journal_dir=str(journal_dir)).upload_file('container', 'blob', str(file_path))
+    assert interrupted_service.put_block_count == 3
+    assert not blockblob_service.exists('container', 'blob')
+    return blockblob_service, file_path, journal_dir
+
+
+def test_resumed_upload_sends_only_the_missing_blocks(tmp_path):
+    data = os.urandom(10 * 1024)
+    blockblob_service, file_path, journal_dir = make_interrupted_upload(tmp_path, data)
+
+    counting_service = CountingService(blockblob_service)
+    uploader = ResumableBlockUploader(counting_service, block_size=1024, max_workers=4, journal_dir=str(journal_dir))
+    assert uploader.upload_file('container', 'blob', str(file_path)) == (7, 3)
+    assert counting_service.put_block_count == 7
+    assert blockblob_service.get_blob_to_bytes('container', 'blob').content == data
+    assert os.listdir(str(journal_dir)) == []
+
+
+def test_changed_file_is_uploaded_again(tmp_path):
+    data = os.urandom(10 * 1024)
+    blockblob_service, file_path, journal_dir = make_interrupted_upload(tmp_path, data)
+    changed_data = b'changed' + data[7:]
+    file_path.write_bytes(changed_data)
+    stat = os.stat(str(file_path))
+    os.utime(str(file_path), (stat.st_atime, stat.st_mtime + 10))
+
+    counting_service = CountingService(blockblob_service)
+    uploader = ResumableBlockUploader(counting_service, block_size=1024, max_workers=4, journal_dir=str(journal_dir))
+    assert uploader.upload_file('container', 'blob', str(file_path)) == (10, 0)
+    assert counting_service.put_block_count == 10
+    assert blockblob_service.get_blob_to_bytes('container', 'blob').content == changed_data
@@ -0,0 +1,49 @@
+#----------------------------------------------------------------------------------
+# Microsoft Developer & Platform Evangelism
+#
+# Copyright (c) Microsoft Corporation. All rights reserved.
+#
+# THIS CODE AND INFORMATION ARE PROVIDED "AS IS" WITHOUT WARRANTY OF ANY KIND,
+# EITHER EXPRESSED OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE IMPLIED WARRANTIES
+# OF MERCHANTABILITY AND/OR FITNESS FOR A PARTICULAR PURPOSE.
+#----------------------------------------------------------------------------------
+# The example companies, organizations, products, domain names,
+# e-mail addresses, logos, people, places, and events depicted
+# herein are fictitious.  No association with any real company,
+# organization, product, domain name, email address, logo, person,
+# places, or events is intended or should be inferred.
+#----------------------------------------------------------------------------------
+
+
+from azure.storage.models import RetryContext
+from fake_blob_service import FakeStorageAccount
+from instrumentation import InstrumentedBlobService
+from transfer_tuner import AdaptiveBlockUploader, TransferTuner, with_retry_hook
+
+
+# Sends a retry of a request that got no response, as the SDK does after a connection error
+def retry_on(blob_service):
+    blob_service.retry_callback(RetryContext())
+
+
+def test_retry_hook_leaves_the_shared_service_unchanged():
+    shared_service = FakeStorageAccount().create_block_blob_service()
+    retries = []
+    shared_service.retry_callback = retries.append
+    instrumented_service = InstrumentedBlobService(shared_service)
+    instrumented_callback = instrumented_service.blob_service.retry_callback
+
+    tuner = TransferTuner(concurrency=2)
+    uploader = AdaptiveBlockUploader(instrumented_service, tuner)
+    assert shared_service.retry_callback == retries.append
+    assert instrumented_service.blob_service.retry_callback is instrumented_callback
+    assert not hasattr(shared_service, '_transfer_tuner_hook')
+
+    # The copy reports to the tuner running on the thread and still calls the previous callbacks
+    tuner.run(0, retry_on, uploader.blockblob_service.blob_service)
+    assert tuner.throttled == 1
+    assert len(retries) == 1
+    assert instrumented_service.metrics.snapshot()['unattributed']['retries'] == 1
+
+    # Hooking a hooked service again returns it as it is
+    assert with_retry_hook(uploader.blockblob_service) is uploader.blockblob_service
@@ -0,0 +1,233 @@
+#----------------------------------------------------------------------------------
+# Microsoft Developer & Platform Evangelism
+#
+# Copyright (c) Microsoft Corporation. All rights reserved.
+#
+# THIS CODE AND INFORMATION ARE PROVIDED "AS IS" WITHOUT WARRANTY OF ANY KIND,
+# EITHER EXPRESSED OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE IMPLIED WARRANTIES
+# OF MERCHANTABILITY AND/OR FITNESS FOR A PARTICULAR PURPOSE.
+#----------------------------------------------------------------------------------
+# The example companies, organizations, products, domain names,
+# e-mail addresses, logos, people, places, and events depicted
+# herein are fictitious.  No association with any real company,
+# organization, product, domain name, email address, logo, person,
+# places, or events is intended or should be inferred.
+#----------------------------------------------------------------------------------
+
+import copy
+import functools
+import threading
+import time
+from azure.common import AzureHttpError
+from azure.storage.blob.models import BlobBlock
+from block_blob_uploader import ParallelBlockUploader
+from mapped_file import MappedFile
+
+# Status codes the service returns when it throttles (ServerBusy) or fails internally
+THROTTLING_STATUS_CODES = (500, 503)
+
+# Throughput must improve by this fraction for a change of settings to be kept
+MIN_IMPROVEMENT = 0.05
+
+# The tuner whose transfer is running on each thread, told about retries of throttled requests
+_current = threading.local()
+
+#
+# Transfer tuner - Adjusts the number of requests in flight and the block size of a transfer
+# while it runs, AIMD-style. Completed requests are measured in windows of at least one request
+# per slot. After a window without throttling the concurrency grows by one as long as that keeps
+# improving throughput by 5%; once it stops helping the last step is undone and the block size is
+# doubled while that helps. A window with a throttled (500/503) or failed request halves the
+# concurrency and starts probing again. Every few steady windows one more request is tried, so the
+# settings follow changes of the link.
+#
+class TransferTuner():
+
+    # Input Arguments:
+    # concurrency - requests in flight at the start
+    # block_size - bytes per request at the start
+    # min_concurrency, max_concurrency - bounds of the requests in flight
+    # min_block_size, max_block_size - bounds of the bytes per request
+    # probe_windows - steady windows before one more request in flight is tried
+    def __init__(self, concurrency=4, block_size=1024 * 1024, min_concurrency=1, max_concurrency=64,
+                 min_block_size=64 * 1024, max_block_size=16 * 1024 * 1024, probe_windows=8):
+        if not 0 < min_concurrency <= concurrency <= max_concurrency:
+            raise ValueError('concurrency must be between min_concurrency and max_concurrency')
+        if not 0 < min_block_size <= block_size <= max_block_size:
+            raise ValueError('block_size must be between min_block_size and max_block_size')
+
+        self.concurrency = concurrency
+        self.block_size = block_size
+        self.min_concurrency = min_concurrency
+        self.max_concurrency = max_concurrency
+        self.min_block_size = min_block_size
+        self.max_block_size = max_block_size
+        self.probe_windows = probe_windows
+        self.throttled = 0
+        # (time, concurrency, block size, throughput in bytes per second) at the end of every window
+        self.history = []
+
+        self._phase = 'concurrency'
+        self._best_throughput = 0.0
+        self._steady_windows = 0
+        self._lock = threading.Lock()
+        self._start_window()
+
+    # Records a completed request of size bytes
+    def record_success(self, size):
+        with self._lock:
+            self._window_bytes += size
+            self._window_requests += 1
+            if self._window_requests >= max(4, self.concurrency):
+                self._end_window()
+
+    # Records a request that was throttled or failed, including the retries done by the SDK
+    def record_throttled(self):
+        with self._lock:
+            self.throttled += 1
+            self._window_throttled = True
+
+    # Runs function(*args) and records it as a request of size bytes: throttling errors and
+    # retries of throttled requests done by the SDK meanwhile are recorded as throttling
+    def run(self, size, function, *args, **kwargs):
+        _current.tuner = self
+        try:
+            result = function(*args, **kwargs)
+        except AzureHttpError as e:
+            if e.status_code in THROTTLING_STATUS_CODES:
+                self.record_throttled()
+            raise
+        finally:
+            _current.tuner = None
+        self.record_success(size)
+        return result
+
+    def _start_window(self):
+        self._window_start = time.time()
+        self._window_bytes = 0
+        self._window_requests = 0
+        self._window_throttled = False
+
+    def _end_window(self):
+        now = time.time()
+        throughput = self._window_bytes / max(now - self._window_start, 1e-6)
+        improved = throughput > self._best_throughput * (1 + MIN_IMPROVEMENT)
+
+        if self._window_throttled:
+            # Multiplicative decrease, then probe again from the new setting
+            self.concurrency = max(self.min_concurrency, self.concurrency // 2)
+            self._phase = 'concurrency'
+            self._best_throughput = 0.0
+        elif self._phase == 'concurrency':
+            if improved and self.concurrency < self.max_concurrency:
+                self._best_throughput = throughput
+                self.concurrency += 1
+            else:
+                if not improved:
+                    self.concurrency = max(self.min_concurrency, self.concurrency - 1)
+                self._best_throughput = max(self._best_throughput, throughput)
+                self._phase = 'block_size'
+                self._grow_block_size()
+        elif self._phase == 'block_size':
+            if improved:
+                self._best_throughput = throughput
+                self._grow_block_size()
+            else:
+                self.block_size = max(self.min_block_size, self.block_size // 2)
+                self._phase = 'steady'
+        else:
+            self._best_throughput = max(self._best_throughput, throughput)
+            self._steady_windows += 1
+            if self._steady_windows >= self.probe_windows and self.concurrency < self.max_concurrency:
+                # Additive increase probe
+                self._steady_windows = 0
+                self._phase = 'concurrency'
+                self.concurrency += 1
+
+        self.history.append((now, self.concurrency, self.block_size, throughput))
+        self._start_window()
+
+    def _grow_block_size(self):
+        if self.block_size * 2 <= self.max_block_size:
+            self.block_size *= 2
+        else:
+            self._phase = 'steady'
+
+
+# Records the retries the SDK makes of throttled requests sent through TransferTuner.run
+def _retry_callback(retry_context):
+    tuner = getattr(_current, 'tuner', None)
+    response = retry_context.response
+    if tuner is not None and (response is None or response.status in THROTTLING_STATUS_CODES):
+        tuner.record_throttled()
+
+
+# Gets a copy of a blob service whose retry_callback also reports throttled retries to the tuner
+# running on the current thread, and calls the callback the service had. The copy shares the HTTP
+# session of the service, which is left unchanged as services can be shared (see service_factory.py).
+# Wrappers that keep the service in blob_service (see instrumentation.py and the caches) are copied
+# along with the service they wrap, the callbacks of a wrapper itself are never called.
+def with_retry_hook(blob_service):
+    if getattr(blob_service, '_transfer_tuner_hook', False):
+        return blob_service
+    if getattr(blob_service, 'blob_service', None) is not None:
+        # copy.copy would look up the attributes of the new wrapper through its __getattr__
+        wrapper = object.__new__(type(blob_service))
+        wrapper.__dict__.update(blob_service.__dict__)
+        wrapper.blob_service = with_retry_hook(blob_service.blob_service)
+        return wrapper
+
+    hooked_service = copy.copy(blob_service)
+    previous_retry_callback = blob_service.retry_callback
+
+    def retry_callback(retry_context):
+        _retry_callback(retry_context)
+        if previous_retry_callback:
+            previous_retry_callback(retry_context)
+    hooked_service.retry_callback = retry_callback
+    hooked_service._transfer_tuner_hook = True
+    return hooked_service
+
+
+#
+# Adaptive block upload - Uploads a file as a block blob with the number of put_block requests
+# in flight and the size of each block chosen by a TransferTuner as the upload goes.
+#
+class AdaptiveBlockUploader(ParallelBlockUploader):
+
+    # Input Arguments:
+    # blockblob_service - BlockBlobService used to put and commit the blocks
+    # tuner - TransferTuner to use, reuse one across uploads to start from the settings it learned
+    def __init__(self, blockblob_service, tuner=None):
+        tuner = tuner or TransferTuner()
+        # Blocks can be up to 100 MB, a blob up to 50,000 blocks
+        tuner.max_block_size = min(tuner.max_block_size, 100 * 1024 * 1024)
+        ParallelBlockUploader.__init__(self, with_retry_hook(blockblob_service), tuner.block_size,
+                                       tuner.max_concurrency, tuner=tuner)
+
+    # Uploads a local file to a block blob.
+    # Input Arguments:
+    # container_name - name of an existing container
+    # blob_name - name of the blob to create or overwrite
+    # file_path - path of the file to upload
+    # put_block_list_kwargs - extra arguments for put_block_list (content_settings, metadata, lease_id...)
+    # Returns the committed list of BlobBlock
+    def upload_file(self, container_name, blob_name, file_path, **put_block_list_kwargs):
+        blocks = []
+
+        with MappedFile(file_path) as source:
+            # The size of a block is the one the tuner has when a slot frees up for it
+            def read_blocks():
+                offset = 0
+                while offset < source.size:
+                    size = min(self.tuner.block_size, source.size - offset)
+                    # Block IDs must all have the same length
+                    block = BlobBlock(id='{0:016x}'.format(offset))
+                    blocks.append(block)
+                    yield block.id, functools.partial(source.read, offset, size)
+                    offset += size
+
+            self.put_blocks(container_name, blob_name, read_blocks(), put_block_list_kwargs.get('lease_id'))
+
+        self.blockblob_service.put_block_list(container_name, blob_name, blocks, **put_block_list_kwargs)
+        return blocks